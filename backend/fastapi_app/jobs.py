@@ -0,0 +1,153 @@
+# backend/fastapi_app/jobs.py
+
+from __future__ import annotations
+
+import re
+from typing import Optional, Tuple, get_args
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from core.codec_registry import normalize_encoding_name
+from core.decode_errors import ErrorPolicy
+from core.jobs import JobManager, JobMeta, JobResponse
+
+router = APIRouter()
+
+# 入力の受信・結果の保存先（設定は ENCODING_REPAIR_JOB_* 環境変数）
+JOB_MANAGER = JobManager.from_env()
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _job_response(response: JobResponse, status_code: int = 200) -> Response:
+    return Response(content=response.model_dump_json(), media_type="application/json", status_code=status_code)
+
+
+def _job_error(status: str, status_code: int = 200) -> Response:
+    return _job_response(JobResponse(result=None, meta=JobMeta(status=status)), status_code)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Range ヘッダ（単一範囲の bytes=start-end / start- / -suffix）を [start, end) に変換する。
+    ヘッダなしは全体、満たせない範囲は None を返す。
+    """
+    if not header:
+        return 0, size
+    match = _RANGE_RE.match(header.strip())
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size
+    else:
+        start = int(first)
+        end = min(size, int(last) + 1) if last else size
+    if start >= end:
+        return None
+    return start, end
+
+
+@router.post(
+    "/encoding/v2/jobs",
+    response_model=JobResponse,
+    summary="Submit an asynchronous repair job (raw body)",
+)
+async def submit_job(
+    request: Request,
+    target_encoding: str = "utf-8",
+    error_policy: str = "ignore",
+) -> Response:
+    """
+    生バイト列（Base64 ではない）をリクエストボディで受け取り、非同期の修復ジョブを作成する。
+
+    ボディは受信しながらストアに書き込むため、入力全体をメモリに載せない。
+    修復はワーカープロセスで実行し、状態は GET /encoding/v2/jobs/{job_id} で確認する。
+    入力が JOB_MANAGER.max_input_bytes を超える場合は 413（受信途中で超えた場合はジョブを削除）。
+    """
+    normalized = normalize_encoding_name(target_encoding)
+    if normalized is None:
+        return _job_error("invalid_encoding_name")
+    if error_policy not in get_args(ErrorPolicy):
+        return _job_error("invalid_error_policy")
+
+    max_input_bytes = JOB_MANAGER.max_input_bytes
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_input_bytes:
+        return _job_error("payload_too_large", 413)
+
+    store = JOB_MANAGER.store
+    status = await run_in_threadpool(JOB_MANAGER.create_job, normalized, error_policy)
+    received = 0
+    writer = await run_in_threadpool(store.open_input_writer, status.job_id)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                received += len(chunk)
+                if received > max_input_bytes:
+                    break
+                await run_in_threadpool(writer.write, chunk)
+    finally:
+        await run_in_threadpool(writer.close)
+
+    if received > max_input_bytes:
+        await run_in_threadpool(store.delete, status.job_id)
+        return _job_error("payload_too_large", 413)
+
+    status = await run_in_threadpool(JOB_MANAGER.submit, status, received)
+    return _job_response(JobResponse(result=status, meta=JobMeta(status="ok")))
+
+
+@router.get(
+    "/encoding/v2/jobs/{job_id}",
+    response_model=JobResponse,
+    summary="Get asynchronous repair job status",
+)
+def get_job(job_id: str) -> Response:
+    """ジョブの状態（queued / running / done / failed）と判定結果を返す。"""
+    status = JOB_MANAGER.store.read_status(job_id)
+    if status is None:
+        return _job_error("job_not_found", 404)
+    return _job_response(JobResponse(result=status, meta=JobMeta(status="ok")))
+
+
+@router.get(
+    "/encoding/v2/jobs/{job_id}/result",
+    summary="Download asynchronous repair job result (supports Range)",
+)
+def get_job_result(job_id: str, request: Request) -> Response:
+    """
+    修復結果を target_encoding のバイト列で返す。Range ヘッダで部分取得できる（206）。
+
+    未完了のジョブは 409、存在しないジョブは 404、満たせない範囲は 416 を返す。
+    """
+    store = JOB_MANAGER.store
+    status = store.read_status(job_id)
+    if status is None:
+        return _job_error("job_not_found", 404)
+    if status.state != "done":
+        return _job_error("job_not_ready", 409)
+
+    size = status.output_bytes_length
+    byte_range = parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        return JSONResponse(
+            {"result": None, "meta": {"status": "range_not_satisfiable"}},
+            status_code=416,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    start, end = byte_range
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start)}
+    status_code = 200
+    if request.headers.get("range"):
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        status_code = 206
+    return StreamingResponse(
+        store.iter_result(job_id, start, end),
+        status_code=status_code,
+        media_type=f"text/plain; charset={status.target_encoding}",
+        headers=headers,
+    )
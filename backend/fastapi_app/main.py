@@ -2,15 +2,40 @@
 
 from __future__ import annotations
 
+from typing import Callable
+
 from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
+from core.admission import REJECTION_STATUS_CODES, AdmissionController
+from core.archive_repair import (
+    ArchiveRepairRequestV2,
+    ArchiveRepairResponse,
+    repair_archive_v2,
+)
+from core.codec_registry import warm_codec_cache
+from core.decompression import max_decompressed_size
+from core.csv_repair import CsvRepairRequestV2, CsvRepairResponse, repair_csv_v2
+from core.email_repair import EmailRepairRequestV2, EmailRepairResponse, repair_email_v2
 from core.encoding_repair_v2 import (
+    BINARY_OUTPUT_MEDIA_TYPES,
+    EncodingDetectRequestV2,
+    EncodingDetectResponse,
     EncodingRepairRequestV2,
     EncodingRepairResponse,
+    detect_encoding_v2,
+    estimate_decoded_length,
+    render_binary_output,
     repair_encoding_v2,
 )
 
+from .jobs import router as jobs_router
+from .streaming import EncodingRepairStreamApp
+
+# コーデック解決と CJK コーデックの初期化をモジュール読み込み時（Lambda の Init フェーズ）に済ませ、
+# 新規コンテナの初回リクエストでも定常時と同じレイテンシにする
+warm_codec_cache()
+
 app = FastAPI(
     title="Encoding Repair API",
     version="2.0.0",
@@ -20,6 +45,34 @@ app = FastAPI(
     ),
 )
 
+# サイズクラス別のアドミッション制御（設定は ENCODING_REPAIR_* 環境変数）
+ADMISSION = AdmissionController.from_env()
+
+
+def _run_admitted(raw_bytes_base64: str, handler: Callable[[], Response], compressed: bool = False) -> Response:
+    """
+    Base64 をデコードする前に入力サイズを見積もり、実行枠を確保してから handler を呼ぶ。
+    拒否時は 413（payload_too_large）/ 503（queue_timeout / queue_full）で result=null の JSON を返す。
+
+    compressed=True（圧縮入力・アーカイブ）の場合、サイズクラスと処理中バイト数は
+    圧縮後のサイズではなく展開後サイズの上限（max_decompressed_size）で見積もる。
+    """
+    estimated = estimate_decoded_length(raw_bytes_base64)
+    charged = estimated
+    if compressed and estimated <= ADMISSION.max_payload_bytes:
+        charged = max(estimated, max_decompressed_size(estimated, ADMISSION.max_payload_bytes))
+    with ADMISSION.admit(charged) as rejection:
+        if rejection is not None:
+            return JSONResponse(
+                {"result": None, "meta": {"status": rejection, "input_bytes_length": estimated}},
+                status_code=REJECTION_STATUS_CODES[rejection],
+            )
+        return handler()
+
+
+def _json_response(response) -> Response:
+    return Response(content=response.model_dump_json(), media_type="application/json")
+
 
 @app.get("/health")
 def health() -> dict:
@@ -34,15 +87,123 @@ def health() -> dict:
     response_model=EncodingRepairResponse,
     summary="Encoding Repair v2.0 (Base64-only)",
 )
-def encoding_repair_v2_endpoint(payload: EncodingRepairRequestV2) -> EncodingRepairResponse:
+def encoding_repair_v2_endpoint(payload: EncodingRepairRequestV2) -> Response:
     """
     Base64 専用の文字化け修復エンドポイント。
 
     - mode: auto / manual
     - raw_bytes_base64: ファイル等のバイト列を Base64 化したもの
+    - output_format: json / detect_only / base64 / raw / gzip / zstd
+
+    大きな出力で jsonable_encoder を経由しないよう、
+    シリアライズ済みの Response を直接返す。
+    """
+    return _run_admitted(
+        payload.raw_bytes_base64,
+        lambda: _render_repair_response(payload),
+        compressed=payload.compression != "none",
+    )
+
+
+def _render_repair_response(payload: EncodingRepairRequestV2) -> Response:
+    response = repair_encoding_v2(payload, max_decompressed_bytes=ADMISSION.max_payload_bytes)
+
+    media_type = BINARY_OUTPUT_MEDIA_TYPES.get(payload.output_format)
+    if media_type is not None and response.meta.status == "ok":
+        body, render_error = render_binary_output(
+            response.result.fixed_text,
+            payload.target_encoding,
+            payload.output_format,
+        )
+        if render_error is None:
+            # バイナリ形式では meta をヘッダで返す
+            return Response(
+                content=body,
+                media_type=media_type,
+                headers={"X-Encoding-Repair-Meta": response.meta.model_dump_json()},
+            )
+        response.meta.status = render_error
+        response.result.fixed_text = ""
+
+    return _json_response(response)
+
+
+@app.post(
+    "/encoding/v2/detect",
+    response_model=EncodingDetectResponse,
+    summary="Encoding Detection v2.0 (Base64-only)",
+)
+def encoding_detect_v2_endpoint(payload: EncodingDetectRequestV2) -> Response:
+    """
+    判定専用エンドポイント。修復テキストは返さず、
+    判定結果とスコア順の候補リストのみを返す。
+    """
+    return _run_admitted(payload.raw_bytes_base64, lambda: _json_response(detect_encoding_v2(payload)))
+
+
+@app.post(
+    "/encoding/v2/archive/repair",
+    response_model=ArchiveRepairResponse,
+    summary="Archive Encoding Repair v2.0 (zip / tar / tar.gz, Base64-only)",
+)
+def archive_repair_v2_endpoint(payload: ArchiveRepairRequestV2) -> Response:
+    """
+    zip / tar / tar.gz アーカイブ内の各テキストファイルを Auto モードで修復し、
+    修復後アーカイブ（Base64）とメンバごとのレポートを返す。
+    展開後のサイズにも非圧縮の入力と同じ上限（max_payload_bytes）を適用する。
+    """
+    return _run_admitted(
+        payload.raw_bytes_base64,
+        lambda: _json_response(repair_archive_v2(payload, max_decompressed_bytes=ADMISSION.max_payload_bytes)),
+        compressed=True,
+    )
+
+
+@app.post(
+    "/encoding/v2/csv/repair",
+    response_model=CsvRepairResponse,
+    summary="CSV / TSV Encoding Repair v2.0 (per-column detection, Base64-only)",
+)
+def csv_repair_v2_endpoint(payload: CsvRepairRequestV2) -> Response:
+    """
+    列ごとにエンコーディングを判定して CSV / TSV を修復する。
+    列ごとの判定結果は meta.column_encodings に返す。
+    """
+    return _run_admitted(payload.raw_bytes_base64, lambda: _json_response(repair_csv_v2(payload)))
+
+
+@app.post(
+    "/encoding/v2/email/repair",
+    response_model=EmailRepairResponse,
+    summary="Email / mbox Encoding Repair v2.0 (RFC 2047 headers, Base64-only)",
+)
+def email_repair_v2_endpoint(payload: EmailRepairRequestV2) -> Response:
+    """
+    メール（または mbox）をパースし、RFC 2047 ヘッダと各テキストパートを修復する。
+    宣言 charset が信頼できない場合は Auto 判定にフォールバックする。
     """
-    response = repair_encoding_v2(payload)
-    return response
+    return _run_admitted(payload.raw_bytes_base64, lambda: _json_response(repair_email_v2(payload)))
+
+
+# 生バイト列をストリームで受け取り、修復結果をストリームで返す（ASGI 直結）
+app.router.add_route(
+    "/encoding/v2/repair/stream",
+    EncodingRepairStreamApp(),
+    methods=["POST"],
+    include_in_schema=False,
+)
+
+
+@app.get("/metrics/admission")
+def admission_metrics() -> dict:
+    """
+    アドミッション制御の現在値（サイズクラス別のキュー深さ・実行数・待ち時間）を返す。
+    """
+    return ADMISSION.metrics()
+
+
+# 大きな入力向けの非同期ジョブ API（投入・状態確認・Range 付き結果取得）
+app.include_router(jobs_router)
 
 
 # 任意: ルートに簡易情報を返す
@@ -53,7 +214,17 @@ def root() -> JSONResponse:
             "service": "Encoding Repair API",
             "version": "2.0.0",
             "mode": "base64-only",
-            "endpoints": ["/health", "/encoding/v2/repair"],
+            "endpoints": [
+                "/health",
+                "/encoding/v2/repair",
+                "/encoding/v2/detect",
+                "/encoding/v2/repair/stream",
+                "/encoding/v2/archive/repair",
+                "/encoding/v2/csv/repair",
+                "/encoding/v2/email/repair",
+                "/encoding/v2/jobs",
+                "/metrics/admission",
+            ],
         }
     )
 
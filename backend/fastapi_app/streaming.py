@@ -0,0 +1,148 @@
+# backend/fastapi_app/streaming.py
+
+from __future__ import annotations
+
+import json
+from typing import List, get_args
+from urllib.parse import parse_qs
+
+from core.codec_registry import lookup_codec, normalize_encoding_name
+from core.decode_errors import ErrorPolicy
+from core.decompression import DecompressionError, StreamingDecompressor, parse_content_encoding
+from core.encoding_repair_stream import DEFAULT_DETECTION_WINDOW, StreamingRepairer
+
+# DecompressionError.status → HTTP ステータスコード
+_DECOMPRESSION_STATUS_CODES = {
+    "decompression_limit_exceeded": 413,
+    "invalid_compressed_payload": 400,
+    "zstd_unavailable": 415,
+}
+
+
+class EncodingRepairStreamApp:
+    """
+    生バイト列（Base64 ではない）をストリームで受け取り、
+    修復結果を target_encoding のバイト列としてストリームで返す ASGI アプリ。
+
+    - リクエストボディを JSON/Pydantic で一括パースせず、チャンク単位で処理する
+    - 判定が確定するまで（最大 detection_window バイト）だけ出力を保持し、
+      判定結果をレスポンスヘッダに載せてから送信を開始する
+    - receive() は直前の send() が完了してから呼ぶため、クライアントの受信が
+      遅い場合はサーバの送信フロー制御で send() が待機し、入力の読み込みも止まる
+      （サーバ側に未処理データが無制限に溜まらない）
+
+    クエリパラメータ:
+      - target_encoding: 出力エンコーディング（既定 "utf-8"）
+      - error_policy: 不正バイト列の扱い ignore / replace / escape（既定 "ignore"）
+
+    リクエストヘッダ:
+      - Content-Encoding: gzip / deflate / zstd の場合はチャンクごとに展開してから修復する
+        （未対応の値は 415 unsupported_content_encoding）
+    """
+
+    def __init__(self, detection_window: int = DEFAULT_DETECTION_WINDOW) -> None:
+        self.detection_window = detection_window
+
+    async def __call__(self, scope, receive, send) -> None:
+        params = parse_qs(scope.get("query_string", b"").decode("latin1"))
+        target_encoding = normalize_encoding_name(params.get("target_encoding", ["utf-8"])[0])
+        codec = lookup_codec(target_encoding) if target_encoding is not None else None
+        if codec is None:
+            await self._send_error(send, 400, "invalid_encoding_name")
+            return
+        error_policy = params.get("error_policy", ["ignore"])[0]
+        if error_policy not in get_args(ErrorPolicy):
+            await self._send_error(send, 400, "invalid_error_policy")
+            return
+        headers = dict(scope.get("headers", []))
+        compression = parse_content_encoding(headers.get(b"content-encoding", b"").decode("latin1"))
+        if compression is None:
+            await self._send_error(send, 415, "unsupported_content_encoding")
+            return
+        decompressor = None
+        if compression != "none":
+            try:
+                decompressor = StreamingDecompressor(compression)
+            except DecompressionError as exc:
+                await self._send_error(send, _DECOMPRESSION_STATUS_CODES[exc.status], exc.status)
+                return
+        encoder = codec.incrementalencoder("replace")
+
+        repairer = StreamingRepairer(
+            target_encoding=target_encoding,
+            detection_window=self.detection_window,
+            error_policy=error_policy,
+        )
+
+        started = False
+        held: List[bytes] = []
+        held_size = 0
+        more_body = True
+
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+
+            more_body = message.get("more_body", False)
+            body = message.get("body", b"")
+            try:
+                if decompressor is None:
+                    text = repairer.feed(body)
+                else:
+                    text = "".join(repairer.feed(data) for data in decompressor.decompress(body))
+                    if not more_body:
+                        decompressor.finish()
+            except DecompressionError as exc:
+                if not started:
+                    await self._send_error(send, _DECOMPRESSION_STATUS_CODES[exc.status], exc.status)
+                # 送信開始後はステータスを変えられないため、レスポンスを完了させずに打ち切る
+                return
+            if not more_body:
+                text += repairer.finish()
+            data = encoder.encode(text, final=not more_body)
+
+            if not started:
+                held.append(data)
+                held_size += len(data)
+                if more_body and not repairer.decided and held_size < self.detection_window:
+                    continue
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": 200,
+                        "headers": self._build_headers(repairer, target_encoding),
+                    }
+                )
+                started = True
+                data = b"".join(held)
+                held.clear()
+
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    @staticmethod
+    def _build_headers(repairer: StreamingRepairer, target_encoding: str) -> List[tuple]:
+        headers = [
+            (b"content-type", f"text/plain; charset={target_encoding}".encode("latin1")),
+        ]
+        # ASCII のみが続いて判定前に送信を開始した場合は判定結果を載せない
+        if repairer.decided:
+            headers += [
+                (b"x-encoding-repair-detected-path", repairer.detected_path.encode("latin1")),
+                (b"x-encoding-repair-changed", b"true" if repairer.changed else b"false"),
+                (b"x-encoding-repair-confidence", f"{repairer.confidence:.4f}".encode("latin1")),
+            ]
+        return headers
+
+    @staticmethod
+    async def _send_error(send, status_code: int, status: str) -> None:
+        body = json.dumps({"result": None, "meta": {"status": status}}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status_code,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,224 @@
+# core/admission.py
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterator, Optional
+
+
+SIZE_CLASSES = ("small", "medium", "large")
+
+# 入力サイズクラスの境界（バイト）
+DEFAULT_SMALL_LIMIT = 64 * 1024
+DEFAULT_LARGE_THRESHOLD = 1024 * 1024
+
+DEFAULT_MAX_PAYLOAD_BYTES = 10 * 1024 * 1024
+DEFAULT_MAX_BYTES_IN_FLIGHT = 64 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_LARGE_WORKER_SHARE = 0.25
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 10.0
+# クラスごとの待機数の上限。待機中もスレッドプールのスレッドを占有するため、
+# 3 クラス分の待機 + max_workers が AnyIO の既定スレッド数（40）に収まるようにする
+DEFAULT_MAX_WAITING_PER_CLASS = 8
+
+# 拒否ステータス → HTTP ステータスコード
+REJECTION_STATUS_CODES: Dict[str, int] = {
+    "payload_too_large": 413,
+    "queue_timeout": 503,
+    "queue_full": 503,
+}
+
+
+@dataclass
+class _ClassStats:
+    waiting: Deque[object] = field(default_factory=deque)
+    running: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+class AdmissionController:
+    """
+    入力サイズクラス別のキューによるアドミッション制御。
+
+    - max_payload_bytes を超える入力は即座に拒否（payload_too_large）
+    - 同時実行数（max_workers）と処理中バイト数（max_bytes_in_flight）に上限を設ける
+    - large クラスは max_workers * large_worker_share までしか同時実行しない
+      （残りのワーカーは常に small / medium 用に確保される）
+    - 待機中は small > medium > large の優先順で、同じクラス内は到着順に実行する
+    - queue_timeout_seconds 以内に実行できなければ拒否（queue_timeout）
+    - 同じクラスの待機数が max_waiting_per_class に達していれば待たずに拒否（queue_full）
+
+    FastAPI の同期エンドポイント（スレッドプール）から呼ぶ前提で、
+    threading.Condition で待機する。待機中のリクエストもスレッドプールのスレッドを
+    占有するため、待機数に上限を設けて他のエンドポイントのスレッドを枯渇させない。
+    """
+
+    def __init__(
+        self,
+        max_payload_bytes: int = DEFAULT_MAX_PAYLOAD_BYTES,
+        max_bytes_in_flight: int = DEFAULT_MAX_BYTES_IN_FLIGHT,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        large_worker_share: float = DEFAULT_LARGE_WORKER_SHARE,
+        small_limit: int = DEFAULT_SMALL_LIMIT,
+        large_threshold: int = DEFAULT_LARGE_THRESHOLD,
+        queue_timeout_seconds: float = DEFAULT_QUEUE_TIMEOUT_SECONDS,
+        max_waiting_per_class: int = DEFAULT_MAX_WAITING_PER_CLASS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_payload_bytes = max_payload_bytes
+        self.max_bytes_in_flight = max_bytes_in_flight
+        self.max_workers = max_workers
+        self.large_workers = max(1, math.floor(max_workers * large_worker_share))
+        self.small_limit = small_limit
+        self.large_threshold = large_threshold
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_waiting_per_class = max_waiting_per_class
+        self._clock = clock
+
+        self._condition = threading.Condition()
+        self._stats: Dict[str, _ClassStats] = {name: _ClassStats() for name in SIZE_CLASSES}
+        self._running = 0
+        self._bytes_in_flight = 0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        """ENCODING_REPAIR_* 環境変数から設定を読み込む（未設定は既定値）。"""
+
+        def env(name: str, default, cast):
+            value = os.environ.get(f"ENCODING_REPAIR_{name}")
+            return cast(value) if value else default
+
+        return cls(
+            max_payload_bytes=env("MAX_PAYLOAD_BYTES", DEFAULT_MAX_PAYLOAD_BYTES, int),
+            max_bytes_in_flight=env("MAX_BYTES_IN_FLIGHT", DEFAULT_MAX_BYTES_IN_FLIGHT, int),
+            max_workers=env("MAX_WORKERS", DEFAULT_MAX_WORKERS, int),
+            large_worker_share=env("LARGE_WORKER_SHARE", DEFAULT_LARGE_WORKER_SHARE, float),
+            queue_timeout_seconds=env("QUEUE_TIMEOUT_SECONDS", DEFAULT_QUEUE_TIMEOUT_SECONDS, float),
+            max_waiting_per_class=env("MAX_WAITING_PER_CLASS", DEFAULT_MAX_WAITING_PER_CLASS, int),
+        )
+
+    def classify(self, nbytes: int) -> str:
+        if nbytes < self.small_limit:
+            return "small"
+        if nbytes < self.large_threshold:
+            return "medium"
+        return "large"
+
+    def _can_run(self, size_class: str, ticket: object, nbytes: int) -> bool:
+        stats = self._stats[size_class]
+        if not stats.waiting or stats.waiting[0] is not ticket:
+            return False
+        # 優先度の高いクラスに待機中のリクエストがあれば譲る
+        for name in SIZE_CLASSES:
+            if name == size_class:
+                break
+            if self._stats[name].waiting:
+                return False
+        if self._running >= self.max_workers:
+            return False
+        if size_class == "large" and stats.running >= self.large_workers:
+            return False
+        # 何も実行していなければ max_bytes_in_flight を超える単独の入力も通す
+        if self._running and self._bytes_in_flight + nbytes > self.max_bytes_in_flight:
+            return False
+        return True
+
+    @contextmanager
+    def admit(self, nbytes: int) -> Iterator[Optional[str]]:
+        """
+        実行枠を確保するコンテキストマネージャ。
+
+        確保できた場合は None、拒否された場合は拒否ステータスを返す。
+
+            with controller.admit(nbytes) as rejection:
+                if rejection is not None:
+                    ...  # REJECTION_STATUS_CODES[rejection] で応答
+        """
+        size_class = self.classify(nbytes)
+        stats = self._stats[size_class]
+
+        if nbytes > self.max_payload_bytes:
+            with self._condition:
+                stats.rejected += 1
+            yield "payload_too_large"
+            return
+
+        ticket = object()
+        started = self._clock()
+        deadline = started + self.queue_timeout_seconds
+        rejection: Optional[str] = None
+        with self._condition:
+            if stats.waiting and len(stats.waiting) >= self.max_waiting_per_class:
+                # 同じクラスの先行する待機者がいるため、このリクエストはすぐには実行できない
+                stats.rejected += 1
+                rejection = "queue_full"
+            else:
+                stats.waiting.append(ticket)
+                while not self._can_run(size_class, ticket, nbytes):
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        stats.waiting.remove(ticket)
+                        stats.rejected += 1
+                        rejection = "queue_timeout"
+                        self._condition.notify_all()
+                        break
+                    self._condition.wait(remaining)
+                else:
+                    stats.waiting.popleft()
+                    waited = self._clock() - started
+                    stats.admitted += 1
+                    stats.running += 1
+                    stats.wait_seconds_total += waited
+                    stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+                    self._running += 1
+                    self._bytes_in_flight += nbytes
+                    # 後続の同じクラスの待機者も実行できる可能性がある
+                    self._condition.notify_all()
+
+        if rejection is not None:
+            yield rejection
+            return
+
+        try:
+            yield None
+        finally:
+            with self._condition:
+                stats.running -= 1
+                self._running -= 1
+                self._bytes_in_flight -= nbytes
+                self._condition.notify_all()
+
+    def metrics(self) -> Dict:
+        """キュー深さ・待ち時間などの現在値を返す。"""
+        with self._condition:
+            return {
+                "running": self._running,
+                "bytes_in_flight": self._bytes_in_flight,
+                "max_workers": self.max_workers,
+                "large_workers": self.large_workers,
+                "max_bytes_in_flight": self.max_bytes_in_flight,
+                "max_payload_bytes": self.max_payload_bytes,
+                "max_waiting_per_class": self.max_waiting_per_class,
+                "classes": {
+                    name: {
+                        "queue_depth": len(stats.waiting),
+                        "running": stats.running,
+                        "admitted": stats.admitted,
+                        "rejected": stats.rejected,
+                        "wait_ms_avg": (
+                            stats.wait_seconds_total / stats.admitted * 1000.0 if stats.admitted else 0.0
+                        ),
+                        "wait_ms_max": stats.wait_seconds_max * 1000.0,
+                    }
+                    for name, stats in self._stats.items()
+                },
+            }
@@ -0,0 +1,443 @@
+# core/archive_repair.py
+
+from __future__ import annotations
+
+import base64
+import io
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import BinaryIO, Deque, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from .codec_registry import normalize_encoding_name
+from .decompression import (
+    DEFAULT_MAX_DECOMPRESSED_BYTES,
+    DEFAULT_MAX_DECOMPRESSION_RATIO,
+    DecompressionError,
+    max_decompressed_size,
+)
+from .encoding_repair_v2 import (
+    _decode_base64,
+    _evaluate_candidates,
+    _materialize_text,
+    _score_to_confidence,
+    _select_candidate,
+)
+
+
+ArchiveFormat = Literal["zip", "tar", "tar.gz"]
+
+# 先頭のこのバイト数に NUL を含むメンバはバイナリとみなし、そのまま格納する
+BINARY_SNIFF_BYTES = 8 * 1024
+
+# ZIP の汎用フラグ: ファイル名が UTF-8（bit 11）
+_ZIP_FLAG_UTF8 = 0x800
+
+# 展開後サイズの追跡に使う読み出し単位
+_MEMBER_READ_CHUNK_SIZE = 1024 * 1024
+
+
+class ArchiveRepairRequestV2(BaseModel):
+    """
+    アーカイブ修復リクエスト（Base64 専用）
+
+    - raw_bytes_base64: zip / tar / tar.gz ファイルのバイト列を Base64 化したもの
+    - target_encoding: 各メンバの出力エンコーディング（基本 "utf-8"）
+    """
+    raw_bytes_base64: str = Field(..., min_length=1)
+    target_encoding: str = "utf-8"
+
+
+class ArchiveMemberReport(BaseModel):
+    name: str
+    original_name_encoding: Optional[str] = None
+    detected_path: Optional[str] = None
+    confidence: float = 0.0
+    changed: bool = False
+    status: str
+    input_bytes_length: int = 0
+    output_bytes_length: int = 0
+
+
+class ArchiveRepairResult(BaseModel):
+    archive_base64: str
+    archive_format: Optional[ArchiveFormat] = None
+    members: List[ArchiveMemberReport]
+
+
+class ArchiveRepairMeta(BaseModel):
+    version: str = "2.0.0"
+    status: str
+    execution_ms: float
+    input_bytes_length: int
+    member_count: int = 0
+    changed_count: int = 0
+
+
+class ArchiveRepairResponse(BaseModel):
+    result: ArchiveRepairResult
+    meta: ArchiveRepairMeta
+
+
+def _repair_member_bytes(data: bytes, target_encoding: str) -> Tuple[bytes, Optional[str], float, bool, str]:
+    """
+    1 メンバ分のバイト列を Auto ロジックで修復する（ワーカーで実行）。
+
+    (出力バイト列, detected_path, confidence, changed, status) を返す。
+    """
+    if b"\x00" in data[:BINARY_SNIFF_BYTES]:
+        return data, None, 0.0, False, "skipped_binary"
+
+    candidates, _ = _evaluate_candidates(data)
+    selected, changed = _select_candidate(candidates)
+    if selected is None:
+        return data, None, 0.0, False, "no_meaningful_output"
+
+    detected_path = f"{selected.encoding}->{target_encoding}"
+    if selected.encoding == target_encoding and not selected.had_error:
+        # 変換不要（バイト列も同一）
+        return data, detected_path, _score_to_confidence(selected.score), changed, "ok"
+
+    text = _materialize_text(data, selected)
+    output = text.encode(target_encoding, errors="replace")
+    return output, detected_path, _score_to_confidence(selected.score), changed, "ok"
+
+
+def _decode_member_name(raw_name: bytes) -> Tuple[str, Optional[str]]:
+    """
+    エンコーディング不明のメンバ名（cp932 の ZIP など）を判定してデコードする。
+    (名前, 判定したエンコーディング) を返す。
+    """
+    if raw_name.isascii():
+        return raw_name.decode("ascii"), None
+
+    candidates, _ = _evaluate_candidates(raw_name)
+    selected, _ = _select_candidate(candidates)
+    if selected is None:
+        return raw_name.decode("utf-8", errors="replace"), None
+    return _materialize_text(raw_name, selected), selected.encoding
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> Tuple[str, Optional[str]]:
+    if info.flag_bits & _ZIP_FLAG_UTF8:
+        return info.filename, "utf-8"
+    # UTF-8 フラグなしの名前は zipfile が cp437 としてデコードしている
+    return _decode_member_name(info.orig_filename.encode("cp437"))
+
+
+def _tar_member_name(info: tarfile.TarInfo) -> Tuple[str, Optional[str]]:
+    # surrogateescape で読み込んでいるため、元のバイト列に戻してから判定する
+    return _decode_member_name(info.name.encode("utf-8", errors="surrogateescape"))
+
+
+def detect_archive_format(source: BinaryIO) -> Optional[str]:
+    """先頭バイトから "zip" / "tar.gz" / "tar" を判定する。判定不能なら None。"""
+    position = source.tell()
+    head = source.read(512)
+    source.seek(position)
+
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"PK\x05\x06"):
+        return "zip"
+    if head.startswith(b"\x1f\x8b"):
+        return "tar.gz"
+    if len(head) >= 262 and head[257:262] == b"ustar":
+        return "tar"
+    return None
+
+
+class _ExpansionBudget:
+    """
+    アーカイブ展開後サイズの上限（zip bomb 対策）。decompression.py と同じ考え方で、
+
+    - メンバ 1 つあたり max_member_bytes まで（超えるメンバは skipped_too_large として格納しない）
+    - 全メンバの合計が max_total_bytes、または（RATIO_CHECK_FLOOR_BYTES を超えた後で）
+      アーカイブサイズの max_ratio 倍を超えたら DecompressionError で全体を打ち切る
+    """
+
+    def __init__(self, archive_bytes: int, max_member_bytes: int, max_total_bytes: int, max_ratio: float) -> None:
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_decompressed_size(archive_bytes, max_total_bytes, max_ratio)
+        self.total_bytes = 0
+
+    def charge(self, nbytes: int) -> None:
+        """展開したバイト数を加算する。合計の上限を超えたら DecompressionError を送出する。"""
+        self.total_bytes += nbytes
+        if self.total_bytes > self.max_total_bytes:
+            raise DecompressionError("decompression_limit_exceeded")
+
+    def read_member(self, member: BinaryIO, declared_size: int) -> Optional[bytes]:
+        """
+        メンバを max_member_bytes まで読み出す。超える場合は None。
+        宣言サイズで超過が分かる場合は展開しない（宣言が偽りでも読み出し量で打ち切る）。
+        """
+        if declared_size > self.max_member_bytes:
+            return None
+        chunks: List[bytes] = []
+        size = 0
+        while True:
+            chunk = member.read(min(_MEMBER_READ_CHUNK_SIZE, self.max_member_bytes + 1 - size))
+            if not chunk:
+                return b"".join(chunks)
+            size += len(chunk)
+            self.charge(len(chunk))
+            if size > self.max_member_bytes:
+                return None
+            chunks.append(chunk)
+
+
+def _skipped_report(
+    name: str,
+    name_encoding: Optional[str],
+    declared_size: int,
+    status: str = "skipped_too_large",
+) -> ArchiveMemberReport:
+    return ArchiveMemberReport(
+        name=name,
+        original_name_encoding=name_encoding,
+        status=status,
+        input_bytes_length=declared_size,
+    )
+
+
+class _OrderedWindow:
+    """
+    メンバの修復結果を入力順に書き込むための有限ウィンドウ。
+    executor が指定されていれば並列に修復し、同時に保持するメンバは最大 window 個に制限される。
+    executor が None の場合は投入時にその場で修復する。
+    """
+
+    def __init__(self, executor: Optional[Executor], window: int) -> None:
+        self._executor = executor
+        self._window = window
+        self._pending: Deque[Tuple[object, Future]] = deque()
+
+    def submit(self, key: object, data: bytes, target_encoding: str) -> List[Tuple[object, tuple]]:
+        """メンバを投入し、ウィンドウからあふれた（書き込み可能になった）結果を返す。"""
+        if self._executor is None:
+            return [(key, _repair_member_bytes(data, target_encoding))]
+        self._pending.append((key, self._executor.submit(_repair_member_bytes, data, target_encoding)))
+        completed = []
+        while len(self._pending) > self._window:
+            completed.append(self._pop())
+        return completed
+
+    def drain(self) -> List[Tuple[object, tuple]]:
+        completed = []
+        while self._pending:
+            completed.append(self._pop())
+        return completed
+
+    def _pop(self) -> Tuple[object, tuple]:
+        key, future = self._pending.popleft()
+        return key, future.result()
+
+
+def repair_archive(
+    source: BinaryIO,
+    destination: BinaryIO,
+    target_encoding: str = "utf-8",
+    archive_format: Optional[str] = None,
+    max_workers: int = 1,
+    executor: Optional[Executor] = None,
+    max_member_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+    max_total_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+    max_ratio: float = DEFAULT_MAX_DECOMPRESSION_RATIO,
+) -> Tuple[Optional[str], List[ArchiveMemberReport]]:
+    """
+    zip / tar / tar.gz アーカイブの各メンバを修復し、同じ形式の新しいアーカイブを書き出す。
+
+    - メンバはディスクに展開せず、1 つずつ読み出して修復する
+    - 判定・デコードは GIL を手放さない純 Python 処理のため、既定（max_workers=1）は
+      呼び出し元のスレッドで順に修復する。max_workers > 1 ならプロセスプールで並列に修復し、
+      出力はメンバ順を保つ（executor を渡した場合はそれを使う）
+    - 展開後サイズは _ExpansionBudget で制限する（大きすぎるメンバは skipped_too_large、
+      合計が上限を超えたら DecompressionError）
+    - UTF-8 フラグのない ZIP メンバ名（cp932 など）も判定してデコードする
+    - 展開できない ZIP メンバ（未対応の圧縮方式・暗号化）は unsupported_member として格納しない
+    - NUL を含むメンバはバイナリとみなしてそのまま格納する
+
+    (アーカイブ形式, メンバごとのレポート) を返す。形式が判定できない場合は (None, [])。
+    """
+    archive_format = archive_format or detect_archive_format(source)
+    if archive_format not in ("zip", "tar", "tar.gz"):
+        return None, []
+
+    position = source.tell()
+    archive_bytes = source.seek(0, io.SEEK_END) - position
+    source.seek(position)
+    budget = _ExpansionBudget(archive_bytes, max_member_bytes, max_total_bytes, max_ratio)
+
+    own_executor = executor is None and max_workers > 1
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    window = _OrderedWindow(executor, window=max_workers * 2)
+    try:
+        if archive_format == "zip":
+            reports = _repair_zip(source, destination, target_encoding, window, budget)
+        else:
+            reports = _repair_tar(source, destination, target_encoding, window, budget, archive_format)
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return archive_format, reports
+
+
+def _member_report(name: str, name_encoding: Optional[str], data_len: int, outcome) -> ArchiveMemberReport:
+    output, detected_path, confidence, changed, status = outcome
+    return ArchiveMemberReport(
+        name=name,
+        original_name_encoding=name_encoding,
+        detected_path=detected_path,
+        confidence=confidence,
+        changed=changed,
+        status=status,
+        input_bytes_length=data_len,
+        output_bytes_length=len(output),
+    )
+
+
+def _repair_zip(source, destination, target_encoding, window, budget) -> List[ArchiveMemberReport]:
+    reports: List[ArchiveMemberReport] = []
+
+    with zipfile.ZipFile(source) as src, zipfile.ZipFile(destination, "w") as dst:
+
+        def write(item, outcome) -> None:
+            info, name, name_encoding, data_len = item
+            out_info = zipfile.ZipInfo(name, date_time=info.date_time)
+            out_info.compress_type = zipfile.ZIP_DEFLATED
+            out_info.external_attr = info.external_attr
+            dst.writestr(out_info, outcome[0])
+            reports.append(_member_report(name, name_encoding, data_len, outcome))
+
+        for info in src.infolist():
+            name, name_encoding = _zip_member_name(info)
+            if info.is_dir():
+                dst.writestr(zipfile.ZipInfo(name, date_time=info.date_time), b"")
+                reports.append(
+                    ArchiveMemberReport(name=name, original_name_encoding=name_encoding, status="directory")
+                )
+                continue
+
+            try:
+                with src.open(info) as member:
+                    data = budget.read_member(member, info.file_size)
+            except (NotImplementedError, RuntimeError):
+                # 未対応の圧縮方式（implode など）は NotImplementedError、
+                # 暗号化されたメンバは RuntimeError。展開できないので格納しない
+                reports.append(_skipped_report(name, name_encoding, info.file_size, "unsupported_member"))
+                continue
+            if data is None:
+                reports.append(_skipped_report(name, name_encoding, info.file_size))
+                continue
+            for item, outcome in window.submit((info, name, name_encoding, len(data)), data, target_encoding):
+                write(item, outcome)
+        for item, outcome in window.drain():
+            write(item, outcome)
+
+    return reports
+
+
+def _repair_tar(source, destination, target_encoding, window, budget, archive_format) -> List[ArchiveMemberReport]:
+    reports: List[ArchiveMemberReport] = []
+    write_mode = "w|gz" if archive_format == "tar.gz" else "w|"
+
+    # ストリームモード（r|* / w|*）でメンバを先頭から順に読み書きする
+    with tarfile.open(
+        fileobj=source, mode="r|*", encoding="utf-8", errors="surrogateescape"
+    ) as src, tarfile.open(
+        fileobj=destination, mode=write_mode, format=tarfile.PAX_FORMAT, encoding="utf-8"
+    ) as dst:
+
+        def write(item, outcome) -> None:
+            info, name, name_encoding, data_len = item
+            output = outcome[0]
+            info.name = name
+            info.size = len(output)
+            dst.addfile(info, io.BytesIO(output))
+            reports.append(_member_report(name, name_encoding, data_len, outcome))
+
+        for info in src:
+            name, name_encoding = _tar_member_name(info)
+            if not info.isfile():
+                info.name = name
+                dst.addfile(info)
+                reports.append(
+                    ArchiveMemberReport(name=name, original_name_encoding=name_encoding, status="not_a_file")
+                )
+                continue
+
+            member = src.extractfile(info)
+            data = budget.read_member(member, info.size) if member is not None else b""
+            if data is None:
+                # ストリームモードでは読み飛ばす場合も展開は必要なので、合計には宣言サイズを数える
+                budget.charge(info.size)
+                reports.append(_skipped_report(name, name_encoding, info.size))
+                continue
+            for item, outcome in window.submit((info, name, name_encoding, len(data)), data, target_encoding):
+                write(item, outcome)
+        for item, outcome in window.drain():
+            write(item, outcome)
+
+    return reports
+
+
+def repair_archive_v2(
+    request: ArchiveRepairRequestV2,
+    max_decompressed_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+) -> ArchiveRepairResponse:
+    """
+    アーカイブ修復 API のメインエントリ。
+
+    - Base64 をデコード
+    - repair_archive で各メンバを修復（展開後の合計・メンバごとの上限は max_decompressed_bytes）
+    - 修復後アーカイブ（Base64）とメンバごとのレポートを返す
+    """
+    started = time.perf_counter()
+
+    def respond(status: str, archive: bytes = b"", archive_format=None, members=None, input_len=0):
+        members = members or []
+        return ArchiveRepairResponse(
+            result=ArchiveRepairResult(
+                archive_base64=base64.b64encode(archive).decode("ascii"),
+                archive_format=archive_format,
+                members=members,
+            ),
+            meta=ArchiveRepairMeta(
+                status=status,
+                execution_ms=(time.perf_counter() - started) * 1000.0,
+                input_bytes_length=input_len,
+                member_count=len(members),
+                changed_count=sum(1 for m in members if m.changed),
+            ),
+        )
+
+    target_encoding = normalize_encoding_name(request.target_encoding)
+    if target_encoding is None:
+        return respond("invalid_encoding_name")
+
+    raw, base64_error = _decode_base64(request.raw_bytes_base64)
+    if base64_error is not None or raw is None:
+        return respond(base64_error or "invalid_base64")
+
+    destination = io.BytesIO()
+    try:
+        archive_format, members = repair_archive(
+            io.BytesIO(raw),
+            destination,
+            target_encoding,
+            max_member_bytes=max_decompressed_bytes,
+            max_total_bytes=max_decompressed_bytes,
+        )
+    except DecompressionError as exc:
+        return respond(exc.status, input_len=len(raw))
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError, NotImplementedError, RuntimeError):
+        return respond("invalid_archive", input_len=len(raw))
+
+    if archive_format is None:
+        return respond("unsupported_archive_format", input_len=len(raw))
+
+    return respond("ok", destination.getvalue(), archive_format, members, len(raw))
@@ -0,0 +1,78 @@
+# core/charset_sniff.py
+
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Tuple
+
+
+# 宣言を探す先頭バイト数（HTML の <meta> / XML 宣言は通常先頭 1KB 以内にある）
+SNIFF_PREFIX_BYTES = 4096
+
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+# <?xml version="1.0" encoding="Shift_JIS"?>（文書の先頭のみ）
+_XML_DECLARATION_RE = re.compile(
+    rb"""^\s*<\?xml[^>]*?\sencoding\s*=\s*["']([A-Za-z0-9._:\-]+)["']""",
+    re.IGNORECASE,
+)
+
+# <meta charset="..."> と <meta http-equiv="Content-Type" content="text/html; charset=...">
+_META_CHARSET_RE = re.compile(
+    rb"""<meta\s[^>]*?charset\s*=\s*["']?\s*([A-Za-z0-9._:\-]+)""",
+    re.IGNORECASE,
+)
+
+# Content-Type ヘッダ値の charset パラメータ
+_CONTENT_TYPE_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([^"';\s]+)""", re.IGNORECASE)
+
+
+def parse_content_type_charset(value: Optional[str]) -> Optional[str]:
+    """
+    Content-Type ヘッダ値（"text/html; charset=Shift_JIS"）から charset を取り出す。
+    "/" も "=" も含まない値は charset 名そのものとみなす。
+    """
+    if not value:
+        return None
+    match = _CONTENT_TYPE_CHARSET_RE.search(value)
+    if match is not None:
+        return match.group(1)
+    value = value.strip()
+    if value and "/" not in value and "=" not in value and ";" not in value:
+        return value
+    return None
+
+
+def sniff_charset_candidates(raw: bytes, charset_hint: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    宣言されている charset の候補を優先順に (名前, 出所) のリストで返す。
+
+    優先順位は WHATWG の判定順に合わせる:
+      1. BOM（"bom"）
+      2. 呼び出し側のヒント / Content-Type（"content_type"）
+      3. XML 宣言（"xml_declaration"）
+      4. <meta charset> / <meta http-equiv>（"meta"）
+
+    本文の走査は先頭 SNIFF_PREFIX_BYTES バイトに限る。名前の解決と検証は呼び出し側で行う。
+    """
+    candidates: List[Tuple[str, str]] = []
+    if raw.startswith(_UTF8_BOM):
+        candidates.append(("utf-8", "bom"))
+
+    hinted = parse_content_type_charset(charset_hint)
+    if hinted:
+        candidates.append((hinted, "content_type"))
+
+    prefix = raw[:SNIFF_PREFIX_BYTES]
+    if b"<" not in prefix:
+        return candidates
+
+    match = _XML_DECLARATION_RE.match(prefix.removeprefix(_UTF8_BOM))
+    if match is not None:
+        candidates.append((match.group(1).decode("ascii"), "xml_declaration"))
+
+    match = _META_CHARSET_RE.search(prefix)
+    if match is not None:
+        candidates.append((match.group(1).decode("ascii"), "meta"))
+
+    return candidates
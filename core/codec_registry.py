@@ -0,0 +1,131 @@
+# core/codec_registry.py
+
+from __future__ import annotations
+
+import codecs
+import threading
+from typing import Dict, Optional, Tuple
+
+
+# 対応エンコーディングの正規名（detected_path などに使う名前）
+SUPPORTED_ENCODINGS: Tuple[str, ...] = (
+    "utf-8",
+    "cp932",
+    "euc_jp",
+    "iso2022_jp",
+    "latin1",
+)
+
+# よく使われる別名 → 正規名
+# Shift_JIS 系のラベルは WHATWG Encoding Standard と同様に cp932（Windows-31J）として扱う。
+ENCODING_ALIASES: Dict[str, str] = {
+    "utf-8": "utf-8",
+    "utf8": "utf-8",
+    "utf_8": "utf-8",
+    "cp932": "cp932",
+    "ms932": "cp932",
+    "ms_kanji": "cp932",
+    "windows-31j": "cp932",
+    "windows_31j": "cp932",
+    "shift_jis": "cp932",
+    "shift-jis": "cp932",
+    "sjis": "cp932",
+    "s_jis": "cp932",
+    "x-sjis": "cp932",
+    "euc_jp": "euc_jp",
+    "euc-jp": "euc_jp",
+    "eucjp": "euc_jp",
+    "ujis": "euc_jp",
+    "iso2022_jp": "iso2022_jp",
+    "iso-2022-jp": "iso2022_jp",
+    "csiso2022jp": "iso2022_jp",
+    "jis": "iso2022_jp",
+    "latin1": "latin1",
+    "latin-1": "latin1",
+    "iso-8859-1": "latin1",
+    "iso8859-1": "latin1",
+    "iso_8859_1": "latin1",
+    "l1": "latin1",
+}
+
+# 正規化前の名前（小文字化済み）→ (正規名, CodecInfo)
+_codec_cache: Dict[str, Tuple[str, codecs.CodecInfo]] = {}
+_cache_lock = threading.Lock()
+
+
+def _cache_key(name: str) -> str:
+    return name.strip().lower()
+
+
+def _resolve(name: str) -> Optional[Tuple[str, codecs.CodecInfo]]:
+    key = _cache_key(name)
+    cached = _codec_cache.get(key)
+    if cached is not None:
+        return cached
+
+    canonical = ENCODING_ALIASES.get(key)
+    try:
+        info = codecs.lookup(canonical or key)
+    except LookupError:
+        return None
+    if not getattr(info, "_is_text_encoding", True):
+        # hex / base64 / zlib / rot13 などのバイト列 ⇔ バイト列（文字列 ⇔ 文字列）変換は
+        # 文字エンコーディングではないため未知の名前と同様に扱う
+        return None
+
+    # 別名表にない名前は Python のコーデック名を正規名とする
+    entry = (canonical or info.name, info)
+    with _cache_lock:
+        _codec_cache[key] = entry
+    return entry
+
+
+def normalize_encoding_name(name: Optional[str]) -> Optional[str]:
+    """
+    エンコーディング名を正規名に変換する。
+
+    例: "Shift_JIS" / "sjis" / "windows-31j" → "cp932"
+    未知の名前、およびテキストエンコーディングでないコーデック（"hex" など）は None を返す。
+    """
+    if not name:
+        return None
+    entry = _resolve(name)
+    return entry[0] if entry is not None else None
+
+
+def lookup_codec(name: str) -> Optional[codecs.CodecInfo]:
+    """キャッシュ済みの CodecInfo を返す。未知の名前の場合は None。"""
+    entry = _resolve(name)
+    return entry[1] if entry is not None else None
+
+
+def get_incremental_decoder(encoding: str, errors: str = "strict") -> codecs.IncrementalDecoder:
+    """
+    キャッシュ済み CodecInfo からインクリメンタルデコーダを生成する。
+    未知の名前の場合は codecs.lookup と同様に LookupError を送出する。
+    """
+    info = lookup_codec(encoding)
+    if info is None:
+        raise LookupError(f"unknown encoding: {encoding}")
+    return info.incrementaldecoder(errors)
+
+
+def warm_codec_cache() -> None:
+    """
+    プロセス起動時に呼び出し、対応エンコーディングと別名を解決・キャッシュする。
+
+    cp932 / euc_jp などの CJK コーデックは初回利用時にモジュール読み込みと
+    マッピングテーブルの初期化が走るため、ここで一度デコードまで実行しておき、
+    新規コンテナ（Lambda のコールドスタート）の初回リクエストに
+    そのコストが乗らないようにする。
+    """
+    for name in (*SUPPORTED_ENCODINGS, *ENCODING_ALIASES):
+        _resolve(name)
+
+    for name in SUPPORTED_ENCODINGS:
+        info = lookup_codec(name)
+        if info is None:  # pragma: no cover - 標準ライブラリのコーデック
+            continue
+        for errors in ("strict", "ignore"):
+            info.incrementaldecoder(errors).decode(b"warm-up", final=True)
+        info.encode("あ", "replace")
@@ -0,0 +1,227 @@
+# core/columnar.py
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .codec_registry import normalize_encoding_name
+from .encoding_repair_v2 import (
+    _BAD_CONTROL_RE,
+    _auto_repair,
+    _is_plain_ascii,
+    _score_from_counts,
+    _score_to_confidence,
+)
+
+try:  # Arrow 配列・IPC ファイルの入出力は任意依存
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # pragma: no cover - 環境依存
+    pyarrow = None
+
+
+# セル単位の結果: (fixed_text, detected_path, confidence, status)
+_CellResult = Tuple[str, Optional[str], float, str]
+
+
+@dataclass(slots=True)
+class ColumnRepairResult:
+    """
+    列単位の修復結果。各リストは入力セルと同じ順序・同じ長さ。
+    null セルは fixed_text / detected_path が None、status が "null"。
+    """
+    fixed_texts: List[Optional[str]] = field(default_factory=list)
+    detected_paths: List[Optional[str]] = field(default_factory=list)
+    confidences: List[float] = field(default_factory=list)
+    statuses: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.fixed_texts)
+
+    def extend(self, other: "ColumnRepairResult") -> None:
+        self.fixed_texts.extend(other.fixed_texts)
+        self.detected_paths.extend(other.detected_paths)
+        self.confidences.extend(other.confidences)
+        self.statuses.extend(other.statuses)
+
+
+def _repair_ascii_column(
+    span: bytes,
+    offsets: Sequence[int],
+    valid: Optional[Sequence[bool]],
+    target_encoding: str,
+) -> ColumnRepairResult:
+    """
+    セルのデータ範囲全体（span = data[offsets[0]:offsets[-1]]）が ASCII（ESC なし）の場合の高速パス。
+
+    範囲を 1 回だけデコードし、バイトオフセット = 文字オフセットとしてスライスする。
+    Auto 判定は常に utf-8（変更なし）になるため、候補評価を省略する。
+    """
+    text = span.decode("ascii")
+    base = offsets[0]
+    has_controls = _BAD_CONTROL_RE.search(text) is not None
+    detected_path = f"utf-8->{target_encoding}"
+
+    result = ColumnRepairResult()
+    for index in range(len(offsets) - 1):
+        if valid is not None and not valid[index]:
+            result.fixed_texts.append(None)
+            result.detected_paths.append(None)
+            result.confidences.append(0.0)
+            result.statuses.append("null")
+            continue
+        cell = text[offsets[index] - base:offsets[index + 1] - base]
+        bad_control = _BAD_CONTROL_RE.subn("", cell)[1] if has_controls else 0
+        result.fixed_texts.append(cell)
+        result.detected_paths.append(detected_path)
+        result.confidences.append(_score_to_confidence(_score_from_counts(len(cell), 0, bad_control, False)))
+        result.statuses.append("ok")
+    return result
+
+
+def repair_binary_column(
+    data: bytes,
+    offsets: Sequence[int],
+    valid: Optional[Sequence[bool]] = None,
+    target_encoding: str = "utf-8",
+) -> ColumnRepairResult:
+    """
+    Arrow の binary 配列と同じ形式（連結データ + オフセット）の列をセルごとに Auto 修復する。
+
+    - data: 全セルを連結したバイト列
+    - offsets: セル i は data[offsets[i]:offsets[i + 1]]（長さはセル数 + 1）
+    - valid: セルごとの有効フラグ（None ならすべて有効）
+    - target_encoding: 正規化済みの出力エンコーディング名
+
+    Pydantic モデル・Base64 を経由せず、以下で 1 セルあたりのコストを抑える。
+      - データバッファ全体が ASCII なら候補評価なしで一括デコード
+      - 同じバイト列のセルは 1 回だけ判定して結果を再利用
+    """
+    view = memoryview(data)
+    span = bytes(view[offsets[0]:offsets[-1]])
+    if _is_plain_ascii(span):
+        return _repair_ascii_column(span, offsets, valid, target_encoding)
+
+    cache: Dict[bytes, _CellResult] = {}
+    result = ColumnRepairResult()
+    for index in range(len(offsets) - 1):
+        if valid is not None and not valid[index]:
+            result.fixed_texts.append(None)
+            result.detected_paths.append(None)
+            result.confidences.append(0.0)
+            result.statuses.append("null")
+            continue
+
+        raw = bytes(view[offsets[index]:offsets[index + 1]])
+        cell = cache.get(raw)
+        if cell is None:
+            text, _, detected_path, score, status, _ = _auto_repair(raw, target_encoding)
+            cell = (text, detected_path, _score_to_confidence(score), status)
+            cache[raw] = cell
+
+        result.fixed_texts.append(cell[0])
+        result.detected_paths.append(cell[1])
+        result.confidences.append(cell[2])
+        result.statuses.append(cell[3])
+    return result
+
+
+def repair_binary_values(
+    values: Iterable[Optional[bytes]],
+    target_encoding: str = "utf-8",
+) -> ColumnRepairResult:
+    """bytes（または None）のリストを連結データ + オフセットに変換して repair_binary_column に渡す。"""
+    chunks: List[bytes] = []
+    offsets = [0]
+    valid: List[bool] = []
+    for value in values:
+        valid.append(value is not None)
+        if value:
+            chunks.append(value)
+        offsets.append(offsets[-1] + (len(value) if value else 0))
+    return repair_binary_column(b"".join(chunks), offsets, valid, target_encoding)
+
+
+def _require_pyarrow() -> None:
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is required for Arrow input/output")
+
+
+def _repair_arrow_chunk(array, target_encoding: str) -> ColumnRepairResult:
+    """binary / large_binary 配列のバッファを直接参照して修復する（セルごとの bytes 変換をしない）。"""
+    if pyarrow.types.is_large_binary(array.type) or pyarrow.types.is_large_string(array.type):
+        offset_format = "q"
+    elif pyarrow.types.is_binary(array.type) or pyarrow.types.is_string(array.type):
+        offset_format = "i"
+    else:
+        raise TypeError(f"binary column expected, got {array.type}")
+
+    _, offsets_buffer, data_buffer = array.buffers()
+    offsets = memoryview(offsets_buffer).cast("B").cast(offset_format)[array.offset:array.offset + len(array) + 1]
+    data = data_buffer.to_pybytes() if data_buffer is not None else b""
+    valid = array.is_valid().to_pylist() if array.null_count else None
+    return repair_binary_column(data, offsets, valid, target_encoding)
+
+
+def repair_arrow_array(array, target_encoding: str = "utf-8"):
+    """
+    Arrow の binary 配列（Array / ChunkedArray）を修復し、
+    fixed_text / detected_path / confidence / status の 4 列を持つ RecordBatch を返す。
+    """
+    _require_pyarrow()
+    chunks = array.chunks if isinstance(array, pyarrow.ChunkedArray) else [array]
+    result = ColumnRepairResult()
+    for chunk in chunks:
+        result.extend(_repair_arrow_chunk(chunk, target_encoding))
+    return pyarrow.RecordBatch.from_arrays(_result_arrays(result), schema=pyarrow.schema(_result_fields()))
+
+
+def _result_fields(prefix: str = "") -> list:
+    return [
+        pyarrow.field(f"{prefix}fixed_text", pyarrow.string()),
+        pyarrow.field(f"{prefix}detected_path", pyarrow.string()),
+        pyarrow.field(f"{prefix}confidence", pyarrow.float64()),
+        pyarrow.field(f"{prefix}status", pyarrow.string()),
+    ]
+
+
+def _result_arrays(result: ColumnRepairResult) -> list:
+    return [
+        pyarrow.array(result.fixed_texts, type=pyarrow.string()),
+        pyarrow.array(result.detected_paths, type=pyarrow.string()),
+        pyarrow.array(result.confidences, type=pyarrow.float64()),
+        pyarrow.array(result.statuses, type=pyarrow.string()),
+    ]
+
+
+def repair_arrow_ipc_file(
+    source_path: str,
+    dest_path: str,
+    column: str,
+    target_encoding: str = "utf-8",
+) -> int:
+    """
+    Arrow IPC ファイルの binary 列を修復し、元の列に
+    <column>_fixed_text / _detected_path / _confidence / _status を追加した IPC ファイルを書き出す。
+
+    レコードバッチ単位で読み書きするため、ファイル全体をメモリに載せない。
+    処理した行数を返す。
+    """
+    _require_pyarrow()
+    normalized = normalize_encoding_name(target_encoding)
+    if normalized is None:
+        raise ValueError(f"unknown encoding: {target_encoding}")
+
+    rows = 0
+    with pyarrow.ipc.open_file(source_path) as reader:
+        schema = pyarrow.schema([*reader.schema, *_result_fields(f"{column}_")])
+        with pyarrow.ipc.new_file(dest_path, schema) as writer:
+            for index in range(reader.num_record_batches):
+                batch = reader.get_batch(index)
+                repaired = _repair_arrow_chunk(batch.column(column), normalized)
+                writer.write_batch(
+                    pyarrow.RecordBatch.from_arrays([*batch.columns, *_result_arrays(repaired)], schema=schema)
+                )
+                rows += batch.num_rows
+    return rows
@@ -0,0 +1,276 @@
+# core/csv_repair.py
+
+from __future__ import annotations
+
+import csv
+import io
+import time
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator, List, Literal, Optional, TextIO, Tuple
+
+from pydantic import BaseModel, Field
+
+from .codec_registry import normalize_encoding_name
+from .encoding_repair_v2 import (
+    _decode_base64,
+    _evaluate_candidates,
+    _score_to_confidence,
+    _select_candidate,
+)
+
+
+# 列ごとのエンコーディング判定に使う先頭行数
+DEFAULT_SAMPLE_ROWS = 1000
+
+# バイト列のまま分割できる区切り文字。cp932 の 2 バイト目（0x40-0x7e, 0x80-0xfc）や
+# euc_jp / utf-8 のマルチバイト文字に現れない 0x40 未満の ASCII に限る（"|" = 0x7c などは不可）
+CsvDelimiter = Literal[",", "\t", ";"]
+SAFE_DELIMITERS: Tuple[str, ...] = (",", "\t", ";")
+
+# 入力に改行がない場合の出力の行末（csv.writer の既定と同じ）
+DEFAULT_LINE_TERMINATOR = "\r\n"
+
+
+class CsvRepairRequestV2(BaseModel):
+    """
+    CSV / TSV 修復リクエスト（Base64 専用）
+
+    - raw_bytes_base64: CSV ファイルのバイト列を Base64 化したもの
+    - delimiter: 区切り文字 "," / "\\t"（TSV）/ ";"
+    - sample_rows: 列ごとの判定に使う先頭行数
+    - target_encoding: 出力テキストのエンコーディング（基本 "utf-8"）
+    """
+    raw_bytes_base64: str = Field(..., min_length=1)
+    delimiter: CsvDelimiter = Field(default=",")
+    sample_rows: int = Field(default=DEFAULT_SAMPLE_ROWS, ge=1)
+    target_encoding: str = "utf-8"
+
+
+class CsvColumnEncoding(BaseModel):
+    index: int
+    encoding: str
+    detected_path: str
+    confidence: float
+    changed: bool
+
+
+class CsvRepairResult(BaseModel):
+    fixed_text: str
+    target_encoding: str = "utf-8"
+    changed: bool
+
+
+class CsvRepairMeta(BaseModel):
+    version: str = "2.0.0"
+    status: str
+    execution_ms: float
+    input_bytes_length: int
+    row_count: int = 0
+    default_encoding: Optional[str] = None
+    column_encodings: List[CsvColumnEncoding] = Field(default_factory=list)
+
+
+class CsvRepairResponse(BaseModel):
+    result: CsvRepairResult
+    meta: CsvRepairMeta
+
+
+def _detect_column(index: int, values: List[bytes], target_encoding: str) -> CsvColumnEncoding:
+    """列のサンプル値を連結して Auto ロジックで判定する。"""
+    sample = b"\n".join(values)
+    candidates, _ = _evaluate_candidates(sample)
+    selected, changed = _select_candidate(candidates)
+    if selected is None:
+        return CsvColumnEncoding(
+            index=index,
+            encoding="utf-8",
+            detected_path=f"utf-8->{target_encoding}",
+            confidence=0.0,
+            changed=False,
+        )
+    return CsvColumnEncoding(
+        index=index,
+        encoding=selected.encoding,
+        detected_path=f"{selected.encoding}->{target_encoding}",
+        confidence=_score_to_confidence(selected.score),
+        changed=changed,
+    )
+
+
+def detect_column_encodings(
+    rows: List[List[bytes]],
+    target_encoding: str = "utf-8",
+) -> Tuple[List[CsvColumnEncoding], CsvColumnEncoding]:
+    """
+    バイト列の行（サンプル）から列ごとのエンコーディングを判定する。
+
+    (列ごとの判定結果, サンプル全体の判定結果) を返す。
+    後者はサンプルに現れなかった列（列数が不揃いな行）に使う。
+    """
+    column_count = max((len(row) for row in rows), default=0)
+    columns: List[List[bytes]] = [[] for _ in range(column_count)]
+    for row in rows:
+        for index, value in enumerate(row):
+            columns[index].append(value)
+
+    encodings = [_detect_column(index, values, target_encoding) for index, values in enumerate(columns)]
+    default = _detect_column(-1, [value for values in columns for value in values], target_encoding)
+    return encodings, default
+
+
+def _line_terminator(line: str) -> Optional[str]:
+    if line.endswith("\r\n"):
+        return "\r\n"
+    if line.endswith(("\n", "\r")):
+        return line[-1]
+    return None
+
+
+def _record_line_terminator(lines: Iterable[str], terminators: List[str]) -> Iterator[str]:
+    """最初の行の行末（CRLF / LF / CR）を terminators に記録しながら行を返す。"""
+    for line in lines:
+        if not terminators:
+            terminator = _line_terminator(line)
+            if terminator is not None:
+                terminators.append(terminator)
+        yield line
+
+
+def _iter_byte_rows(source: BinaryIO, delimiter: str, terminators: Optional[List[str]] = None):
+    """
+    バイト列のまま CSV を 1 行ずつパースする。
+
+    latin1 はバイトと文字が 1 対 1 に対応するため、latin1 として読んだ
+    フィールドを latin1 でエンコードし直せば元のバイト列に戻る。
+    区切り文字（SAFE_DELIMITERS）・引用符・改行はいずれも 0x40 未満の ASCII で、
+    cp932 の 2 バイト目や euc_jp / utf-8 のマルチバイト文字には現れないため、
+    どの列のエンコーディングでも正しく区切ることができる。
+    （7bit の ISO-2022-JP は 2 バイト文字に 0x21-0x7e を使うため、区切れるのは TSV のみ）
+
+    terminators を渡すと、入力の行末を出力でも使えるよう最初の行の行末を記録する。
+    """
+    if delimiter not in SAFE_DELIMITERS:
+        raise ValueError(f"unsupported delimiter: {delimiter!r}")
+    text_stream = io.TextIOWrapper(source, encoding="latin1", newline="")
+    lines = text_stream if terminators is None else _record_line_terminator(text_stream, terminators)
+    try:
+        yield from csv.reader(lines, delimiter=delimiter)
+    finally:
+        text_stream.detach()
+
+
+def _decode_field(value: str, encoding: str) -> str:
+    if value.isascii() and "\x1b" not in value:
+        # ASCII のみ（ISO-2022-JP の ESC なし）のフィールドはどの候補でも同じ
+        return value
+    return value.encode("latin1").decode(encoding, errors="ignore")
+
+
+def repair_csv_stream(
+    source: BinaryIO,
+    destination: TextIO,
+    delimiter: str = ",",
+    sample_rows: int = DEFAULT_SAMPLE_ROWS,
+    target_encoding: str = "utf-8",
+) -> Tuple[int, List[CsvColumnEncoding], CsvColumnEncoding]:
+    """
+    CSV / TSV を列ごとに異なるエンコーディングで修復しながらストリーム出力する。
+
+    - 先頭 sample_rows 行だけを保持して列ごとに判定
+    - 以降の行は 1 行ずつ列ごとのデコーダで修復して destination に書き出す
+      （保持するのはサンプル行のみなので、メモリ使用量は入力サイズに依存しない）
+    - 出力の行末は入力の最初の行に合わせる（エンコーディングの修復で改行を変えない）
+
+    delimiter は SAFE_DELIMITERS のいずれか（それ以外は ValueError）。
+    (行数, 列ごとの判定結果, サンプル全体の判定結果) を返す。
+    """
+    terminators: List[str] = []
+    rows = _iter_byte_rows(source, delimiter, terminators)
+
+    sample: List[List[str]] = []
+    for row in rows:
+        sample.append(row)
+        if len(sample) >= sample_rows:
+            break
+
+    columns, default = detect_column_encodings(
+        [[value.encode("latin1") for value in row] for row in sample],
+        target_encoding,
+    )
+    column_encodings = [column.encoding for column in columns]
+
+    writer = csv.writer(
+        destination,
+        delimiter=delimiter,
+        lineterminator=terminators[0] if terminators else DEFAULT_LINE_TERMINATOR,
+    )
+    row_count = 0
+    for row in chain(sample, rows):
+        writer.writerow(
+            [
+                _decode_field(
+                    value,
+                    column_encodings[index] if index < len(column_encodings) else default.encoding,
+                )
+                for index, value in enumerate(row)
+            ]
+        )
+        row_count += 1
+
+    return row_count, columns, default
+
+
+def repair_csv_v2(request: CsvRepairRequestV2) -> CsvRepairResponse:
+    """
+    CSV 修復 API のメインエントリ。
+
+    - Base64 をデコード
+    - repair_csv_stream で列ごとに修復
+    - 列ごとの判定結果を meta.column_encodings に返す
+    """
+    started = time.perf_counter()
+
+    def respond(status: str, fixed_text: str = "", input_len: int = 0, **meta_fields) -> CsvRepairResponse:
+        columns = meta_fields.get("column_encodings", [])
+        return CsvRepairResponse(
+            result=CsvRepairResult(
+                fixed_text=fixed_text,
+                target_encoding=request.target_encoding,
+                changed=any(column.changed for column in columns),
+            ),
+            meta=CsvRepairMeta(
+                status=status,
+                execution_ms=(time.perf_counter() - started) * 1000.0,
+                input_bytes_length=input_len,
+                **meta_fields,
+            ),
+        )
+
+    target_encoding = normalize_encoding_name(request.target_encoding)
+    if target_encoding is None:
+        return respond("invalid_encoding_name")
+
+    raw, base64_error = _decode_base64(request.raw_bytes_base64)
+    if base64_error is not None or raw is None:
+        return respond(base64_error or "invalid_base64")
+
+    destination = io.StringIO(newline="")
+    try:
+        row_count, columns, default = repair_csv_stream(
+            io.BytesIO(raw),
+            destination,
+            delimiter=request.delimiter,
+            sample_rows=request.sample_rows,
+            target_encoding=target_encoding,
+        )
+    except csv.Error:
+        return respond("invalid_csv", input_len=len(raw))
+
+    return respond(
+        "ok",
+        destination.getvalue(),
+        len(raw),
+        row_count=row_count,
+        default_encoding=default.encoding,
+        column_encodings=columns,
+    )
@@ -0,0 +1,147 @@
+# core/decode_errors.py
+
+from __future__ import annotations
+
+import codecs
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, List, Literal, Optional, Tuple
+
+from .codec_registry import get_incremental_decoder, lookup_codec
+
+
+ErrorPolicy = Literal["ignore", "replace", "escape"]
+
+# codecs.register_error で登録するエラーハンドラ名
+COUNTING_ERROR_HANDLER = "encoding_repair_count"
+
+# meta に返す不正バイト区間の最大数（隣接区間は結合した上で先頭から）
+MAX_ERROR_SPANS = 64
+
+
+@dataclass(slots=True)
+class DecodeErrorStats:
+    """
+    デコード中に見つかった不正バイト列の集計。
+
+    spans は入力先頭からのバイトオフセット [start, end) のリスト。
+    隣接する区間は 1 つに結合し、MAX_ERROR_SPANS 件で打ち切る（count は打ち切らない）。
+    """
+    count: int = 0
+    invalid_bytes: int = 0
+    spans: List[Tuple[int, int]] = field(default_factory=list)
+
+    def add(self, start: int, end: int) -> None:
+        self.count += 1
+        self.invalid_bytes += end - start
+        if self.spans and self.spans[-1][1] == start:
+            self.spans[-1] = (self.spans[-1][0], end)
+        elif len(self.spans) < MAX_ERROR_SPANS:
+            self.spans.append((start, end))
+
+    def density(self, input_length: int) -> float:
+        """入力バイト数に対する不正バイトの割合。"""
+        return self.invalid_bytes / input_length if input_length else 0.0
+
+
+class _Collector:
+    __slots__ = ("stats", "policy", "stop_on_error", "chunk_end")
+
+    def __init__(self, policy: ErrorPolicy, stop_on_error: bool) -> None:
+        self.stats = DecodeErrorStats()
+        self.policy = policy
+        self.stop_on_error = stop_on_error
+        # 直近の decode() 呼び出しに渡したバイト列の、入力先頭からの終端オフセット
+        self.chunk_end = 0
+
+
+_local = threading.local()
+
+
+def _counting_handler(exc: UnicodeError) -> Tuple[str, int]:
+    collector: Optional[_Collector] = getattr(_local, "collector", None)
+    if collector is None or not isinstance(exc, UnicodeDecodeError):
+        raise exc
+    if collector.stop_on_error:
+        raise exc
+
+    # インクリメンタルデコーダでは exc.object が「保留中のバイト + 今回のチャンク」なので、
+    # チャンク終端から逆算して入力全体でのオフセットに直す
+    base = max(0, collector.chunk_end - len(exc.object))
+    collector.stats.add(base + exc.start, base + exc.end)
+
+    if collector.policy == "replace":
+        return "\ufffd", exc.end
+    if collector.policy == "escape":
+        return "".join(f"\\x{b:02x}" for b in exc.object[exc.start:exc.end]), exc.end
+    return "", exc.end
+
+
+codecs.register_error(COUNTING_ERROR_HANDLER, _counting_handler)
+
+
+class CountingDecoder:
+    """
+    COUNTING_ERROR_HANDLER を使うインクリメンタルデコーダ。
+
+    1 回のデコードで不正バイト列を置換ポリシーに従って処理しつつ、
+    件数と入力全体でのバイト区間を stats に集計する。
+    stop_on_error=True の場合は最初の不正バイトで UnicodeDecodeError を送出する。
+    offset は最初に渡すバイト列の、入力先頭からの位置（区間の基準をずらす場合に使う）。
+    """
+
+    def __init__(
+        self,
+        encoding: str,
+        policy: ErrorPolicy = "ignore",
+        stop_on_error: bool = False,
+        offset: int = 0,
+    ) -> None:
+        self._decoder = get_incremental_decoder(encoding, COUNTING_ERROR_HANDLER)
+        self._collector = _Collector(policy, stop_on_error)
+        self._collector.chunk_end = offset
+
+    @property
+    def stats(self) -> DecodeErrorStats:
+        return self._collector.stats
+
+    def getstate(self) -> Tuple[bytes, int]:
+        """(未完了のバイト列, デコーダ内部の状態) を返す（IncrementalDecoder.getstate と同じ）。"""
+        return self._decoder.getstate()
+
+    def setstate(self, state: Tuple[bytes, int]) -> None:
+        """getstate() の値（別のデコーダから取得したものでもよい）から状態を復元する。"""
+        self._decoder.setstate(state)
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        collector = self._collector
+        collector.chunk_end += len(data)
+        with _collecting(collector):
+            return self._decoder.decode(data, final=final)
+
+
+@contextmanager
+def _collecting(collector: _Collector) -> Iterator[None]:
+    previous = getattr(_local, "collector", None)
+    _local.collector = collector
+    try:
+        yield
+    finally:
+        _local.collector = previous
+
+
+def decode_counting(
+    raw: bytes,
+    encoding: str,
+    policy: ErrorPolicy = "ignore",
+) -> Tuple[str, DecodeErrorStats]:
+    """raw を 1 回だけデコードし、(テキスト, 不正バイトの集計) を返す。"""
+    info = lookup_codec(encoding)
+    if info is None:
+        raise LookupError(f"unknown encoding: {encoding}")
+    collector = _Collector(policy, stop_on_error=False)
+    collector.chunk_end = len(raw)
+    with _collecting(collector):
+        text, _ = info.decode(raw, COUNTING_ERROR_HANDLER)
+    return text, collector.stats
@@ -0,0 +1,180 @@
+# core/decompression.py
+
+from __future__ import annotations
+
+import zlib
+from typing import Iterable, Iterator, List, Literal, Optional
+
+try:  # zstd 入力は任意依存
+    import zstandard
+except ImportError:  # pragma: no cover - 環境依存
+    zstandard = None
+
+
+Compression = Literal["none", "gzip", "deflate", "zstd"]
+
+# 1 回の展開で取り出す最大バイト数（展開後の全体をメモリに載せない）
+DECOMPRESS_CHUNK_SIZE = 256 * 1024
+
+# 展開後サイズの上限と、圧縮率（展開後 / 圧縮前）の上限
+DEFAULT_MAX_DECOMPRESSED_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_DECOMPRESSION_RATIO = 200
+# 小さな入力は圧縮率が極端になりやすいので、この展開後サイズまでは圧縮率を見ない
+RATIO_CHECK_FLOOR_BYTES = 1024 * 1024
+
+# Content-Encoding ヘッダ値 → Compression
+CONTENT_ENCODINGS = {
+    "identity": "none",
+    "gzip": "gzip",
+    "x-gzip": "gzip",
+    "deflate": "deflate",
+    "zstd": "zstd",
+}
+
+
+class DecompressionError(ValueError):
+    """
+    展開に失敗した。status はレスポンスの meta.status にそのまま使う。
+
+    - decompression_limit_exceeded: 展開後サイズまたは圧縮率の上限を超えた（zip bomb 対策）
+    - invalid_compressed_payload: 圧縮データとして不正、または途中で切れている
+    - zstd_unavailable: zstandard パッケージがない
+    """
+
+    def __init__(self, status: str) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+def _is_zlib_header(data: bytes) -> bool:
+    return len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0
+
+
+class StreamingDecompressor:
+    """
+    圧縮データをチャンク単位で展開する。
+
+    decompress() は 1 回あたり最大 DECOMPRESS_CHUNK_SIZE バイトずつ展開結果を返すため、
+    展開後の全体を保持しない。展開後の累計が max_output_bytes を超えるか、
+    RATIO_CHECK_FLOOR_BYTES を超えた後で圧縮率が max_ratio を超えた時点で打ち切る。
+
+    - gzip: 連結された複数メンバにも対応
+    - deflate: HTTP の deflate（zlib ヘッダ付き）。ヘッダがなければ raw deflate とみなす
+    - zstd: zstandard パッケージが必要
+    """
+
+    def __init__(
+        self,
+        compression: Compression,
+        max_output_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+        max_ratio: float = DEFAULT_MAX_DECOMPRESSION_RATIO,
+    ) -> None:
+        if compression == "zstd" and zstandard is None:
+            raise DecompressionError("zstd_unavailable")
+        self.compression = compression
+        self.max_output_bytes = max_output_bytes
+        self.max_ratio = max_ratio
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self._decompressor = None
+
+    def _new_decompressor(self, head: bytes):
+        if self.compression == "gzip":
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.compression == "deflate":
+            return zlib.decompressobj(zlib.MAX_WBITS if _is_zlib_header(head) else -zlib.MAX_WBITS)
+        # zstd の decompressobj は出力量を制限できないため、入力を小さく分けて渡す
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    def _account(self, data: bytes) -> bytes:
+        self.output_bytes += len(data)
+        if self.output_bytes > self.max_output_bytes:
+            raise DecompressionError("decompression_limit_exceeded")
+        if (
+            self.output_bytes > RATIO_CHECK_FLOOR_BYTES
+            and self.output_bytes > self.max_ratio * max(self.input_bytes, 1)
+        ):
+            raise DecompressionError("decompression_limit_exceeded")
+        return data
+
+    def decompress(self, chunk: bytes) -> Iterator[bytes]:
+        """圧縮データのチャンクを渡し、展開結果を DECOMPRESS_CHUNK_SIZE 以下の単位で返す。"""
+        self.input_bytes += len(chunk)
+        if self.compression == "zstd":
+            yield from self._decompress_zstd(chunk)
+            return
+
+        data = chunk
+        while data:
+            if self._decompressor is None or self._decompressor.eof:
+                if self._decompressor is not None and self.compression != "gzip":
+                    # gzip 以外は 1 ストリームのみ
+                    raise DecompressionError("invalid_compressed_payload")
+                self._decompressor = self._new_decompressor(data)
+            decompressor = self._decompressor
+            # 出力上限で止まった入力は unconsumed_tail に残る。入力を使い切っていても
+            # 出力が上限ちょうどなら展開待ちのデータが残っている可能性がある
+            pending = data
+            while True:
+                try:
+                    out = decompressor.decompress(pending, DECOMPRESS_CHUNK_SIZE)
+                except zlib.error:
+                    raise DecompressionError("invalid_compressed_payload") from None
+                if out:
+                    yield self._account(out)
+                pending = decompressor.unconsumed_tail
+                if decompressor.eof or (not pending and len(out) < DECOMPRESS_CHUNK_SIZE):
+                    break
+            # ストリーム終端以降（gzip の次のメンバ）は unused_data に残る
+            data = decompressor.unused_data if decompressor.eof else b""
+
+    def _decompress_zstd(self, chunk: bytes) -> Iterator[bytes]:
+        if self._decompressor is None:
+            self._decompressor = self._new_decompressor(chunk)
+        view = memoryview(chunk)
+        # 1 回に渡す入力を小さくし、1 回あたりの展開量（最大でも入力 × 圧縮率）を抑える
+        step = max(1, DECOMPRESS_CHUNK_SIZE // 256)
+        for start in range(0, len(chunk), step):
+            try:
+                out = self._decompressor.decompress(view[start:start + step])
+            except zstandard.ZstdError:
+                raise DecompressionError("invalid_compressed_payload") from None
+            for offset in range(0, len(out), DECOMPRESS_CHUNK_SIZE):
+                yield self._account(out[offset:offset + DECOMPRESS_CHUNK_SIZE])
+
+    def finish(self) -> None:
+        """入力終端。圧縮ストリームが途中で切れていれば DecompressionError を送出する。"""
+        if self._decompressor is None or not self._decompressor.eof:
+            raise DecompressionError("invalid_compressed_payload")
+
+
+def max_decompressed_size(
+    compressed_bytes: int,
+    max_output_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+    max_ratio: float = DEFAULT_MAX_DECOMPRESSION_RATIO,
+) -> int:
+    """compressed_bytes の圧縮データを展開したときに許容する展開後サイズの上限。"""
+    return min(max_output_bytes, max(RATIO_CHECK_FLOOR_BYTES, int(compressed_bytes * max_ratio)))
+
+
+def iter_decompressed(
+    chunks: Iterable[bytes],
+    compression: Compression,
+    max_output_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+    max_ratio: float = DEFAULT_MAX_DECOMPRESSION_RATIO,
+) -> Iterator[bytes]:
+    """圧縮データのチャンク列を展開しながら返す。失敗時は DecompressionError を送出する。"""
+    decompressor = StreamingDecompressor(compression, max_output_bytes, max_ratio)
+    for chunk in chunks:
+        yield from decompressor.decompress(chunk)
+    decompressor.finish()
+
+
+def parse_content_encoding(value: Optional[str]) -> Optional[Compression]:
+    """Content-Encoding ヘッダ値を Compression に変換する（未対応・複数指定は None）。"""
+    if not value:
+        return "none"
+    codings: List[str] = [c.strip().lower() for c in value.split(",") if c.strip()]
+    if len(codings) != 1:
+        return None
+    return CONTENT_ENCODINGS.get(codings[0])
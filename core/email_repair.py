@@ -0,0 +1,243 @@
+# core/email_repair.py
+
+from __future__ import annotations
+
+import io
+import re
+import time
+from email.errors import HeaderParseError
+from email.header import decode_header
+from email.message import Message
+from email.parser import BytesParser
+from email.policy import compat32
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from .codec_registry import normalize_encoding_name
+from .encoding_repair_v2 import (
+    _decode_base64,
+    _evaluate_candidates,
+    _materialize_text,
+    _score_to_confidence,
+    _select_candidate,
+    verify_declared_encoding,
+)
+
+
+class EmailRepairRequestV2(BaseModel):
+    """
+    メール修復リクエスト（Base64 専用）
+
+    - raw_bytes_base64: メール（RFC 5322）または mbox ファイルのバイト列を Base64 化したもの
+    - mbox: True の場合は mbox として複数メッセージに分割して処理する
+    - target_encoding: 出力テキストのエンコーディング（基本 "utf-8"）
+    """
+    raw_bytes_base64: str = Field(..., min_length=1)
+    mbox: bool = False
+    target_encoding: str = "utf-8"
+
+
+class EmailHeader(BaseModel):
+    name: str
+    value: str
+
+
+class EmailPart(BaseModel):
+    content_type: str
+    filename: Optional[str] = None
+    declared_charset: Optional[str] = None
+    charset_trusted: bool = False
+    detected_path: Optional[str] = None
+    confidence: float = 0.0
+    status: str
+    text: str = ""
+
+
+class EmailMessageResult(BaseModel):
+    headers: List[EmailHeader]
+    parts: List[EmailPart]
+
+
+class EmailRepairResult(BaseModel):
+    messages: List[EmailMessageResult]
+    target_encoding: str = "utf-8"
+
+
+class EmailRepairMeta(BaseModel):
+    version: str = "2.0.0"
+    status: str
+    execution_ms: float
+    input_bytes_length: int
+    message_count: int = 0
+
+
+class EmailRepairResponse(BaseModel):
+    result: EmailRepairResult
+    meta: EmailRepairMeta
+
+
+# mboxrd: 本文中の "From " 行は ">From " にエスケープされている
+_MBOX_FROM_ESCAPE_RE = re.compile(rb"^>(>*From )")
+# ヘッダの折り返し（CRLF + 空白）
+_HEADER_FOLDING_RE = re.compile(r"\r?\n(?=[ \t])")
+# 空白だけで区切られた RFC 2047 の encoded-word の連続（間の空白は表示しない）
+_ENCODED_WORD = r"=\?[^?\s]+\?[bBqQ]\?[^?\s]*\?="
+_ENCODED_WORDS_RE = re.compile(rf"({_ENCODED_WORD}(?:\s+{_ENCODED_WORD})*)")
+
+
+def _repair_bytes(raw: bytes, declared: Optional[str]) -> Tuple[str, Optional[str], bool, float]:
+    """
+    宣言 charset が信頼できればそれでデコードし、できなければ Auto ロジックで判定する。
+    (テキスト, 使用したエンコーディング, 宣言を採用したか, confidence) を返す。
+    """
+    encoding, text = verify_declared_encoding(raw, declared)
+    if encoding is not None and text is not None:
+        return text, encoding, True, 1.0
+
+    candidates, _ = _evaluate_candidates(raw)
+    selected, _ = _select_candidate(candidates)
+    if selected is None:
+        return raw.decode("utf-8", errors="ignore"), None, False, 0.0
+    return _materialize_text(raw, selected), selected.encoding, False, _score_to_confidence(selected.score)
+
+
+def decode_mime_header(value: str) -> str:
+    """
+    RFC 2047 の encoded-word（=?ISO-2022-JP?B?...?=）を含むヘッダ値をデコードする。
+
+    charset が信頼できない encoded-word や、エンコードされずに 8bit のまま
+    入っているヘッダ（cp932 の Subject など）は Auto ロジックで判定する。
+    encoded-word と 8bit の部分が混在する場合は、encoded-word の連続とそれ以外の部分に
+    分けてそれぞれデコードする（decode_header は混在した値の 8bit 部分を復元しない）。
+    """
+    value = _HEADER_FOLDING_RE.sub("", value)
+    fragments = []
+    # re.split はキャプチャした encoded-word の連続を奇数番目に返す
+    for index, segment in enumerate(_ENCODED_WORDS_RE.split(value)):
+        if index % 2:
+            try:
+                decoded = decode_header(segment)
+            except HeaderParseError:
+                decoded = None
+            if decoded is not None:
+                for fragment, charset in decoded:
+                    text, _, _, _ = _repair_bytes(fragment, charset)
+                    fragments.append(text)
+                continue
+        # encoded-word 以外の部分: 8bit バイトはパーサが surrogateescape で保持している
+        if segment.isascii():
+            fragments.append(segment)
+            continue
+        text, _, _, _ = _repair_bytes(segment.encode("ascii", errors="surrogateescape"), None)
+        fragments.append(text)
+    return "".join(fragments)
+
+
+def _repair_part(part: Message, target_encoding: str) -> EmailPart:
+    content_type = part.get_content_type()
+    filename = part.get_filename()
+    if filename is not None:
+        filename = decode_mime_header(filename)
+
+    if part.get_content_maintype() != "text":
+        return EmailPart(content_type=content_type, filename=filename, status="skipped_non_text")
+
+    payload = part.get_payload(decode=True) or b""
+    declared = part.get_content_charset()
+    text, encoding, trusted, confidence = _repair_bytes(payload, declared)
+    return EmailPart(
+        content_type=content_type,
+        filename=filename,
+        declared_charset=declared,
+        charset_trusted=trusted,
+        detected_path=f"{encoding}->{target_encoding}" if encoding is not None else None,
+        confidence=confidence,
+        status="ok",
+        text=text,
+    )
+
+
+def repair_email_message(raw: bytes, target_encoding: str = "utf-8") -> EmailMessageResult:
+    """
+    1 通のメールをパースし、ヘッダと各テキストパートを修復する。
+
+    - ヘッダ: RFC 2047 encoded-word をデコード（8bit ヘッダは Auto 判定）
+    - 本文: 宣言 charset が信頼できればそれを使い、できなければ Auto 判定
+    - text/* 以外のパート（添付ファイルなど）は skipped_non_text として報告のみ
+    """
+    message = BytesParser(policy=compat32).parsebytes(raw)
+
+    headers = [EmailHeader(name=name, value=decode_mime_header(value)) for name, value in message.raw_items()]
+    parts = [
+        _repair_part(part, target_encoding)
+        for part in message.walk()
+        if not part.is_multipart()
+    ]
+    return EmailMessageResult(headers=headers, parts=parts)
+
+
+def iter_mbox_messages(source: BinaryIO) -> Iterator[bytes]:
+    """
+    mbox を 1 メッセージずつのバイト列に分割する。
+
+    ファイルを行単位で読み、保持するのは処理中の 1 メッセージ分のみなので、
+    巨大な mbox でもメモリ使用量はメッセージサイズで抑えられる。
+    """
+    lines: List[bytes] = []
+    previous_blank = True
+    for line in source:
+        if previous_blank and line.startswith(b"From "):
+            # 区切り行（From_ 行）自体はメッセージに含めない
+            if lines:
+                yield b"".join(lines)
+            lines = []
+            previous_blank = False
+            continue
+        lines.append(_MBOX_FROM_ESCAPE_RE.sub(rb"\1", line))
+        previous_blank = line in (b"\n", b"\r\n")
+    if lines:
+        yield b"".join(lines)
+
+
+def iter_repaired_mbox(source: BinaryIO, target_encoding: str = "utf-8") -> Iterator[EmailMessageResult]:
+    """mbox を 1 メッセージずつ修復して返す。"""
+    for raw in iter_mbox_messages(source):
+        yield repair_email_message(raw, target_encoding)
+
+
+def repair_email_v2(request: EmailRepairRequestV2) -> EmailRepairResponse:
+    """
+    メール修復 API のメインエントリ。
+
+    - Base64 をデコード
+    - mbox の場合はメッセージごとに、そうでなければ 1 通として修復
+    """
+    started = time.perf_counter()
+
+    def respond(status: str, messages=None, input_len: int = 0) -> EmailRepairResponse:
+        messages = messages or []
+        return EmailRepairResponse(
+            result=EmailRepairResult(messages=messages, target_encoding=request.target_encoding),
+            meta=EmailRepairMeta(
+                status=status,
+                execution_ms=(time.perf_counter() - started) * 1000.0,
+                input_bytes_length=input_len,
+                message_count=len(messages),
+            ),
+        )
+
+    target_encoding = normalize_encoding_name(request.target_encoding)
+    if target_encoding is None:
+        return respond("invalid_encoding_name")
+
+    raw, base64_error = _decode_base64(request.raw_bytes_base64)
+    if base64_error is not None or raw is None:
+        return respond(base64_error or "invalid_base64")
+
+    if request.mbox:
+        messages = list(iter_repaired_mbox(io.BytesIO(raw), target_encoding))
+    else:
+        messages = [repair_email_message(raw, target_encoding)]
+
+    return respond("ok", messages, len(raw))
@@ -0,0 +1,171 @@
+# core/encoding_repair_stream.py
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator, Optional
+
+from .decode_errors import CountingDecoder, DecodeErrorStats, ErrorPolicy
+from .encoding_repair_v2 import (
+    _evaluate_candidates,
+    _score_to_confidence,
+    _select_candidate,
+)
+from .normalization import TextNormalizer
+
+
+# 先頭の非 ASCII バイトからこのバイト数が溜まった時点で判定する
+DEFAULT_DETECTION_WINDOW = 64 * 1024
+
+# ASCII 以外、または ESC（ISO-2022-JP の可能性があり判定が必要なバイト）
+_NEEDS_DETECTION_RE = re.compile(rb"[\x80-\xff\x1b]")
+
+
+class StreamingRepairer:
+    """
+    ストリーミング版の Auto 修復エンジン。
+
+    - feed() でチャンクを受け取り、デコード済みテキストを逐次返す
+    - ASCII のみ（ESC なし）の区間はどの候補でも同じ結果になるため判定を待たずに返す
+    - 最初の非 ASCII バイトから detection_window バイト溜まった時点
+      （または finish() 時）に _auto_repair と同じロジックで判定し、
+      以降はインクリメンタルデコーダでチャンクごとにデコードする
+    - 不正バイト列は error_policy に従って処理し、件数と区間を errors に集計する
+    - normalizer が指定されていれば、返すテキストをチャンク単位で正規化する
+
+    保持するのは判定用ウィンドウとデコーダの未完了バイトのみなので、
+    入力サイズに関わらずメモリ使用量は一定。
+    """
+
+    def __init__(
+        self,
+        target_encoding: str = "utf-8",
+        detection_window: int = DEFAULT_DETECTION_WINDOW,
+        error_policy: ErrorPolicy = "ignore",
+        normalizer: Optional[TextNormalizer] = None,
+    ) -> None:
+        self.target_encoding = target_encoding
+        self.detection_window = detection_window
+        self.error_policy = error_policy
+        self.normalizer = normalizer if normalizer is not None and normalizer.enabled else None
+
+        self.encoding: Optional[str] = None
+        self.changed = False
+        self.score = 0.0
+        self.input_bytes_length = 0
+
+        self._pending = bytearray()
+        self._decoder: Optional[CountingDecoder] = None
+
+    @property
+    def decided(self) -> bool:
+        return self._decoder is not None
+
+    @property
+    def detected_path(self) -> Optional[str]:
+        if self.encoding is None:
+            return None
+        return f"{self.encoding}->{self.target_encoding}"
+
+    @property
+    def confidence(self) -> float:
+        return _score_to_confidence(self.score)
+
+    @property
+    def errors(self) -> DecodeErrorStats:
+        if self._decoder is None:
+            return DecodeErrorStats()
+        return self._decoder.stats
+
+    @property
+    def had_error(self) -> bool:
+        return self.errors.count > 0
+
+    def feed(self, chunk: bytes) -> str:
+        """チャンクを追加し、この時点で確定したテキストを返す。"""
+        text = self._feed(chunk)
+        return self.normalizer.feed(text) if self.normalizer is not None else text
+
+    def finish(self) -> str:
+        """入力終端。保持中のバイトをすべてデコードして返す。"""
+        text = self._finish()
+        if self.normalizer is not None:
+            text = self.normalizer.feed(text) + self.normalizer.finish()
+        return text
+
+    def _feed(self, chunk: bytes) -> str:
+        self.input_bytes_length += len(chunk)
+        if self._decoder is not None:
+            return self._decode(chunk, final=False)
+
+        if self._pending:
+            # 判定待ちのバイトがある（先頭は非 ASCII）
+            self._pending += chunk
+            if len(self._pending) < self.detection_window:
+                return ""
+            return self._detect_and_flush(final=False)
+
+        match = _NEEDS_DETECTION_RE.search(chunk)
+        if match is None:
+            # ASCII のみ: そのまま確定
+            return chunk.decode("ascii")
+
+        # 非 ASCII より前の部分は確定させ、以降を判定用に保持
+        prefix = chunk[: match.start()].decode("ascii")
+        self._pending += chunk[match.start():]
+        if len(self._pending) < self.detection_window:
+            return prefix
+        return prefix + self._detect_and_flush(final=False)
+
+    def _finish(self) -> str:
+        if self._decoder is None:
+            if not self._pending:
+                # 入力が ASCII のみ（または空）だった
+                self._decoder = CountingDecoder("utf-8", self.error_policy, offset=self.input_bytes_length)
+                self.encoding = "utf-8"
+                return ""
+            return self._detect_and_flush(final=True)
+        return self._decode(b"", final=True)
+
+    def _detect_and_flush(self, final: bool) -> str:
+        head = bytes(self._pending)
+        # 判定ウィンドウより前は ASCII として確定済み
+        offset = self.input_bytes_length - len(head)
+        self._pending.clear()
+
+        candidates, _ = _evaluate_candidates(head, final=final)
+        selected, changed = _select_candidate(candidates)
+        if selected is None:
+            self.encoding, self.changed, self.score = "utf-8", False, 0.0
+        else:
+            self.encoding, self.changed, self.score = selected.encoding, changed, selected.score
+
+        self._decoder = CountingDecoder(self.encoding, self.error_policy, offset=offset)
+        return self._decode(head, final=final)
+
+    def _decode(self, data: bytes, final: bool) -> str:
+        assert self._decoder is not None
+        return self._decoder.decode(data, final=final)
+
+
+def iter_repaired_text(
+    chunks: Iterable[bytes],
+    target_encoding: str = "utf-8",
+    detection_window: int = DEFAULT_DETECTION_WINDOW,
+    error_policy: ErrorPolicy = "ignore",
+    normalizer: Optional[TextNormalizer] = None,
+) -> Iterator[str]:
+    """チャンク列を StreamingRepairer に流し、確定したテキストを順に返す。"""
+    repairer = StreamingRepairer(
+        target_encoding=target_encoding,
+        detection_window=detection_window,
+        error_policy=error_policy,
+        normalizer=normalizer,
+    )
+    for chunk in chunks:
+        text = repairer.feed(chunk)
+        if text:
+            yield text
+    text = repairer.finish()
+    if text:
+        yield text
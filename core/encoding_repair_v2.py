@@ -3,14 +3,35 @@
 from __future__ import annotations
 
 import base64
+import gzip
+import math
+import re
 import time
 from dataclasses import dataclass
-from typing import Literal, Optional, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, Literal, Optional, List, Tuple, Union
 
 from pydantic import BaseModel, Field, ValidationError
 
+from .charset_sniff import SNIFF_PREFIX_BYTES, sniff_charset_candidates
+from .codec_registry import get_incremental_decoder, normalize_encoding_name
+from .decode_errors import CountingDecoder, DecodeErrorStats, ErrorPolicy, decode_counting
+from .decompression import (
+    DEFAULT_MAX_DECOMPRESSED_BYTES,
+    Compression,
+    DecompressionError,
+    iter_decompressed,
+)
+from .normalization import TextNormalizer
+from .source_priors import DEFAULT_SOURCE_PRIOR_STORE
+
+try:  # zstd 出力は任意依存
+    import zstandard
+except ImportError:  # pragma: no cover - 環境依存
+    zstandard = None
+
 
 EncodingMode = Literal["auto", "manual"]
+OutputFormat = Literal["json", "detect_only", "base64", "raw", "gzip", "zstd"]
 
 
 class EncodingRepairRequestV2(BaseModel):
@@ -21,17 +42,48 @@ class EncodingRepairRequestV2(BaseModel):
     - raw_bytes_base64: 元データのバイト列を Base64 文字列化したもの
     - assume_current_encoding: manual 時のみ必須（auto 時は無視してもよい）
     - target_encoding: 出力テキストのエンコーディング（基本 "utf-8"）
+    - error_policy: 不正バイト列の扱い
+        - "ignore": 取り除く / "replace": U+FFFD に置換 / "escape": "\\xNN" 形式で残す
+    - manual_scoring: manual 時に出力全体をスコアリングして confidence を算出するか。
+      False の場合は走査を省略し、confidence は 1 - error_density とする
+    - normalize_nfkc / normalize_halfwidth_kana / normalize_newlines / strip_control_chars:
+      修復後テキストの正規化（NFKC / 半角カナ→全角 / CRLF・CR→LF / 制御文字除去）。
+      デコードと同じチャンク単位の処理の中で適用する
+    - charset_hint: Content-Type ヘッダ値（"text/html; charset=Shift_JIS"）または charset 名。
+      auto 時はこのヒントと、本文先頭の BOM / XML 宣言 / <meta charset> を安価に検証し、
+      矛盾しなければ候補の総当たりを省略する
+    - compression: raw_bytes_base64 の圧縮形式 "none" / "gzip" / "deflate" / "zstd"。
+      圧縮時は展開後サイズを上限（max_decompressed_bytes）までに制限して展開し、
+      非圧縮の入力と同じ経路（charset_hint / source_id を含む）で判定・修復する
+    - source_id: 送信元（フィード）の識別子。指定すると過去の判定結果から学習した
+      エンコーディングを先に検証し、一致すれば候補の総当たりを省略する（auto 時のみ）
+    - output_format: レスポンス形式
+        - "json": 従来どおり fixed_text を JSON で返す
+        - "detect_only": fixed_text を返さず判定結果（meta）のみ
+        - "base64": fixed_text の代わりに target_encoding のバイト列を Base64 で返す
+        - "raw" / "gzip" / "zstd": 修復後のバイト列をそのまま（または圧縮して）返す
     """
     mode: EncodingMode = Field(default="auto")
     raw_bytes_base64: str = Field(..., min_length=1)
     assume_current_encoding: Optional[str] = None
     target_encoding: str = "utf-8"
+    output_format: OutputFormat = Field(default="json")
+    error_policy: ErrorPolicy = Field(default="ignore")
+    manual_scoring: bool = True
+    normalize_nfkc: bool = False
+    normalize_halfwidth_kana: bool = False
+    normalize_newlines: bool = False
+    strip_control_chars: bool = False
+    source_id: Optional[str] = Field(default=None, max_length=256)
+    charset_hint: Optional[str] = Field(default=None, max_length=256)
+    compression: Compression = Field(default="none")
 
 
 class EncodingRepairResult(BaseModel):
     fixed_text: str
     target_encoding: str = "utf-8"
     changed: bool
+    fixed_text_base64: Optional[str] = None
 
 
 class EncodingRepairMeta(BaseModel):
@@ -42,6 +94,16 @@ class EncodingRepairMeta(BaseModel):
     status: str
     execution_ms: float
     input_bytes_length: int
+    prior_used: bool = False
+    # 採用した charset 宣言の出所（bom / content_type / xml_declaration / meta）
+    hint_used: bool = False
+    charset_source: Optional[str] = None
+    # 圧縮入力の場合の圧縮後サイズ（input_bytes_length は展開後のサイズ）
+    compressed_bytes_length: Optional[int] = None
+    # 不正バイト列の件数・入力バイトに対する割合・区間 [start, end)（先頭から最大 MAX_ERROR_SPANS 件）
+    error_count: int = 0
+    error_density: float = 0.0
+    error_spans: List[Tuple[int, int]] = Field(default_factory=list)
 
 
 class EncodingRepairResponse(BaseModel):
@@ -49,22 +111,119 @@ class EncodingRepairResponse(BaseModel):
     meta: EncodingRepairMeta
 
 
-@dataclass
+class EncodingDetectRequestV2(BaseModel):
+    """
+    判定専用リクエストモデル（Base64 専用）
+
+    - raw_bytes_base64: 元データのバイト列を Base64 文字列化したもの
+    - target_encoding: detected_path に使う出力エンコーディング名
+    """
+    raw_bytes_base64: str = Field(..., min_length=1)
+    target_encoding: str = "utf-8"
+
+
+class DetectionCandidate(BaseModel):
+    encoding: str
+    score: Optional[float] = None
+    had_error: bool
+    pruned: bool = False
+
+
+class EncodingDetectResult(BaseModel):
+    detected_encoding: Optional[str] = None
+    changed: bool
+    candidates: List[DetectionCandidate]
+
+
+class EncodingDetectMeta(BaseModel):
+    version: str = "2.0.0"
+    detected_path: Optional[str] = None
+    confidence: float
+    status: str
+    execution_ms: float
+    input_bytes_length: int
+    early_exit: bool = False
+
+
+class EncodingDetectResponse(BaseModel):
+    result: EncodingDetectResult
+    meta: EncodingDetectMeta
+
+
+@dataclass(slots=True)
 class CandidateResult:
+    """
+    候補エンコーディングの評価結果（デコード済みテキストは保持しない）。
+
+    テキストは採用された候補についてのみ _materialize_text で生成する。
+    pruned=True の場合はスコア上限だけで不採用が確定しており、score は上限値。
+    error_offset は strict デコードに最初に失敗したチャンクの先頭オフセット
+    （それより前は strict にデコードできる。エラーなしの場合は None）。
+    """
     encoding: str
-    text: str
     score: float
     had_error: bool
+    pruned: bool = False
+    char_count: int = 0
+    jp_count: int = 0
+    bad_control_count: int = 0
+    error_offset: Optional[int] = None
+
 
+# バイト列として返す（JSON に載せない）出力形式と Content-Type
+BINARY_OUTPUT_MEDIA_TYPES = {
+    "raw": "application/octet-stream",
+    "gzip": "application/gzip",
+    "zstd": "application/zstd",
+}
 
-# Auto モードで試行するエンコーディング候補
+
+# Auto モードで試行するエンコーディング候補（先頭はベースラインの utf-8）
 AUTO_CANDIDATE_ENCODINGS: List[str] = [
     "utf-8",
     "cp932",    # Windows-31J / Shift_JIS 相当
     "euc_jp",
+    "iso2022_jp",  # JIS（メール）。7bit のため ESC を含む場合のみ ASCII と区別できる
     "latin1",
 ]
 
+# UTF-8 と比べてこれ以上改善していれば変更を採用（Safe filter）
+UTF8_PREFERENCE_MARGIN = 0.15
+# デコードエラー時のスコアペナルティ
+DECODE_ERROR_PENALTY = 0.5
+# _score_text が取りうる最大値（日本語文字のみ・制御文字なし・エラーなし）
+MAX_TEXT_SCORE = 1.0
+# 候補のスコアリング時に一度にデコードするバイト数
+SCORING_CHUNK_SIZE = 256 * 1024
+
+# 同じバイト列を strict にデコードできてしまうことが多いエンコーディングの組。
+# EUC-JP のカナ・漢字（0xa1-0xfe の 2 バイト）は cp932 の半角カナ + 2 バイト文字としても妥当なため、
+# 宣言された側より明確にスコアが高ければ宣言と矛盾しているとみなす
+DECLARED_RIVAL_ENCODINGS = {
+    "cp932": ("euc_jp",),
+    "euc_jp": ("cp932",),
+}
+# 事前分布・宣言で utf-8 以外を採用する場合のスコア下限（非 ASCII の入力で日本語らしい文字が
+# 制御文字の 2 倍以下しかないテキストは、strict にデコードできても採用しない）
+DECLARED_MIN_SCORE = 0.0
+# 任意のバイト列を strict にデコードできてしまい、検証にならないエンコーディング
+UNVERIFIABLE_ENCODINGS = ("latin1",)
+# 文書中の宣言（<meta> / XML 宣言）の utf-16 系ラベルは、WHATWG と同様に utf-8 として扱う
+# （ASCII 互換の宣言を読めている時点で本文は utf-16 ではない）
+IN_DOCUMENT_UTF16_LABELS = ("utf-16", "utf-16-le", "utf-16-be")
+IN_DOCUMENT_SOURCES = ("xml_declaration", "meta")
+
+# デコード結果に日本語の文字が現れえない候補のスコア上限
+# （latin1 は U+0000-U+00FF にしかデコードされないため 0 を超えない）
+CANDIDATE_SCORE_CAPS = {"latin1": 0.0}
+
+# ひらがな・カタカナ・漢字・半角カナ
+_JP_CHAR_RE = re.compile("[\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff\uff66-\uff9d]")
+# 同じ文字クラスの連続（1 文字ずつマッチさせるより速く数えられる）
+_JP_RUN_RE = re.compile("[\u3040-\u309f\u30a0-\u30ff\u4e00-\u9fff\uff66-\uff9d]+")
+# 制御文字（タブ/改行以外）
+_BAD_CONTROL_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
 
 def _decode_base64(raw_bytes_base64: str) -> Tuple[Optional[bytes], Optional[str]]:
     """Base64 文字列をデコード。失敗時は (None, 'error_status') を返す。"""
@@ -75,6 +234,75 @@ def _decode_base64(raw_bytes_base64: str) -> Tuple[Optional[bytes], Optional[str
         return None, "invalid_base64"
 
 
+def estimate_decoded_length(raw_bytes_base64: str) -> int:
+    """
+    Base64 をデコードせずに、デコード後のバイト数（上限側の見積もり）を返す。
+    アドミッション制御で入力サイズを先に判断するために使う。
+    """
+    return len(raw_bytes_base64) * 3 // 4
+
+
+def encode_output_bytes(text: str, target_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """
+    修復後テキストを target_encoding のバイト列に変換する。
+
+    target_encoding で表現できない文字は置換文字にする。
+    エンコーディング名が不正な場合は (b"", 'invalid_encoding_name') を返す。
+    """
+    try:
+        return text.encode(target_encoding, errors="replace"), None
+    except LookupError:
+        return b"", "invalid_encoding_name"
+
+
+def render_binary_output(
+    text: str,
+    target_encoding: str,
+    output_format: str,
+) -> Tuple[bytes, Optional[str]]:
+    """
+    "raw" / "gzip" / "zstd" 形式のレスポンスボディを作る。
+
+    JSON エスケープや Base64 膨張を避けるため、
+    target_encoding のバイト列を直接（必要なら圧縮して）返す。
+    失敗時は (b"", 'error_status') を返す。
+    """
+    data, encode_error = encode_output_bytes(text, target_encoding)
+    if encode_error is not None:
+        return b"", encode_error
+
+    if output_format == "raw":
+        return data, None
+    if output_format == "gzip":
+        # 速度優先（level 6 より数倍速く、サイズ差は小さい）
+        return gzip.compress(data, compresslevel=1), None
+    if output_format == "zstd":
+        if zstandard is None:
+            return b"", "zstd_unavailable"
+        return zstandard.ZstdCompressor(level=3).compress(data), None
+    return b"", "unsupported_output_format"
+
+
+def _count_text_stats(text: str) -> Tuple[int, int]:
+    """(日本語らしい文字数, 制御文字数) を返す。"""
+    return sum(map(len, _JP_RUN_RE.findall(text))), _BAD_CONTROL_RE.subn("", text)[1]
+
+
+def _score_from_counts(length: int, jp_count: int, bad_control: int, had_error: bool) -> float:
+    """_count_text_stats の集計値からスコアを算出する（チャンク単位の集計に対応）。"""
+    if not length:
+        return -1.0
+
+    jp_ratio = jp_count / length
+    bad_ratio = bad_control / length
+
+    score = jp_ratio - (bad_ratio * 2.0)
+    if had_error:
+        score -= DECODE_ERROR_PENALTY
+
+    return score
+
+
 def _score_text(text: str, had_error: bool) -> float:
     """
     非常にシンプルなスコアリング関数。
@@ -85,178 +313,863 @@ def _score_text(text: str, had_error: bool) -> float:
 
     を元にラフなスコアを算出する。
     """
-    if not text:
-        return -1.0
+    jp_count, bad_control = _count_text_stats(text)
+    return _score_from_counts(len(text), jp_count, bad_control, had_error)
 
-    length = len(text)
-    jp_count = 0
-    bad_control = 0
-
-    for ch in text:
-        code = ord(ch)
-        # ひらがな・カタカナ・漢字・全角カナ
-        if (
-            0x3040 <= code <= 0x309F  # ひらがな
-            or 0x30A0 <= code <= 0x30FF  # カタカナ
-            or 0x4E00 <= code <= 0x9FFF  # CJK
-            or 0xFF66 <= code <= 0xFF9D  # 半角カナ
-        ):
-            jp_count += 1
-        # 制御文字（タブ/改行以外）はペナルティ
-        if code < 32 and ch not in ("\t", "\r", "\n"):
-            bad_control += 1
 
-    jp_ratio = jp_count / length
-    bad_ratio = bad_control / length
+def _score_to_confidence(score: float) -> float:
+    """スコアをそのまま 0〜1 に正規化はしていないが、便宜上 0〜1 クランプ"""
+    return max(0.0, min(1.0, (score + 1.0) / 2.0))
 
-    score = jp_ratio - (bad_ratio * 2.0)
-    if had_error:
-        score -= 0.5
 
-    return score
+class _CandidateScan:
+    """
+    1 候補のチャンク単位の走査状態（デコード済みテキストは保持しない）。
+
+    strict でデコードし、失敗したチャンクからは同じ位置の状態を引き継いだ ignore の
+    デコーダで続ける（先頭からやり直さないため、不正バイトがあっても 1 回の走査で済む）。
+    スコアリングには C 実装のエラーハンドラ（strict / ignore）だけを使い、
+    不正バイト列の件数・区間は採用された候補についてのみ _materialize で数える。
+    """
+
+    __slots__ = ("encoding", "decoder", "consumed", "error_offset", "char_count", "jp_count", "bad_control_count")
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        self.decoder = get_incremental_decoder(encoding, "strict")
+        self.consumed = 0
+        self.error_offset: Optional[int] = None
+        self.char_count = 0
+        self.jp_count = 0
+        self.bad_control_count = 0
+
+    @property
+    def had_error(self) -> bool:
+        return self.error_offset is not None
+
+    @property
+    def score(self) -> float:
+        """これまでに走査した部分のスコア。"""
+        return _score_from_counts(self.char_count, self.jp_count, self.bad_control_count, self.had_error)
+
+    def cap(self, had_error: bool = False) -> float:
+        """最終スコアが取りうる上限（エラーありの場合はペナルティ分を引く）。"""
+        cap = CANDIDATE_SCORE_CAPS.get(self.encoding, MAX_TEXT_SCORE)
+        if had_error or self.had_error:
+            cap = min(cap, MAX_TEXT_SCORE - DECODE_ERROR_PENALTY)
+        return cap
+
+    def bounds(self, total: int) -> Tuple[float, float]:
+        """
+        入力全体を走査した場合の最終スコアの (下限, 上限)。
+
+        残り remaining バイトが候補間のスコア差を動かしうる幅を remaining / total とみなし、
+        各候補のスコアはその半分ずつ上下しうるとする（未走査部分の不正バイトによる
+        ペナルティは含めない）。
+        """
+        if not self.char_count:
+            return -math.inf, self.cap()
+        shift = (total - self.consumed) / total / 2.0 if total else 0.0
+        score = self.score
+        return score - shift, min(self.cap(), score + shift)
+
+    def feed(self, chunk: memoryview, final: bool, prune_at: Optional[float] = None) -> bool:
+        """
+        次のチャンクを走査する。strict デコードに初めて失敗した時点で
+        エラーありのスコア上限が prune_at 以下なら走査せずに False を返す。
+        """
+        if self.error_offset is None:
+            state = self.decoder.getstate()
+            try:
+                text = self.decoder.decode(chunk, final=final)
+            except UnicodeDecodeError:
+                if prune_at is not None and self.cap(had_error=True) <= prune_at:
+                    return False
+                self.error_offset = self.consumed
+                self.decoder = get_incremental_decoder(self.encoding, "ignore")
+                self.decoder.setstate(state)
+                text = self.decoder.decode(chunk, final=final)
+        else:
+            text = self.decoder.decode(chunk, final=final)
+        jp, bad = _count_text_stats(text)
+        self.consumed += len(chunk)
+        self.char_count += len(text)
+        self.jp_count += jp
+        self.bad_control_count += bad
+        return True
+
+    def result(self, pruned: bool = False, total: int = 0) -> CandidateResult:
+        if pruned:
+            # 打ち切った候補は最終スコアの上限だけを返す
+            _, upper = self.bounds(total)
+            return CandidateResult(encoding=self.encoding, score=upper, had_error=self.had_error, pruned=True)
+        return CandidateResult(
+            encoding=self.encoding,
+            score=self.score,
+            had_error=self.had_error,
+            char_count=self.char_count,
+            jp_count=self.jp_count,
+            bad_control_count=self.bad_control_count,
+            error_offset=self.error_offset,
+        )
+
+
+class RepairPayload:
+    """
+    判定・修復の対象となるバイト列。先頭からチャンク単位で何度でも読み直せる。
+
+    - from_bytes: メモリ上のバイト列（raw を保持し、SCORING_CHUNK_SIZE ごとの memoryview を返す）
+    - from_compressed: 圧縮されたバイト列。展開後の全体は保持せず、読み直すたびに
+      iter_decompressed で展開し直す（最初の 1 回でサイズ上限の確認と、total / head /
+      ASCII かどうかの集計を済ませる）
+
+    head は先頭 SNIFF_PREFIX_BYTES バイト（宣言の検出に使う）。
+    """
+
+    __slots__ = ("raw", "total", "head", "is_ascii", "has_escape", "_chunks")
+
+    def __init__(
+        self,
+        raw: Optional[bytes],
+        total: int,
+        head: bytes,
+        is_ascii: bool,
+        has_escape: bool,
+        chunks: Callable[[], Iterable[bytes]],
+    ) -> None:
+        self.raw = raw
+        self.total = total
+        self.head = head
+        self.is_ascii = is_ascii
+        self.has_escape = has_escape
+        self._chunks = chunks
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "RepairPayload":
+        view = memoryview(raw)
+
+        def chunks() -> Iterator[memoryview]:
+            for start in range(0, len(raw), SCORING_CHUNK_SIZE):
+                yield view[start:start + SCORING_CHUNK_SIZE]
+
+        return cls(raw, len(raw), raw[:SNIFF_PREFIX_BYTES], raw.isascii(), b"\x1b" in raw, chunks)
+
+    @classmethod
+    def from_compressed(
+        cls,
+        compressed: bytes,
+        compression: Compression,
+        max_output_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+    ) -> "RepairPayload":
+        """展開できない・上限を超える場合は DecompressionError を送出する。"""
+
+        def chunks() -> Iterator[bytes]:
+            return iter_decompressed((compressed,), compression, max_output_bytes)
+
+        total = 0
+        head = bytearray()
+        is_ascii = True
+        has_escape = False
+        for data in chunks():
+            total += len(data)
+            if len(head) < SNIFF_PREFIX_BYTES:
+                head += data[:SNIFF_PREFIX_BYTES - len(head)]
+            is_ascii = is_ascii and data.isascii()
+            has_escape = has_escape or b"\x1b" in data
+        return cls(None, total, bytes(head), is_ascii, has_escape, chunks)
+
+    @property
+    def plain_ascii(self) -> bool:
+        """ASCII のみで ESC（ISO-2022-JP のエスケープシーケンス）も含まない。"""
+        return self.is_ascii and not self.has_escape
+
+    def iter_chunks(self, final: bool = True) -> Iterator[Tuple[bytes, bool]]:
+        """(チャンク, 最後のチャンクか) を返す。空の入力でも 1 回返す。"""
+        previous: Optional[bytes] = None
+        for chunk in self._chunks():
+            if previous is not None:
+                yield previous, False
+            previous = chunk
+        yield (b"" if previous is None else previous), final
+
+
+# バイト列または RepairPayload（判定・修復の各関数はどちらも受け付ける）
+PayloadLike = Union[bytes, RepairPayload]
+
+
+def _as_payload(data: PayloadLike) -> RepairPayload:
+    return data if isinstance(data, RepairPayload) else RepairPayload.from_bytes(data)
 
 
-def _try_decode(raw: bytes, encoding: str) -> CandidateResult:
-    """指定エンコーディングでデコードし、スコア付き候補として返す。"""
-    had_error = False
+def _scan_candidate(
+    data: PayloadLike,
+    encoding: str,
+    final: bool,
+    prune_at: Optional[float] = None,
+) -> CandidateResult:
+    """
+    1 候補について入力全体を SCORING_CHUNK_SIZE ごとに走査し、統計だけを集計する。
+
+    prune_at が指定されていて、strict デコードの失敗時点でスコア上限
+    （MAX_TEXT_SCORE - DECODE_ERROR_PENALTY）が prune_at 以下なら走査を打ち切り pruned 候補を返す。
+    """
+    scan = _CandidateScan(encoding)
+    for chunk, last in _as_payload(data).iter_chunks(final):
+        if not scan.feed(chunk, last, prune_at):
+            return CandidateResult(encoding=encoding, score=scan.cap(had_error=True), had_error=True, pruned=True)
+    return scan.result()
+
+
+def _try_decode(
+    data: PayloadLike,
+    encoding: str,
+    prune_at: Optional[float] = None,
+    final: bool = True,
+) -> CandidateResult:
+    """
+    指定エンコーディングでデコードし、スコア付き候補として返す。
+
+    prune_at が指定されている場合、strict デコードに失敗した時点で
+    スコア上限（MAX_TEXT_SCORE - DECODE_ERROR_PENALTY）が prune_at 以下なら
+    残りのデコードとスコアリングを省略し、pruned 候補として返す。
+
+    final=False はストリームの途中（先頭ウィンドウ）を判定する場合に使う。
+    """
+    return _scan_candidate(data, encoding, final, prune_at)
+
+
+def _decode_chunks(
+    payload: RepairPayload,
+    encoding: str,
+    error_policy: ErrorPolicy,
+    normalizer: Optional[TextNormalizer] = None,
+) -> Tuple[str, DecodeErrorStats]:
+    """
+    チャンクごとにデコードし、同じループの中で正規化まで済ませる。
+    正規化前の全文（圧縮入力では展開後のバイト列全体も）を別途保持しない。
+    """
+    if normalizer is not None and not normalizer.enabled:
+        normalizer = None
+    decoder = CountingDecoder(encoding, error_policy)
+    parts: List[str] = []
+    for chunk, last in payload.iter_chunks():
+        text = decoder.decode(chunk, final=last)
+        parts.append(normalizer.feed(text) if normalizer is not None else text)
+    if normalizer is not None:
+        parts.append(normalizer.finish())
+    return "".join(parts), decoder.stats
+
+
+def _materialize(
+    data: PayloadLike,
+    candidate: CandidateResult,
+    error_policy: ErrorPolicy = "ignore",
+    normalizer: Optional[TextNormalizer] = None,
+) -> Tuple[str, DecodeErrorStats]:
+    """
+    採用された候補のテキストを生成し、(テキスト, 不正バイトの集計) を返す。
+
+    不正バイト列は error_policy に従って処理する。件数・区間を数える（Python の
+    エラーハンドラを通る）デコードは、この採用候補の 1 回だけ。
+    normalizer が指定されていればデコードと同じチャンク処理の中で正規化する。
+    メモリ上に全体がない（圧縮された）入力はチャンクごとに展開しながらデコードする。
+    """
+    payload = _as_payload(data)
+    raw = payload.raw
+    if raw is None or (normalizer is not None and normalizer.enabled):
+        return _decode_chunks(payload, candidate.encoding, error_policy, normalizer)
+    offset = candidate.error_offset
+    if offset is None:
+        # 早期終了した場合は未走査の部分に不正バイトがありうる
+        try:
+            return raw.decode(candidate.encoding, errors="strict"), DecodeErrorStats()
+        except UnicodeDecodeError as exc:
+            offset = exc.start
+    if not offset:
+        return decode_counting(raw, candidate.encoding, error_policy)
+    # offset より前は strict でデコードできている。そこまでは C 実装のみで
+    # デコードし、不正バイトを数える（Python のエラーハンドラを通る）のは残りの部分だけ
+    view = memoryview(raw)
+    prefix_decoder = get_incremental_decoder(candidate.encoding, "strict")
+    prefix = prefix_decoder.decode(view[:offset])
+    decoder = CountingDecoder(candidate.encoding, error_policy, offset=offset)
+    decoder.setstate(prefix_decoder.getstate())
+    return prefix + decoder.decode(view[offset:], final=True), decoder.stats
+
+
+def _materialize_text(
+    data: PayloadLike,
+    candidate: CandidateResult,
+    error_policy: ErrorPolicy = "ignore",
+    normalizer: Optional[TextNormalizer] = None,
+) -> str:
+    """採用された候補のテキストだけを生成する（_materialize の集計が不要な場合）。"""
+    text, _ = _materialize(data, candidate, error_policy, normalizer)
+    return text
+
+
+def _is_plain_ascii(raw: bytes) -> bool:
+    """ASCII のみで ESC（ISO-2022-JP のエスケープシーケンス）も含まない。"""
+    return raw.isascii() and b"\x1b" not in raw
+
+
+def _verify_declared(data: PayloadLike, declared: Optional[str]) -> Optional[Tuple[str, float]]:
+    """
+    verify_declared_encoding の本体。採用する場合は (正規名, スコア) を返す。
+
+    宣言・utf-8・DECLARED_RIVAL_ENCODINGS の各エンコーディングをチャンク単位で並行して走査する
+    （テキストは生成しない）。
+    """
+    encoding = normalize_encoding_name(declared)
+    if encoding is None:
+        return None
+    payload = _as_payload(data)
+
     try:
-        text = raw.decode(encoding, errors="strict")
-    except UnicodeDecodeError:
-        # strict でダメなら ignore で文字を落としつつデコード
-        text = raw.decode(encoding, errors="ignore")
-        had_error = True
+        declared_scan = _CandidateScan(encoding)
+        utf8_scan = _CandidateScan("utf-8") if encoding != "utf-8" and not payload.is_ascii else None
+        rival_scans = [_CandidateScan(rival) for rival in DECLARED_RIVAL_ENCODINGS.get(encoding, ())]
+        for chunk, last in payload.iter_chunks():
+            # 宣言側が strict にデコードできない時点で不採用
+            if not declared_scan.feed(chunk, last, prune_at=math.inf):
+                return None
+            # utf-8 として strict にデコードできなくなったら以降の確認は不要
+            if utf8_scan is not None and not utf8_scan.feed(chunk, last, prune_at=math.inf):
+                utf8_scan = None
+            rival_scans = [scan for scan in rival_scans if scan.feed(chunk, last, prune_at=math.inf)]
+    except (UnicodeError, LookupError):
+        return None
 
-    score = _score_text(text, had_error)
-    return CandidateResult(encoding=encoding, text=text, score=score, had_error=had_error)
+    if utf8_scan is not None:
+        return None
+    score = declared_scan.score
+    if any(scan.score > score + UTF8_PREFERENCE_MARGIN for scan in rival_scans):
+        return None
+    return encoding, score
 
 
-def _auto_repair(raw: bytes, target_encoding: str) -> Tuple[str, bool, Optional[str], float, str]:
+def verify_declared_encoding(raw: bytes, declared: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
     """
-    Auto モードの中核ロジック。
-    - 複数エンコーディング候補でデコード
-    - スコアが最も高いものを採用
-    - ただし UTF-8 との差が小さい場合は UTF-8 を優先して「変更なし」とする
+    宣言されたエンコーディング（MIME charset など）が信頼できるかを安価に検証する。
+
+    - 名前が解決できない → 不採用
+    - strict デコードに失敗する → 不採用
+    - utf-8 以外の宣言なのに、非 ASCII のバイト列が UTF-8 として正しくデコードできる
+      → 宣言と矛盾（偶然 UTF-8 として正しい列になることはまずない）とみなし不採用
+    - DECLARED_RIVAL_ENCODINGS の相手側（cp932 ⇔ euc_jp）でも strict にデコードでき、
+      スコアが UTF8_PREFERENCE_MARGIN を超えて高い → 宣言と矛盾とみなし不採用
+
+    採用する場合は (正規名, デコード済みテキスト)、不採用なら (None, None) を返す。
     """
-    input_len = len(raw)
+    verified = _verify_declared(raw, declared)
+    if verified is None:
+        return None, None
+    encoding, _ = verified
+    return encoding, raw.decode(encoding)
 
-    candidates: List[CandidateResult] = []
-    for enc in AUTO_CANDIDATE_ENCODINGS:
-        candidates.append(_try_decode(raw, enc))
 
+def _evaluate_candidates(
+    data: PayloadLike,
+    early_exit: bool = True,
+    final: bool = True,
+) -> Tuple[List[CandidateResult], bool]:
+    """
+    AUTO_CANDIDATE_ENCODINGS を評価し、(候補リスト, 早期終了したか) を返す。
+
+    全候補を SCORING_CHUNK_SIZE ごとに並行して走査する。early_exit=True の場合、
+    各候補の最終スコアの範囲（_CandidateScan.bounds: 残りバイトの割合だけ動きうる）から
+    最終判定（_select_candidate）が変わらないことが確定した時点で走査を打ち切る。
+      - ASCII のみ（ESC なし）: どの候補でも同一テキストになるため utf-8 で確定
+      - 上限が utf-8 の下限 + margin 以下、または他候補の下限以下になった候補は打ち切る
+        （strict デコードに失敗した時点のスコア上限で打ち切れる場合はデコードもしない）
+      - utf-8 以外で残った候補が 1 つだけになり、その下限が utf-8 の上限 + margin を
+        超えた（または utf-8 以外がすべて打ち切られた）時点で確定
+    大きな入力では先頭の一部を走査しただけで確定することが多い。
+    """
+    payload = _as_payload(data)
+    if early_exit and payload.plain_ascii:
+        return [_try_decode(payload, "utf-8", final=final)], True
+
+    total = payload.total
+    scans = [_CandidateScan(enc) for enc in AUTO_CANDIDATE_ENCODINGS]
+    utf8_scan = scans[0]
+    pruned: Dict[str, CandidateResult] = {}
+
+    def contenders() -> List[_CandidateScan]:
+        return [scan for scan in scans[1:] if scan.encoding not in pruned]
+
+    def prune_dominated() -> bool:
+        """打ち切れる候補を打ち切り、判定が確定したかを返す。"""
+        lowers = {scan.encoding: scan.bounds(total)[0] for scan in scans if scan.encoding not in pruned}
+        utf8_floor = lowers["utf-8"] + UTF8_PREFERENCE_MARGIN
+        for scan in contenders():
+            upper = scan.bounds(total)[1]
+            rival_floor = max((low for enc, low in lowers.items() if enc != scan.encoding), default=-math.inf)
+            if upper <= max(utf8_floor, rival_floor):
+                pruned[scan.encoding] = scan.result(pruned=True, total=total)
+                del lowers[scan.encoding]
+        remaining = contenders()
+        if not remaining:
+            return True
+        if len(remaining) == 1:
+            return remaining[0].bounds(total)[0] > utf8_scan.bounds(total)[1] + UTF8_PREFERENCE_MARGIN
+        return False
+
+    decided = False
+    for chunk, last in payload.iter_chunks(final):
+        for scan in [utf8_scan] + contenders():
+            prune_at = None
+            if early_exit and scan is not utf8_scan:
+                prune_at = max(
+                    utf8_scan.bounds(total)[0] + UTF8_PREFERENCE_MARGIN,
+                    max((other.bounds(total)[0] for other in contenders() if other is not scan), default=-math.inf),
+                )
+            if not scan.feed(chunk, last, prune_at):
+                pruned[scan.encoding] = CandidateResult(
+                    encoding=scan.encoding, score=scan.cap(had_error=True), had_error=True, pruned=True
+                )
+                continue
+            if early_exit and prune_dominated():
+                decided = True
+                break
+        if decided:
+            break
+
+    candidates = [pruned.get(scan.encoding) or scan.result() for scan in scans]
+    exited = decided and (bool(pruned) or any(scan.consumed < total for scan in scans))
+    return candidates, exited
+
+
+def _select_candidate(
+    candidates: List[CandidateResult],
+) -> Tuple[Optional[CandidateResult], bool]:
+    """
+    評価済み候補から採用する候補を選ぶ。(採用候補, 変更ありか) を返す。
+
+    スコアが最も高いものを採用するが、UTF-8 との差が小さい場合は
+    UTF-8 を優先して「変更なし」とする。
+    """
     # ベースラインとして utf-8 を探す
     utf8_candidate = next((c for c in candidates if c.encoding == "utf-8"), None)
 
-    # 最良候補
-    best = max(candidates, key=lambda c: c.score, default=None)
+    # 最良候補（pruned は上限値しか持たないので対象外）
+    best = max((c for c in candidates if not c.pruned), key=lambda c: c.score, default=None)
 
     if best is None or utf8_candidate is None:
+        return None, False
+
+    # スコア差で安全判定
+    if best.encoding == "utf-8" or best.score <= utf8_candidate.score + UTF8_PREFERENCE_MARGIN:
+        # UTF-8 と大差ないか、UTF-8 が最良 → 変更しない
+        return utf8_candidate, False
+
+    # UTF-8 より明確に良いエンコーディングが見つかった
+    return best, True
+
+
+# 修復結果: (fixed_text, changed, detected_path, score, status, errors)
+# score が None の場合はスコアリングを省略している
+RepairOutcome = Tuple[str, bool, Optional[str], Optional[float], str, DecodeErrorStats]
+
+
+def _auto_repair(
+    data: PayloadLike,
+    target_encoding: str,
+    error_policy: ErrorPolicy = "ignore",
+    normalizer: Optional[TextNormalizer] = None,
+    materialize: bool = True,
+) -> RepairOutcome:
+    """
+    Auto モードの中核ロジック。
+    - 複数エンコーディング候補でデコード（判定が確定した時点で打ち切り）
+    - スコアが最も高いものを採用
+    - ただし UTF-8 との差が小さい場合は UTF-8 を優先して「変更なし」とする
+
+    materialize=False の場合は判定だけを行い、テキストの生成と不正バイトの集計を省略する
+    （fixed_text は空、errors は空の集計）。
+    """
+    payload = _as_payload(data)
+    candidates, _ = _evaluate_candidates(payload)
+    selected, changed = _select_candidate(candidates)
+
+    if selected is None:
         # 何もまともにデコードできなかった場合
         try:
-            fallback_text = raw.decode("utf-8", errors="ignore")
+            fallback_text = _materialize_text(payload, CandidateResult("utf-8", 0.0, True, error_offset=0))
         except Exception:
             fallback_text = ""
-        return fallback_text, False, None, 0.0, "no_meaningful_output"
+        return fallback_text, False, None, 0.0, "no_meaningful_output", DecodeErrorStats()
 
-    # スコア差で安全判定
-    margin = 0.15  # UTF-8 と比べてこれ以上改善していれば変更を採用
-    if best.encoding == "utf-8" or best.score <= utf8_candidate.score + margin:
-        # UTF-8 と大差ないか、UTF-8 が最良 → 変更しない
-        return utf8_candidate.text, False, "utf-8->" + target_encoding, utf8_candidate.score, "ok"
+    detected_path = f"{selected.encoding}->{target_encoding}"
+    if not materialize:
+        return "", changed, detected_path, selected.score, "ok", DecodeErrorStats()
+    text, errors = _materialize(payload, selected, error_policy, normalizer)
+    return text, changed, detected_path, selected.score, "ok", errors
 
-    # UTF-8 より明確に良いエンコーディングが見つかった
-    detected_path = f"{best.encoding}->{target_encoding}"
-    return best.text, True, detected_path, best.score, "ok"
+
+def _prior_repair(
+    data: PayloadLike,
+    prior_encoding: str,
+    target_encoding: str,
+    normalizer: Optional[TextNormalizer] = None,
+) -> Optional[RepairOutcome]:
+    """
+    ソースの事前分布（よく使われるエンコーディング）や charset 宣言を安価に検証して採用する。
+    宣言 charset と同じ検証（verify_declared_encoding）を通らなければ None を返し、
+    呼び出し側は通常の Auto 判定にフォールバックする。
+
+    - latin1 など UNVERIFIABLE_ENCODINGS は検証にならないため採用しない
+    - utf-8 以外で非 ASCII の入力は、スコアが DECLARED_MIN_SCORE を超える場合のみ採用する
+      （誤った事前分布が採用されると record() でさらに強化されてしまうため）
+    """
+    if normalize_encoding_name(prior_encoding) in UNVERIFIABLE_ENCODINGS:
+        return None
+    payload = _as_payload(data)
+    verified = _verify_declared(payload, prior_encoding)
+    if verified is None:
+        return None
+    encoding, score = verified
+    if encoding != "utf-8" and not payload.is_ascii and score <= DECLARED_MIN_SCORE:
+        return None
+    selected = CandidateResult(encoding=encoding, score=score, had_error=False)
+    text, _ = _materialize(payload, selected, normalizer=normalizer)
+    return text, encoding != "utf-8", f"{encoding}->{target_encoding}", score, "ok", DecodeErrorStats()
+
+
+def _declared_candidate(label: str, source: str) -> Optional[str]:
+    """
+    宣言のラベルを Auto 判定の候補エンコーディング名に解決する。
+
+    候補（AUTO_CANDIDATE_ENCODINGS）以外のコーデックは、strict にデコードできても
+    日本語の文字化け修復としては意味をなさない（cp932 の本文が utf-16 として
+    偶数長ならデコードできてしまう等）ため None を返し、通常の判定に任せる。
+    """
+    encoding = normalize_encoding_name(label)
+    if source in IN_DOCUMENT_SOURCES and encoding in IN_DOCUMENT_UTF16_LABELS:
+        return "utf-8"
+    if encoding not in AUTO_CANDIDATE_ENCODINGS:
+        return None
+    return encoding
+
+
+def _hint_repair(
+    data: PayloadLike,
+    charset_hint: Optional[str],
+    target_encoding: str,
+    normalizer: Optional[TextNormalizer] = None,
+) -> Tuple[Optional[RepairOutcome], Optional[str]]:
+    """
+    charset_hint と本文先頭の宣言（sniff_charset_candidates）を優先順に検証し、
+    最初に通ったものを採用する。(修復結果, 宣言の出所) を返し、どれも通らなければ (None, None)。
+
+    - ASCII のみの入力はどの宣言でも結果が変わらないため通常の判定に任せる
+    - latin1 の宣言は任意のバイト列を strict デコードできて検証にならないため採用しない
+      （cp932 のページが iso-8859-1 と宣言されている、というのが典型的な文字化けの原因）
+    - 候補エンコーディング以外の宣言は使わない（文書中の utf-16 系ラベルは utf-8 とみなす）
+    - ラベルは文書中の任意の文字列なので、デコード中の例外はすべて「宣言と矛盾」として扱う
+    """
+    payload = _as_payload(data)
+    if payload.plain_ascii:
+        return None, None
+    for label, source in sniff_charset_candidates(payload.head, charset_hint):
+        encoding = _declared_candidate(label, source)
+        if encoding is None:
+            continue
+        try:
+            outcome = _prior_repair(payload, encoding, target_encoding, normalizer)
+        except Exception:
+            continue
+        if outcome is not None:
+            return outcome, source
+    return None, None
 
 
 def _manual_repair(
-    raw: bytes,
+    data: PayloadLike,
     assume_current_encoding: Optional[str],
     target_encoding: str,
-) -> Tuple[str, bool, Optional[str], float, str]:
+    error_policy: ErrorPolicy = "ignore",
+    scoring: bool = True,
+    normalizer: Optional[TextNormalizer] = None,
+) -> RepairOutcome:
     """
     Manual モード。
 
     v2.0 ではシンプルに：
     - raw バイト列を assume_current_encoding でデコード
+      （不正バイト列は error_policy に従って処理しつつ件数と区間を数える）
     - そのテキストを target_encoding として返す（通常 target_encoding == assume_current_encoding）
 
-    という動作とする。
+    という動作とする。scoring=False の場合は出力全体のスコアリングを省略する。
     """
     if not assume_current_encoding:
         # manual なのにエンコーディングが指定されていない
-        return "", False, None, 0.0, "invalid_manual_mode_params"
+        return "", False, None, 0.0, "invalid_manual_mode_params", DecodeErrorStats()
+
+    encoding = normalize_encoding_name(assume_current_encoding)
+    if encoding is None:
+        # 未知のエンコーディング名はデコードを試みずに拒否
+        return "", False, None, 0.0, "invalid_encoding_name", DecodeErrorStats()
+
+    payload = _as_payload(data)
+    if payload.raw is None or (normalizer is not None and normalizer.enabled):
+        text, errors = _decode_chunks(payload, encoding, error_policy, normalizer)
+    else:
+        text, errors = decode_counting(payload.raw, encoding, error_policy)
+
+    score = _score_text(text, errors.count > 0) if scoring else None
+    detected_path = f"{encoding}->{target_encoding}"
+    return text, True, detected_path, score, "ok", errors
+
+
+def _error_response(
+    request: EncodingRepairRequestV2,
+    status: str,
+    started: float,
+    input_bytes_length: int = 0,
+) -> EncodingRepairResponse:
+    """修復を実行せずに終了する場合のレスポンス（fixed_text は空）。"""
+    elapsed = (time.perf_counter() - started) * 1000.0
+    result = EncodingRepairResult(
+        fixed_text="",
+        target_encoding=request.target_encoding,
+        changed=False,
+    )
+    meta = EncodingRepairMeta(
+        mode_used=request.mode,
+        detected_path=None,
+        confidence=0.0,
+        status=status,
+        execution_ms=elapsed,
+        input_bytes_length=input_bytes_length,
+    )
+    return EncodingRepairResponse(result=result, meta=meta)
+
+
+def build_normalizer(request: EncodingRepairRequestV2) -> TextNormalizer:
+    """リクエストの正規化フラグから TextNormalizer を作る。"""
+    return TextNormalizer(
+        nfkc=request.normalize_nfkc,
+        halfwidth_kana=request.normalize_halfwidth_kana,
+        newlines=request.normalize_newlines,
+        strip_controls=request.strip_control_chars,
+    )
 
-    try:
-        text = raw.decode(assume_current_encoding, errors="strict")
-        had_error = False
-    except UnicodeDecodeError:
-        # どうしても無理な場合は ignore で復元
-        text = raw.decode(assume_current_encoding, errors="ignore")
-        had_error = True
 
-    score = _score_text(text, had_error)
-    detected_path = f"{assume_current_encoding}->{target_encoding}"
-    return text, True, detected_path, score, "ok"
+def build_repair_response(
+    request: EncodingRepairRequestV2,
+    started: float,
+    outcome: RepairOutcome,
+    input_bytes_length: int,
+    **meta_fields,
+) -> EncodingRepairResponse:
+    """
+    修復結果から output_format に応じた result / meta を組み立てる。
+    meta_fields は EncodingRepairMeta の追加項目（prior_used など）。
+    """
+    fixed_text, changed, detected_path, score, status, errors = outcome
+    elapsed = (time.perf_counter() - started) * 1000.0
 
+    error_density = errors.density(input_bytes_length)
+    # スコアリングを省略した場合は不正バイトの割合から信頼度を出す
+    confidence = _score_to_confidence(score) if score is not None else 1.0 - error_density
 
-def repair_encoding_v2(request: EncodingRepairRequestV2) -> EncodingRepairResponse:
+    fixed_text_base64: Optional[str] = None
+    if request.output_format == "detect_only":
+        fixed_text = ""
+    elif request.output_format == "base64":
+        encoded, encode_error = encode_output_bytes(fixed_text, request.target_encoding)
+        if encode_error is not None:
+            status = encode_error
+        else:
+            fixed_text_base64 = base64.b64encode(encoded).decode("ascii")
+        fixed_text = ""
+
+    result = EncodingRepairResult(
+        fixed_text=fixed_text,
+        target_encoding=request.target_encoding,
+        changed=changed,
+        fixed_text_base64=fixed_text_base64,
+    )
+    meta = EncodingRepairMeta(
+        mode_used=request.mode,
+        detected_path=detected_path,
+        confidence=confidence,
+        status=status,
+        execution_ms=elapsed,
+        input_bytes_length=input_bytes_length,
+        error_count=errors.count,
+        error_density=error_density,
+        error_spans=errors.spans,
+        **meta_fields,
+    )
+    return EncodingRepairResponse(result=result, meta=meta)
+
+
+def repair_encoding_v2(
+    request: EncodingRepairRequestV2,
+    max_decompressed_bytes: int = DEFAULT_MAX_DECOMPRESSED_BYTES,
+) -> EncodingRepairResponse:
     """
     v2.0 のメインエントリ。
 
     - Base64 をデコード
+    - compression 指定時は展開後サイズの上限（max_decompressed_bytes）を確認し、
+      判定・修復はチャンクごとに展開しながら行う（展開後の全体は保持しない）
     - mode に応じて auto / manual ロジックを実行
     - Safe filter ポリシーに基づき result/meta を組み立てる
     """
     started = time.perf_counter()
 
+    # 未知の出力エンコーディング名は Base64 デコード前に拒否
+    target_encoding = normalize_encoding_name(request.target_encoding)
+    if target_encoding is None:
+        return _error_response(request, "invalid_encoding_name", started)
+
     raw, base64_error = _decode_base64(request.raw_bytes_base64)
     if base64_error is not None or raw is None:
-        elapsed = (time.perf_counter() - started) * 1000.0
-        result = EncodingRepairResult(
-            fixed_text="",
-            target_encoding=request.target_encoding,
-            changed=False,
-        )
-        meta = EncodingRepairMeta(
-            mode_used=request.mode,
-            detected_path=None,
-            confidence=0.0,
-            status=base64_error or "invalid_base64",
-            execution_ms=elapsed,
-            input_bytes_length=0,
-        )
-        return EncodingRepairResponse(result=result, meta=meta)
+        return _error_response(request, base64_error or "invalid_base64", started)
+
+    compressed_bytes_length: Optional[int] = None
+    if request.compression == "none":
+        payload = RepairPayload.from_bytes(raw)
+    else:
+        compressed_bytes_length = len(raw)
+        try:
+            payload = RepairPayload.from_compressed(raw, request.compression, max_decompressed_bytes)
+        except DecompressionError as exc:
+            return _error_response(request, exc.status, started, input_bytes_length=compressed_bytes_length)
+        del raw
 
+    normalizer = build_normalizer(request)
+
+    prior_used = False
+    charset_source: Optional[str] = None
     if request.mode == "manual":
-        fixed_text, changed, detected_path, score, status = _manual_repair(
-            raw=raw,
+        outcome = _manual_repair(
+            data=payload,
             assume_current_encoding=request.assume_current_encoding,
-            target_encoding=request.target_encoding,
+            target_encoding=target_encoding,
+            error_policy=request.error_policy,
+            scoring=request.manual_scoring,
+            normalizer=normalizer,
         )
     else:
-        fixed_text, changed, detected_path, score, status = _auto_repair(
-            raw=raw,
-            target_encoding=request.target_encoding,
+        # detect_only では判定だけを行い、修復テキストの生成・正規化を省略する
+        detect_only = request.output_format == "detect_only"
+        if detect_only:
+            normalizer = None
+        # 文書自身の宣言 → ソースの事前分布 → 候補の総当たり の順に試す
+        hint_result, charset_source = _hint_repair(payload, request.charset_hint, target_encoding, normalizer)
+        prior_result = None
+        if hint_result is None and request.source_id:
+            prior_encoding = DEFAULT_SOURCE_PRIOR_STORE.lookup(request.source_id)
+            prior_result = _prior_repair(payload, prior_encoding, target_encoding, normalizer) if prior_encoding else None
+        prior_used = prior_result is not None
+        outcome = hint_result or prior_result or _auto_repair(
+            data=payload,
+            target_encoding=target_encoding,
+            error_policy=request.error_policy,
+            normalizer=normalizer,
+            materialize=not detect_only,
         )
+        _, _, detected_path, _, status, _ = outcome
+        if request.source_id and status == "ok" and detected_path is not None:
+            # detected_path は "<判定エンコーディング>-><target>"
+            DEFAULT_SOURCE_PRIOR_STORE.record(request.source_id, detected_path.split("->", 1)[0])
 
-    elapsed = (time.perf_counter() - started) * 1000.0
-    input_len = len(raw)
+    return build_repair_response(
+        request,
+        started,
+        outcome,
+        input_bytes_length=payload.total,
+        prior_used=prior_used,
+        hint_used=charset_source is not None,
+        charset_source=charset_source,
+        compressed_bytes_length=compressed_bytes_length,
+    )
 
-    # スコアをそのまま 0〜1 に正規化はしていないが、便宜上 0〜1 クランプ
-    confidence = max(0.0, min(1.0, (score + 1.0) / 2.0))
 
-    result = EncodingRepairResult(
-        fixed_text=fixed_text,
-        target_encoding=request.target_encoding,
+def detect_encoding(raw: bytes, target_encoding: str = "utf-8") -> EncodingDetectResponse:
+    """
+    判定専用のエントリ（バイト列を直接受け取る）。
+
+    _auto_repair と同じスコアリング・Safe filter で判定するが、
+    判定が確定した時点で候補評価を打ち切り、修復テキストは返さない。
+    candidates はスコア降順（打ち切られた候補は末尾）。
+    """
+    started = time.perf_counter()
+
+    candidates, early_exit = _evaluate_candidates(raw)
+    selected, changed = _select_candidate(candidates)
+
+    ranked = sorted(candidates, key=lambda c: (c.pruned, -c.score))
+    result = EncodingDetectResult(
+        detected_encoding=selected.encoding if selected is not None else None,
         changed=changed,
+        candidates=[
+            DetectionCandidate(
+                encoding=c.encoding,
+                score=None if c.pruned else c.score,
+                had_error=c.had_error,
+                pruned=c.pruned,
+            )
+            for c in ranked
+        ],
     )
-    meta = EncodingRepairMeta(
-        mode_used=request.mode,
+
+    if selected is None:
+        detected_path = None
+        confidence = 0.0
+        status = "no_meaningful_output"
+    else:
+        detected_path = f"{selected.encoding}->{target_encoding}"
+        confidence = _score_to_confidence(selected.score)
+        status = "ok"
+
+    meta = EncodingDetectMeta(
         detected_path=detected_path,
         confidence=confidence,
         status=status,
-        execution_ms=elapsed,
-        input_bytes_length=input_len,
+        execution_ms=(time.perf_counter() - started) * 1000.0,
+        input_bytes_length=len(raw),
+        early_exit=early_exit,
     )
-    return EncodingRepairResponse(result=result, meta=meta)
+    return EncodingDetectResponse(result=result, meta=meta)
+
+
+def _detect_error_response(status: str, started: float) -> EncodingDetectResponse:
+    """判定を実行せずに終了する場合のレスポンス。"""
+    elapsed = (time.perf_counter() - started) * 1000.0
+    return EncodingDetectResponse(
+        result=EncodingDetectResult(detected_encoding=None, changed=False, candidates=[]),
+        meta=EncodingDetectMeta(
+            detected_path=None,
+            confidence=0.0,
+            status=status,
+            execution_ms=elapsed,
+            input_bytes_length=0,
+        ),
+    )
+
+
+def detect_encoding_v2(request: EncodingDetectRequestV2) -> EncodingDetectResponse:
+    """
+    判定専用 API のメインエントリ。
+
+    - Base64 をデコード
+    - detect_encoding で判定
+    """
+    started = time.perf_counter()
+
+    target_encoding = normalize_encoding_name(request.target_encoding)
+    if target_encoding is None:
+        return _detect_error_response("invalid_encoding_name", started)
+
+    raw, base64_error = _decode_base64(request.raw_bytes_base64)
+    if base64_error is not None or raw is None:
+        return _detect_error_response(base64_error or "invalid_base64", started)
 
+    response = detect_encoding(raw, target_encoding=target_encoding)
+    response.meta.execution_ms = (time.perf_counter() - started) * 1000.0
+    return response
@@ -0,0 +1,220 @@
+# core/incremental.py
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from .codec_registry import get_incremental_decoder
+from .decode_errors import CountingDecoder, ErrorPolicy
+from .encoding_repair_v2 import _evaluate_candidates, _is_plain_ascii, _select_candidate
+
+
+# 追記分を読み込む単位（大きなバックログの追いつき時もこの単位で処理・保存する）
+INCREMENTAL_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(slots=True)
+class FileState:
+    """
+    ファイルごとの追従状態。
+
+    - offset: 読み込み済みのバイト位置
+    - encoding: 判定済みエンコーディング（ASCII しか出現していなければ None）
+    - pending: 前回の末尾で途切れていたマルチバイト文字のバイト列
+    - decoder_flag: デコーダの内部状態（ISO-2022-JP のシフト状態など）
+    - inode: ローテーション・置き換えの検出用
+    """
+    offset: int = 0
+    encoding: Optional[str] = None
+    pending: bytes = b""
+    decoder_flag: int = 0
+    inode: Optional[int] = None
+
+
+class JsonStateStore:
+    """
+    FileState を 1 つの JSON ファイルに保存する小さな状態ストア。
+    保存は一時ファイルからの os.replace で行う。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._states: Dict[str, FileState] = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        for key, item in data.get("files", {}).items():
+            item["pending"] = base64.b64decode(item.get("pending", ""))
+            self._states[key] = FileState(**item)
+
+    def get(self, key: str) -> FileState:
+        """状態のコピーを返す（put するまでストアには反映されない）。"""
+        state = self._states.get(key)
+        return replace(state) if state is not None else FileState()
+
+    def put(self, key: str, state: FileState) -> None:
+        self._states[key] = state
+
+    def save(self) -> None:
+        files = {}
+        for key, state in self._states.items():
+            item = asdict(state)
+            item["pending"] = base64.b64encode(state.pending).decode("ascii")
+            files[key] = item
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "files": files}, f)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass(slots=True)
+class IncrementalUpdate:
+    """追記分 1 チャンクの修復結果。"""
+    path: str
+    text: str
+    bytes_read: int
+    encoding: Optional[str]
+    redetected: bool = False
+    rotated: bool = False
+
+
+def _detect(data: bytes) -> str:
+    candidates, _ = _evaluate_candidates(data, final=False)
+    selected, _ = _select_candidate(candidates)
+    return selected.encoding if selected is not None else "utf-8"
+
+
+def _validate(data: bytes, encoding: str, state: FileState) -> Optional[Tuple[str, bytes, int]]:
+    """
+    判定済みエンコーディングで新しいバイト列を strict にデコードできるか検証する。
+    成功すれば (テキスト, 未完了バイト, デコーダ状態) を返す。
+
+    verify_declared_encoding と同様に、非 UTF-8 のエンコーディングで
+    非 ASCII の妥当な UTF-8 が届いた場合も失敗扱いにする。
+    """
+    decoder = get_incremental_decoder(encoding)
+    decoder.setstate((state.pending, state.decoder_flag))
+    try:
+        text = decoder.decode(data, final=False)
+    except UnicodeDecodeError:
+        return None
+    if encoding != "utf-8" and not data.isascii():
+        try:
+            get_incremental_decoder("utf-8").decode(data, final=False)
+            return None
+        except UnicodeDecodeError:
+            pass
+    pending, flag = decoder.getstate()
+    return text, pending, flag
+
+
+class IncrementalRepairer:
+    """
+    追記専用のログファイルを、前回からの追記分だけ修復する。
+
+    - ファイルごとの読み込み位置・判定済みエンコーディング・途切れたマルチバイト文字を
+      状態ストアに保存し、次回はその続きから処理する
+    - 追記分が判定済みエンコーディングで検証に通る限り再判定しない
+      （通らなければ追記分で判定し直し、以降はその結果を使う）
+    - inode の変化やファイルの縮小を検出したら、新しいファイルとして先頭から読む
+
+    catch_up() は現時点の末尾まで一度だけ追いつき、follow() は追記を待ち続ける。
+    状態はチャンクを呼び出し側に返した後に保存するため、途中で止めた場合は
+    最後のチャンクが次回もう一度返る（取りこぼしはしない）。
+    """
+
+    def __init__(
+        self,
+        store: JsonStateStore,
+        error_policy: ErrorPolicy = "ignore",
+        chunk_size: int = INCREMENTAL_CHUNK_SIZE,
+    ) -> None:
+        self.store = store
+        self.error_policy = error_policy
+        self.chunk_size = chunk_size
+
+    def catch_up(self, path: str) -> Iterator[IncrementalUpdate]:
+        """現時点のファイル末尾までの追記分を、chunk_size ごとに修復して返す。"""
+        key = os.path.abspath(path)
+        state = self.store.get(key)
+
+        with open(key, "rb") as f:
+            stat = os.fstat(f.fileno())
+            rotated = state.inode is not None and (stat.st_ino != state.inode or stat.st_size < state.offset)
+            if rotated:
+                # 新しいファイル: 位置と途中のバイトは捨てるが、エンコーディングは引き継いで検証する
+                state = FileState(encoding=state.encoding)
+            state.inode = stat.st_ino
+
+            f.seek(state.offset)
+            while True:
+                data = f.read(self.chunk_size)
+                if not data:
+                    break
+                update = self._repair_chunk(key, data, state)
+                update.rotated, rotated = rotated, False
+                yield update
+                self.store.put(key, state)
+                self.store.save()
+
+        if rotated:
+            # 追記分がなくてもローテーションを検出した状態は保存する
+            self.store.put(key, state)
+            self.store.save()
+
+    def follow(
+        self,
+        paths: Sequence[str],
+        poll_interval: float = 1.0,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ) -> Iterator[IncrementalUpdate]:
+        """paths の追記を poll_interval ごとに確認し続ける。should_stop() が True で終了する。"""
+        while True:
+            for path in paths:
+                try:
+                    yield from self.catch_up(path)
+                except FileNotFoundError:
+                    # ローテーション中などで一時的に存在しない
+                    continue
+            if should_stop is not None and should_stop():
+                return
+            time.sleep(poll_interval)
+
+    def _repair_chunk(self, key: str, data: bytes, state: FileState) -> IncrementalUpdate:
+        bytes_read = len(data)
+        state.offset += bytes_read
+
+        if state.encoding is None and not state.pending and _is_plain_ascii(data):
+            # ASCII のみの間はどの候補でも同じ結果になるので判定しない
+            return IncrementalUpdate(path=key, text=data.decode("ascii"), bytes_read=bytes_read, encoding=None)
+
+        redetected = False
+        if state.encoding is not None:
+            validated = _validate(data, state.encoding, state)
+            if validated is not None:
+                text, state.pending, state.decoder_flag = validated
+                return IncrementalUpdate(path=key, text=text, bytes_read=bytes_read, encoding=state.encoding)
+            redetected = True
+
+        # 未判定、または検証に失敗: 途切れていたバイトを含めて判定し直す
+        data = state.pending + data
+        state.encoding = _detect(data)
+        decoder = CountingDecoder(state.encoding, self.error_policy)
+        text = decoder.decode(data, final=False)
+        state.pending, state.decoder_flag = decoder.getstate()
+        return IncrementalUpdate(
+            path=key,
+            text=text,
+            bytes_read=bytes_read,
+            encoding=state.encoding,
+            redetected=redetected,
+        )
@@ -0,0 +1,339 @@
+# core/jobs.py
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import CancelledError, Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import BinaryIO, Iterator, Literal, Optional
+
+from pydantic import BaseModel
+
+from .codec_registry import lookup_codec
+from .decode_errors import ErrorPolicy
+from .encoding_repair_stream import StreamingRepairer
+
+
+JobState = Literal["queued", "running", "done", "failed"]
+
+# ワーカーが入力を読み込む単位
+JOB_CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_JOB_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_JOB_WORKERS = 2
+# 1 ジョブあたりの入力サイズの上限（超えた場合は 413）
+DEFAULT_JOB_MAX_INPUT_BYTES = 4 * 1024 * 1024 * 1024
+
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobStatus(BaseModel):
+    """
+    非同期修復ジョブの状態。
+
+    - state: queued / running / done / failed
+    - status: 修復結果のステータス（done 時は "ok"、failed 時はエラー内容）
+    - output_bytes_length: done 時の結果バイト数（Range 取得の範囲）
+    """
+    job_id: str
+    state: JobState
+    target_encoding: str
+    error_policy: ErrorPolicy = "ignore"
+    status: Optional[str] = None
+    input_bytes_length: int = 0
+    output_bytes_length: int = 0
+    detected_path: Optional[str] = None
+    changed: bool = False
+    confidence: float = 0.0
+    error_count: int = 0
+    created_at: float
+    updated_at: float
+
+
+class JobMeta(BaseModel):
+    version: str = "2.0.0"
+    status: str
+
+
+class JobResponse(BaseModel):
+    result: Optional[JobStatus] = None
+    meta: JobMeta
+
+
+class JobStore(ABC):
+    """
+    ジョブの入力・結果・状態を保存するストアの抽象クラス。
+
+    ワーカープロセスに渡されるため、実装は pickle 可能であること
+    （接続などはメソッド内で開く）。オブジェクトストレージ版などはこれを実装して差し替える。
+    """
+
+    @abstractmethod
+    def open_input_writer(self, job_id: str) -> BinaryIO:
+        """ジョブ入力の書き込み用ストリームを開く。"""
+
+    @abstractmethod
+    def open_input_reader(self, job_id: str) -> BinaryIO:
+        """ジョブ入力の読み込み用ストリームを開く。"""
+
+    @abstractmethod
+    def open_result_writer(self, job_id: str) -> BinaryIO:
+        """結果の書き込み用ストリームを開く。"""
+
+    @abstractmethod
+    def iter_result(self, job_id: str, start: int, end: int, chunk_size: int = JOB_CHUNK_SIZE) -> Iterator[bytes]:
+        """結果のバイト範囲 [start, end) を chunk_size ごとに返す。"""
+
+    @abstractmethod
+    def write_status(self, status: JobStatus) -> None:
+        """状態を保存する（読み手から中途半端な内容が見えないこと）。"""
+
+    @abstractmethod
+    def read_status(self, job_id: str) -> Optional[JobStatus]:
+        """状態を読む。存在しない（期限切れを含む）場合は None。"""
+
+    @abstractmethod
+    def delete(self, job_id: str) -> None:
+        """ジョブの入力・結果・状態をすべて削除する。"""
+
+    @abstractmethod
+    def cleanup_expired(self) -> int:
+        """TTL を過ぎたジョブを削除し、削除件数を返す。"""
+
+
+class LocalFileJobStore(JobStore):
+    """
+    ローカルファイルシステム上のジョブストア。
+
+    <root>/<job_id>/ に input.bin / result.bin / status.json を置く。
+    status.json は一時ファイルからの os.replace で更新する。
+    最終更新から ttl_seconds を過ぎたジョブは cleanup_expired() で削除する。
+    """
+
+    def __init__(self, root: str, ttl_seconds: float = DEFAULT_JOB_TTL_SECONDS) -> None:
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _job_dir(self, job_id: str) -> Path:
+        if not _JOB_ID_RE.match(job_id):
+            raise ValueError(f"invalid job id: {job_id!r}")
+        return self.root / job_id
+
+    def open_input_writer(self, job_id: str) -> BinaryIO:
+        job_dir = self._job_dir(job_id)
+        job_dir.mkdir(exist_ok=True)
+        return open(job_dir / "input.bin", "wb")
+
+    def open_input_reader(self, job_id: str) -> BinaryIO:
+        return open(self._job_dir(job_id) / "input.bin", "rb")
+
+    def open_result_writer(self, job_id: str) -> BinaryIO:
+        return open(self._job_dir(job_id) / "result.bin", "wb")
+
+    def iter_result(self, job_id: str, start: int, end: int, chunk_size: int = JOB_CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self._job_dir(job_id) / "result.bin", "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def write_status(self, status: JobStatus) -> None:
+        job_dir = self._job_dir(status.job_id)
+        job_dir.mkdir(exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=job_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(status.model_dump_json())
+        os.replace(tmp_path, job_dir / "status.json")
+
+    def read_status(self, job_id: str) -> Optional[JobStatus]:
+        try:
+            path = self._job_dir(job_id) / "status.json"
+            with open(path, encoding="utf-8") as f:
+                status = JobStatus.model_validate(json.load(f))
+        except (ValueError, OSError):
+            return None
+        if time.time() - status.updated_at > self.ttl_seconds:
+            return None
+        return status
+
+    def delete(self, job_id: str) -> None:
+        shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+
+    def cleanup_expired(self) -> int:
+        removed = 0
+        now = time.time()
+        for job_dir in self.root.iterdir():
+            if not _JOB_ID_RE.match(job_dir.name):
+                continue
+            status_path = job_dir / "status.json"
+            try:
+                expired = now - status_path.stat().st_mtime > self.ttl_seconds
+            except OSError:
+                # 状態ファイルがない（入力の受信中など）: ディレクトリの更新時刻で判断
+                expired = now - job_dir.stat().st_mtime > self.ttl_seconds
+            if expired:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def _update_status(store: JobStore, current: JobStatus, **changes) -> JobStatus:
+    updated = current.model_copy(update={**changes, "updated_at": time.time()})
+    store.write_status(updated)
+    return updated
+
+
+def run_repair_job(store: JobStore, job_id: str) -> None:
+    """
+    ワーカープロセスで実行するジョブ本体。
+
+    入力を JOB_CHUNK_SIZE ごとに StreamingRepairer に流し、
+    target_encoding でエンコードしながら結果に書き出す（メモリ使用量は入力サイズに依存しない）。
+    """
+    status = store.read_status(job_id)
+    if status is None:
+        return
+    status = _update_status(store, status, state="running")
+
+    try:
+        encoder = lookup_codec(status.target_encoding).incrementalencoder("replace")
+        repairer = StreamingRepairer(target_encoding=status.target_encoding, error_policy=status.error_policy)
+        output_length = 0
+        with store.open_input_reader(job_id) as source, store.open_result_writer(job_id) as dest:
+            while True:
+                chunk = source.read(JOB_CHUNK_SIZE)
+                text = repairer.feed(chunk) if chunk else repairer.finish()
+                data = encoder.encode(text, final=not chunk)
+                dest.write(data)
+                output_length += len(data)
+                if not chunk:
+                    break
+    except Exception as exc:  # ワーカーの例外は状態として返す
+        _update_status(store, status, state="failed", status=f"job_failed: {type(exc).__name__}")
+        return
+
+    _update_status(
+        store,
+        status,
+        state="done",
+        status="ok",
+        input_bytes_length=repairer.input_bytes_length,
+        output_bytes_length=output_length,
+        detected_path=repairer.detected_path,
+        changed=repairer.changed,
+        confidence=repairer.confidence,
+        error_count=repairer.errors.count,
+    )
+
+
+class JobManager:
+    """
+    ジョブの受付とワーカー（既定は ProcessPoolExecutor）への投入を行う。
+
+    プロセスプールは最初の投入時に生成する。受付のたびに期限切れジョブを掃除する。
+    ワーカーが異常終了した（BrokenProcessPool など）ジョブは failed にし、
+    壊れたプロセスプールは次の投入時に作り直す。
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        max_workers: int = DEFAULT_JOB_WORKERS,
+        executor: Optional[Executor] = None,
+        max_input_bytes: int = DEFAULT_JOB_MAX_INPUT_BYTES,
+    ) -> None:
+        self.store = store
+        self.max_workers = max_workers
+        self.max_input_bytes = max_input_bytes
+        self._executor = executor
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "JobManager":
+        """ENCODING_REPAIR_JOB_* 環境変数から設定を読み込む（未設定は既定値）。"""
+        root = os.environ.get("ENCODING_REPAIR_JOB_ROOT") or os.path.join(
+            tempfile.gettempdir(), "encoding-repair-jobs"
+        )
+        ttl = float(os.environ.get("ENCODING_REPAIR_JOB_TTL_SECONDS") or DEFAULT_JOB_TTL_SECONDS)
+        workers = int(os.environ.get("ENCODING_REPAIR_JOB_WORKERS") or DEFAULT_JOB_WORKERS)
+        max_input = int(os.environ.get("ENCODING_REPAIR_JOB_MAX_INPUT_BYTES") or DEFAULT_JOB_MAX_INPUT_BYTES)
+        return cls(LocalFileJobStore(root, ttl_seconds=ttl), max_workers=workers, max_input_bytes=max_input)
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                # API サーバのスレッド（ロックを保持しているものを含む）を fork で複製しないよう spawn で起動する
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def create_job(self, target_encoding: str, error_policy: ErrorPolicy = "ignore") -> JobStatus:
+        """ジョブを作成する。入力は store.open_input_writer(job_id) で書き込んでから submit() する。"""
+        self.store.cleanup_expired()
+        now = time.time()
+        status = JobStatus(
+            job_id=uuid.uuid4().hex,
+            state="queued",
+            target_encoding=target_encoding,
+            error_policy=error_policy,
+            created_at=now,
+            updated_at=now,
+        )
+        self.store.write_status(status)
+        return status
+
+    def _discard_broken_executor(self, executor: Executor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _mark_failed(self, job_id: str, exc: BaseException) -> Optional[JobStatus]:
+        status = self.store.read_status(job_id)
+        if status is None or status.state in ("done", "failed"):
+            return status
+        return _update_status(self.store, status, state="failed", status=f"job_failed: {type(exc).__name__}")
+
+    def _on_job_finished(self, job_id: str, executor: Executor, future: Future) -> None:
+        # run_repair_job 自体の例外は状態に書き込み済み。ここに来るのはワーカーの
+        # 異常終了（BrokenProcessPool）や pickle の失敗など、ジョブ本体が完了しなかった場合
+        exc = CancelledError() if future.cancelled() else future.exception()
+        if exc is None:
+            return
+        self._mark_failed(job_id, exc)
+        if isinstance(exc, BrokenProcessPool):
+            self._discard_broken_executor(executor)
+
+    def submit(self, status: JobStatus, input_bytes_length: int) -> JobStatus:
+        """入力の書き込みが完了したジョブをワーカーに投入する。"""
+        status = _update_status(self.store, status, input_bytes_length=input_bytes_length)
+        executor = self._get_executor()
+        try:
+            future = executor.submit(run_repair_job, self.store, status.job_id)
+        except BrokenProcessPool as exc:
+            self._discard_broken_executor(executor)
+            return self._mark_failed(status.job_id, exc) or status
+        future.add_done_callback(lambda f: self._on_job_finished(status.job_id, executor, f))
+        return status
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,116 @@
+# core/normalization.py
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Dict, Optional
+
+
+# 除去する制御文字（タブ・改行・復帰以外の C0 と DEL）
+_CONTROL_CHARS = [*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F]
+
+# 半角カナ（句読点・濁点・半濁点を含む）U+FF61〜U+FF9F
+_HALFWIDTH_KANA = range(0xFF61, 0xFFA0)
+
+# 濁点・半濁点（結合文字）と、その前のカナ 1 文字
+_VOICED_PAIR_RE = re.compile("[\u3041-\u30ff][\u3099\u309a]")
+
+
+def _build_table(strip_controls: bool, halfwidth_kana: bool, newlines: bool) -> Dict[int, Optional[str]]:
+    """有効なオプションを 1 つの str.translate 用テーブルにまとめる。"""
+    table: Dict[int, Optional[str]] = {}
+    if strip_controls:
+        table.update(dict.fromkeys(_CONTROL_CHARS))
+    if newlines:
+        # CRLF は translate の前に置換済みなので、ここでは単独の CR のみ
+        table[0x0D] = "\n"
+    if halfwidth_kana:
+        # NFKC で全角に寄せる（ﾞ / ﾟ は結合用の U+3099 / U+309A になる）
+        for cp in _HALFWIDTH_KANA:
+            table[cp] = unicodedata.normalize("NFKC", chr(cp))
+    return table
+
+
+def _compose_voiced(match: re.Match) -> str:
+    return unicodedata.normalize("NFC", match.group(0))
+
+
+class TextNormalizer:
+    """
+    修復後テキストの正規化を 1 パスでまとめて行う。
+
+    - strip_controls: NUL などの制御文字（タブ・改行以外）を除去
+    - newlines: CRLF / CR を LF に統一
+    - halfwidth_kana: 半角カナを全角カナに変換（濁点・半濁点は合成）
+    - nfkc: Unicode NFKC 正規化
+
+    文字単位の変換は事前計算した 1 つの変換テーブルで処理する。
+    feed() はチャンクごとに呼べるよう、次のチャンクと結合し得る末尾
+    （CR や、後ろに濁点・結合文字が続き得る文字）を保持して次回に回す。
+    """
+
+    def __init__(
+        self,
+        nfkc: bool = False,
+        halfwidth_kana: bool = False,
+        newlines: bool = False,
+        strip_controls: bool = False,
+    ) -> None:
+        self.nfkc = nfkc
+        self.halfwidth_kana = halfwidth_kana
+        self.newlines = newlines
+        self._table = _build_table(strip_controls, halfwidth_kana, newlines)
+        self._carry = ""
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._table) or self.nfkc
+
+    def normalize(self, text: str) -> str:
+        """チャンク境界を考慮せず、text 全体を一度に正規化する。"""
+        if self.newlines:
+            text = text.replace("\r\n", "\n")
+        if self._table:
+            text = text.translate(self._table)
+        if self.nfkc:
+            text = unicodedata.normalize("NFKC", text)
+        elif self.halfwidth_kana:
+            text = _VOICED_PAIR_RE.sub(_compose_voiced, text)
+        return text
+
+    def feed(self, text: str) -> str:
+        """チャンクを正規化し、境界の影響を受けない部分を返す。"""
+        text = self._carry + text
+        cut = self._safe_boundary(text)
+        self._carry = text[cut:]
+        return self.normalize(text[:cut])
+
+    def finish(self) -> str:
+        """保持している末尾を正規化して返す。"""
+        text, self._carry = self._carry, ""
+        return self.normalize(text)
+
+    def _safe_boundary(self, text: str) -> int:
+        """
+        text[:cut] を確定してよい位置を返す。
+
+        最後の「結合されない文字」（結合クラス 0 で濁点・半濁点・CR・除去する制御文字以外）の
+        手前で切り、それ以降は次のチャンクと合わせて正規化する。除去する制御文字は
+        前の文字と後続の濁点の間にあっても除去後に合成されるため、前の文字と一緒に保持する。
+        """
+        if not (self.nfkc or self.halfwidth_kana or self.newlines):
+            return len(text)
+        for index in range(len(text) - 1, -1, -1):
+            char = text[index]
+            if char == "\r" or char in "\uff9e\uff9f\u3099\u309a" or unicodedata.combining(char):
+                continue
+            if self._table.get(ord(char), char) is None:
+                continue
+            # 文字自体も後続の結合文字と合成され得る（改行の統一のみなら確定してよい）
+            cut = index if self.nfkc or self.halfwidth_kana else index + 1
+            if cut and text[cut - 1] == "\r":
+                # CR の直後で切ると CRLF が 2 つの改行になる
+                cut -= 1
+            return cut
+        return 0
@@ -0,0 +1,97 @@
+# core/source_priors.py
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+# この重み以上の一貫した判定が溜まったソースは事前分布を使う
+DEFAULT_MIN_WEIGHT = 5.0
+# 重みが半分になるまでの時間（秒）。古い判定ほど影響が小さくなる
+DEFAULT_HALF_LIFE_SECONDS = 24 * 60 * 60.0
+# 保持するソース数の上限（超えた場合は最も長く使われていないものから破棄）
+DEFAULT_MAX_SOURCES = 10_000
+# 記録の間のわずかな時間減衰で閾値を割らないための許容幅（判定 0.5 回分）
+_WEIGHT_TOLERANCE = 0.5
+
+
+@dataclass(slots=True)
+class SourcePrior:
+    encoding: str
+    weight: float
+    updated_at: float
+
+
+class SourcePriorStore:
+    """
+    ソースごとのエンコーディング事前分布（プロセス内メモリ）。
+
+    - record(): 判定結果を記録する。同じエンコーディングが続くと重みが増え、
+      異なるエンコーディングが来ると重みが減る（0 以下になれば入れ替わる）
+    - lookup(): 時間減衰後の重みが min_weight 以上ならそのエンコーディングを返す
+
+    複数スレッド（FastAPI の同期エンドポイント）から呼ばれるためロックで保護する。
+    """
+
+    def __init__(
+        self,
+        min_weight: float = DEFAULT_MIN_WEIGHT,
+        half_life_seconds: float = DEFAULT_HALF_LIFE_SECONDS,
+        max_sources: int = DEFAULT_MAX_SOURCES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.min_weight = min_weight
+        self.half_life_seconds = half_life_seconds
+        self.max_sources = max_sources
+        self._clock = clock
+        self._priors: "OrderedDict[str, SourcePrior]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _decayed_weight(self, prior: SourcePrior, now: float) -> float:
+        elapsed = max(0.0, now - prior.updated_at)
+        return prior.weight * 0.5 ** (elapsed / self.half_life_seconds)
+
+    def lookup(self, source_id: str) -> Optional[str]:
+        """十分に一貫した判定があるソースなら、そのエンコーディングを返す。"""
+        with self._lock:
+            prior = self._priors.get(source_id)
+            if prior is None:
+                return None
+            self._priors.move_to_end(source_id)
+            if self._decayed_weight(prior, self._clock()) < self.min_weight - _WEIGHT_TOLERANCE:
+                return None
+            return prior.encoding
+
+    def record(self, source_id: str, encoding: str) -> None:
+        """判定結果（事前分布を使った場合も含む）を記録する。"""
+        now = self._clock()
+        with self._lock:
+            prior = self._priors.get(source_id)
+            if prior is None:
+                self._priors[source_id] = SourcePrior(encoding=encoding, weight=1.0, updated_at=now)
+                while len(self._priors) > self.max_sources:
+                    self._priors.popitem(last=False)
+                return
+
+            weight = self._decayed_weight(prior, now)
+            if prior.encoding == encoding:
+                prior.weight = weight + 1.0
+            elif weight > 1.0:
+                prior.weight = weight - 1.0
+            else:
+                prior.encoding = encoding
+                prior.weight = 1.0
+            prior.updated_at = now
+            self._priors.move_to_end(source_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._priors.clear()
+
+
+# API から使う既定のストア
+DEFAULT_SOURCE_PRIOR_STORE = SourcePriorStore()
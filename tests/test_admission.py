@@ -0,0 +1,124 @@
+# tests/test_admission.py
+
+from __future__ import annotations
+
+import base64
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.fastapi_app import main
+from core.admission import AdmissionController
+
+client = TestClient(main.app)
+
+
+def test_classify_by_size():
+    controller = AdmissionController()
+    assert controller.classify(10) == "small"
+    assert controller.classify(100 * 1024) == "medium"
+    assert controller.classify(5 * 1024 * 1024) == "large"
+
+
+def test_payload_too_large_is_rejected_immediately():
+    controller = AdmissionController(max_payload_bytes=100)
+    with controller.admit(101) as rejection:
+        assert rejection == "payload_too_large"
+    assert controller.metrics()["classes"]["small"]["rejected"] == 1
+
+
+def test_large_jobs_are_limited_to_reserved_share():
+    controller = AdmissionController(max_workers=4, large_worker_share=0.25, queue_timeout_seconds=0.05)
+    large = 2 * 1024 * 1024
+
+    with controller.admit(large) as first:
+        assert first is None
+        # large の枠（1）は埋まっているが、small はまだ実行できる
+        with controller.admit(large) as second:
+            assert second == "queue_timeout"
+        with controller.admit(10) as small:
+            assert small is None
+
+    metrics = controller.metrics()
+    assert metrics["running"] == 0
+    assert metrics["bytes_in_flight"] == 0
+    assert metrics["classes"]["large"]["rejected"] == 1
+
+
+def test_waiting_request_runs_after_release():
+    controller = AdmissionController(max_workers=1, queue_timeout_seconds=5.0)
+    results = []
+    release = threading.Event()
+
+    def holder():
+        with controller.admit(10) as rejection:
+            results.append(("holder", rejection))
+            release.wait()
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    while not results:
+        time.sleep(0.001)
+
+    def waiter():
+        with controller.admit(10) as rejection:
+            results.append(("waiter", rejection))
+
+    waiting = threading.Thread(target=waiter)
+    waiting.start()
+    while controller.metrics()["classes"]["small"]["queue_depth"] == 0:
+        time.sleep(0.001)
+
+    release.set()
+    thread.join()
+    waiting.join()
+    assert results == [("holder", None), ("waiter", None)]
+
+
+def test_waiters_beyond_class_cap_are_rejected_without_blocking():
+    controller = AdmissionController(max_workers=1, max_waiting_per_class=1, queue_timeout_seconds=5.0)
+    release = threading.Event()
+    admitted = threading.Event()
+
+    def holder():
+        with controller.admit(10):
+            admitted.set()
+            release.wait()
+
+    def waiter():
+        with controller.admit(10):
+            pass
+
+    threads = [threading.Thread(target=holder), threading.Thread(target=waiter)]
+    threads[0].start()
+    admitted.wait()
+    threads[1].start()
+    while controller.metrics()["classes"]["small"]["queue_depth"] == 0:
+        time.sleep(0.001)
+
+    # 待機枠（1）が埋まっているので、タイムアウトを待たずに拒否される
+    started = time.monotonic()
+    with controller.admit(10) as rejection:
+        assert rejection == "queue_full"
+    assert time.monotonic() - started < 1.0
+
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert controller.metrics()["classes"]["small"]["rejected"] == 1
+
+
+def test_endpoint_returns_413_for_oversized_payload(monkeypatch):
+    monkeypatch.setattr(main, "ADMISSION", AdmissionController(max_payload_bytes=16))
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(b"x" * 64).decode("ascii"),
+        "target_encoding": "utf-8",
+    }
+    resp = client.post("/encoding/v2/repair", json=payload)
+    assert resp.status_code == 413
+    assert resp.json()["meta"]["status"] == "payload_too_large"
+
+    metrics = client.get("/metrics/admission").json()
+    assert metrics["classes"]["small"]["rejected"] == 1
@@ -0,0 +1,155 @@
+# tests/test_archive_repair.py
+
+from __future__ import annotations
+
+import base64
+import io
+import tarfile
+import zipfile
+
+from fastapi.testclient import TestClient
+
+from backend.fastapi_app.main import app
+from core.archive_repair import repair_archive
+
+client = TestClient(app)
+
+
+class _LegacyZipInfo(zipfile.ZipInfo):
+    """UTF-8 フラグなしで cp932 のファイル名を書き込む（古い Windows の zip を再現）"""
+
+    def _encodeFilenameFlags(self):
+        return self.filename.encode("cp932"), self.flag_bits
+
+
+def test_repair_zip_members_and_cp932_names():
+    src = io.BytesIO()
+    with zipfile.ZipFile(src, "w") as zf:
+        zf.writestr(_LegacyZipInfo("報告書/月次レポート.txt"), "月次レポートです。".encode("cp932"))
+        zf.writestr("readme.txt", "テスト".encode("euc_jp"))
+        zf.writestr("image.bin", b"\x89PNG\x00\x00\x81\x82")
+    src.seek(0)
+
+    dst = io.BytesIO()
+    archive_format, reports = repair_archive(src, dst)
+
+    assert archive_format == "zip"
+    assert [r.name for r in reports] == ["報告書/月次レポート.txt", "readme.txt", "image.bin"]
+    assert reports[0].original_name_encoding == "cp932"
+    assert reports[0].detected_path == "cp932->utf-8"
+    assert reports[1].detected_path == "euc_jp->utf-8"
+    assert reports[2].status == "skipped_binary"
+
+    dst.seek(0)
+    with zipfile.ZipFile(dst) as zf:
+        assert zf.read("報告書/月次レポート.txt").decode("utf-8") == "月次レポートです。"
+        assert zf.read("readme.txt").decode("utf-8") == "テスト"
+        assert zf.read("image.bin") == b"\x89PNG\x00\x00\x81\x82"
+
+
+def test_repair_tar_gz_keeps_format():
+    src = io.BytesIO()
+    with tarfile.open(fileobj=src, mode="w:gz", format=tarfile.GNU_FORMAT, encoding="cp932") as tf:
+        for i in range(10):
+            data = f"ログ出力 {i}\r\n".encode("cp932")
+            info = tarfile.TarInfo(f"ログ/{i:02d}.log")
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+    src.seek(0)
+
+    dst = io.BytesIO()
+    archive_format, reports = repair_archive(src, dst, max_workers=2)
+
+    assert archive_format == "tar.gz"
+    assert len(reports) == 10
+    assert all(r.detected_path == "cp932->utf-8" for r in reports)
+
+    dst.seek(0)
+    with tarfile.open(fileobj=dst, mode="r:gz") as tf:
+        members = tf.getmembers()
+        assert [m.name for m in members] == [f"ログ/{i:02d}.log" for i in range(10)]
+        assert tf.extractfile(members[3]).read().decode("utf-8") == "ログ出力 3\r\n"
+
+
+def test_archive_endpoint():
+    src = io.BytesIO()
+    with zipfile.ZipFile(src, "w") as zf:
+        zf.writestr("a.txt", "文字コードのテスト".encode("cp932"))
+
+    payload = {"raw_bytes_base64": base64.b64encode(src.getvalue()).decode("ascii")}
+    resp = client.post("/encoding/v2/archive/repair", json=payload)
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["meta"]["status"] == "ok"
+    assert data["meta"]["member_count"] == 1
+    assert data["meta"]["changed_count"] == 1
+    assert data["result"]["archive_format"] == "zip"
+
+    with zipfile.ZipFile(io.BytesIO(base64.b64decode(data["result"]["archive_base64"]))) as zf:
+        assert zf.read("a.txt").decode("utf-8") == "文字コードのテスト"
+
+
+def test_archive_endpoint_rejects_non_archive():
+    payload = {"raw_bytes_base64": base64.b64encode(b"plain text").decode("ascii")}
+    data = client.post("/encoding/v2/archive/repair", json=payload).json()
+    assert data["meta"]["status"] == "unsupported_archive_format"
+
+
+def test_oversized_members_are_skipped_and_bombs_rejected():
+    src = io.BytesIO()
+    with zipfile.ZipFile(src, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("big.txt", b"a" * 10_000)
+        zf.writestr("small.txt", "テスト".encode("cp932"))
+    src.seek(0)
+
+    dst = io.BytesIO()
+    _, reports = repair_archive(src, dst, max_member_bytes=1_000)
+    assert [(r.name, r.status) for r in reports] == [("big.txt", "skipped_too_large"), ("small.txt", "ok")]
+    dst.seek(0)
+    with zipfile.ZipFile(dst) as zf:
+        assert zf.namelist() == ["small.txt"]
+
+    # 小さな tar.gz が展開後に合計の上限を超える場合は全体を打ち切る
+    bomb = io.BytesIO()
+    with tarfile.open(fileobj=bomb, mode="w:gz") as tf:
+        for i in range(4):
+            info = tarfile.TarInfo(f"zeros{i}.txt")
+            info.size = 2 * 1024 * 1024
+            tf.addfile(info, io.BytesIO(b"0" * info.size))
+    payload = {"raw_bytes_base64": base64.b64encode(bomb.getvalue()).decode("ascii")}
+    data = client.post("/encoding/v2/archive/repair", json=payload).json()
+    assert data["meta"]["status"] == "decompression_limit_exceeded"
+    assert data["result"]["members"] == []
+
+
+def _patch_zip_headers(data: bytes, method: int = None, flag_bits: int = None) -> bytes:
+    """ローカルヘッダと中央ディレクトリの圧縮方式・汎用フラグを書き換える（1 メンバの zip 用）"""
+    patched = bytearray(data)
+    local = patched.index(b"PK\x03\x04")
+    central = patched.index(b"PK\x01\x02")
+    for offset in (local + 6, central + 8):
+        if flag_bits is not None:
+            patched[offset:offset + 2] = flag_bits.to_bytes(2, "little")
+        if method is not None:
+            patched[offset + 2:offset + 4] = method.to_bytes(2, "little")
+    return bytes(patched)
+
+
+def test_unsupported_zip_members_are_reported():
+    src = io.BytesIO()
+    with zipfile.ZipFile(src, "w") as zf:
+        zf.writestr("old.txt", "テスト".encode("cp932"))
+
+    for patched in (
+        _patch_zip_headers(src.getvalue(), method=6),  # implode
+        _patch_zip_headers(src.getvalue(), flag_bits=0x1),  # 暗号化
+    ):
+        payload = {"raw_bytes_base64": base64.b64encode(patched).decode("ascii")}
+        resp = client.post("/encoding/v2/archive/repair", json=payload)
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["meta"]["status"] == "ok"
+        assert [(m["name"], m["status"]) for m in data["result"]["members"]] == [("old.txt", "unsupported_member")]
+        with zipfile.ZipFile(io.BytesIO(base64.b64decode(data["result"]["archive_base64"]))) as zf:
+            assert zf.namelist() == []
@@ -0,0 +1,33 @@
+# tests/test_charset_sniff.py
+
+from __future__ import annotations
+
+from core.charset_sniff import SNIFF_PREFIX_BYTES, parse_content_type_charset, sniff_charset_candidates
+
+
+def test_parse_content_type_charset():
+    assert parse_content_type_charset("text/html; charset=Shift_JIS") == "Shift_JIS"
+    assert parse_content_type_charset('text/xml; charset="euc-jp"') == "euc-jp"
+    assert parse_content_type_charset("EUC-JP") == "EUC-JP"
+    assert parse_content_type_charset("text/html") is None
+    assert parse_content_type_charset(None) is None
+
+
+def test_sniff_meta_and_xml_declarations():
+    html = b'<html><head><meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">'
+    assert sniff_charset_candidates(html) == [("Shift_JIS", "meta")]
+
+    html5 = b"<!doctype html><meta charset=euc-jp><title>"
+    assert sniff_charset_candidates(html5) == [("euc-jp", "meta")]
+
+    xml = b'<?xml version="1.0" encoding="ISO-2022-JP"?><root/>'
+    assert sniff_charset_candidates(xml, "application/xml; charset=utf-8") == [
+        ("utf-8", "content_type"),
+        ("ISO-2022-JP", "xml_declaration"),
+    ]
+
+
+def test_sniff_is_bounded_to_prefix():
+    late = b"<html>" + b" " * SNIFF_PREFIX_BYTES + b'<meta charset="cp932">'
+    assert sniff_charset_candidates(late) == []
+    assert sniff_charset_candidates(b"\xef\xbb\xbfplain") == [("utf-8", "bom")]
@@ -0,0 +1,42 @@
+# tests/test_codec_registry.py
+
+from __future__ import annotations
+
+from core.codec_registry import (
+    lookup_codec,
+    normalize_encoding_name,
+    warm_codec_cache,
+)
+
+
+def test_normalize_aliases():
+    assert normalize_encoding_name("Shift_JIS") == "cp932"
+    assert normalize_encoding_name("sjis") == "cp932"
+    assert normalize_encoding_name("Windows-31J") == "cp932"
+    assert normalize_encoding_name("EUC-JP") == "euc_jp"
+    assert normalize_encoding_name("ISO-8859-1") == "latin1"
+    assert normalize_encoding_name(" UTF8 ") == "utf-8"
+
+
+def test_python_codec_names_are_accepted():
+    # 別名表にない名前も Python のコーデック名で解決する
+    assert normalize_encoding_name("cp1252") == "cp1252"
+    assert lookup_codec("windows-31j").name == "cp932"
+
+
+def test_unknown_names_are_rejected():
+    assert normalize_encoding_name("no-such-codec") is None
+    assert normalize_encoding_name("") is None
+    assert lookup_codec("no-such-codec") is None
+
+
+def test_non_text_codecs_are_rejected():
+    for name in ("hex", "base64", "zlib", "rot13", "bz2", "uu"):
+        assert normalize_encoding_name(name) is None
+        assert lookup_codec(name) is None
+
+
+def test_warm_codec_cache_is_idempotent():
+    warm_codec_cache()
+    warm_codec_cache()
+    assert lookup_codec("sjis") is lookup_codec("cp932")
@@ -0,0 +1,75 @@
+# tests/test_columnar.py
+
+from __future__ import annotations
+
+import base64
+
+import pytest
+
+from core.columnar import repair_binary_column, repair_binary_values
+from core.encoding_repair_v2 import EncodingRepairRequestV2, repair_encoding_v2
+
+
+def _expected(raw: bytes):
+    request = EncodingRepairRequestV2(raw_bytes_base64=base64.b64encode(raw).decode("ascii"))
+    response = repair_encoding_v2(request)
+    return response.result.fixed_text, response.meta.detected_path, response.meta.confidence, response.meta.status
+
+
+def test_column_matches_per_cell_repair():
+    values = [
+        "東京都".encode("cp932"),
+        "大阪府".encode("utf-8"),
+        None,
+        "東京都".encode("cp932"),
+        b"plain ascii",
+        "ｶﾀｶﾅのセル".encode("euc_jp"),
+    ]
+    result = repair_binary_values(values)
+
+    assert len(result) == len(values)
+    assert result.statuses[2] == "null"
+    assert result.fixed_texts[2] is None
+    for index, raw in enumerate(values):
+        if raw is None:
+            continue
+        text, path, confidence, status = _expected(raw)
+        assert result.fixed_texts[index] == text
+        assert result.detected_paths[index] == path
+        assert result.confidences[index] == confidence
+        assert result.statuses[index] == status
+
+
+def test_ascii_fast_path_uses_offsets():
+    data = b"xxhello\x01world!"
+    result = repair_binary_column(data, [2, 7, 13], target_encoding="utf-8")
+
+    assert result.fixed_texts == ["hello", "\x01world"]
+    assert result.detected_paths == ["utf-8->utf-8"] * 2
+    assert result.confidences[0] == _expected(b"hello")[2]
+    assert result.confidences[1] == _expected(b"\x01world")[2]
+
+
+def test_arrow_ipc_file_roundtrip(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    from core.columnar import repair_arrow_array, repair_arrow_ipc_file
+
+    column = pyarrow.array(["東京都".encode("cp932"), None, b"abc"], type=pyarrow.binary())
+    table = pyarrow.table({"id": [1, 2, 3], "name": column})
+    source = tmp_path / "in.arrow"
+    dest = tmp_path / "out.arrow"
+    with pyarrow.ipc.new_file(str(source), table.schema) as writer:
+        writer.write_table(table, max_chunksize=2)
+
+    assert repair_arrow_ipc_file(str(source), str(dest), "name") == 3
+
+    with pyarrow.ipc.open_file(str(dest)) as reader:
+        out = reader.read_all()
+    assert out.column("name_fixed_text").to_pylist() == ["東京都", None, "abc"]
+    assert out.column("name_detected_path").to_pylist() == ["cp932->utf-8", None, "utf-8->utf-8"]
+    assert out.column("id").to_pylist() == [1, 2, 3]
+
+    batch = repair_arrow_array(column.slice(1))
+    assert batch.column(0).to_pylist() == [None, "abc"]
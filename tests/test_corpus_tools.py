@@ -0,0 +1,62 @@
+# tests/test_corpus_tools.py
+
+from __future__ import annotations
+
+import importlib.util
+import json
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_tool(name: str):
+    spec = importlib.util.spec_from_file_location(name, PROJECT_ROOT / "tools" / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+generate = _load_tool("generate_mojibake_samples")
+evaluate = _load_tool("evaluate_repair")
+
+
+def test_seeded_corpus_round_trip(tmp_path):
+    def build(out):
+        return generate.build_corpus(
+            out=out,
+            count=20,
+            seed=7,
+            sizes=[256, 1024],
+            paths=list(generate.CORRUPTION_PATHS),
+            invalid_rate=0.0,
+            mix_ratio=0.3,
+            workers=1,
+        )
+
+    labels_path = build(tmp_path / "a")
+    labels = [json.loads(line) for line in labels_path.read_text(encoding="utf-8").splitlines()]
+    assert len(labels) == 20
+    # 同じシードなら同じコーパスになる
+    assert build(tmp_path / "b").read_text(encoding="utf-8") == labels_path.read_text(encoding="utf-8")
+
+    report = evaluate.evaluate(labels_path)
+    assert report["overall"]["samples"] == 20
+    assert report["overall"]["path_accuracy"] == 1.0
+    assert report["overall"]["text_accuracy"] == 1.0
+
+
+def test_expected_text_reflects_injected_bytes(tmp_path):
+    spec = {
+        "index": 0,
+        "seed": 1,
+        "out": str(tmp_path),
+        "path": "cp932",
+        "size": 1024,
+        "invalid_rate": 0.01,
+        "mix_ratio": 0.3,
+    }
+    label = generate.generate_corpus_sample(spec)
+    data = (tmp_path / label["file"]).read_bytes()
+    expected = (tmp_path / label["expected_file"]).read_text(encoding="utf-8")
+    # 正解は破損後のバイト列を正しいエンコーディングでデコードしたもの（NUL などもそのまま残る）
+    assert expected == data.decode("cp932", errors="ignore")
@@ -0,0 +1,93 @@
+# tests/test_csv_repair.py
+
+from __future__ import annotations
+
+import base64
+import io
+
+from fastapi.testclient import TestClient
+
+from backend.fastapi_app.main import app
+from core.csv_repair import repair_csv_stream
+
+client = TestClient(app)
+
+
+def _mixed_csv(rows) -> bytes:
+    # 2 列目は cp932、3 列目は UTF-8 のまま（別システム由来の列が混在）
+    return b"".join(
+        b",".join([no.encode("ascii"), name.encode("cp932"), address.encode("utf-8")]) + b"\r\n"
+        for no, name, address in rows
+    )
+
+
+ROWS = [
+    ("1", "山田太郎", "東京都千代田区"),
+    ("2", "鈴木一郎", "大阪府大阪市"),
+    ("3", '"佐藤,花子"', "京都府京都市"),
+]
+
+
+def test_repair_csv_per_column_encoding():
+    destination = io.StringIO(newline="")
+    row_count, columns, _ = repair_csv_stream(io.BytesIO(_mixed_csv(ROWS)), destination, sample_rows=2)
+
+    assert row_count == 3
+    assert [c.encoding for c in columns] == ["utf-8", "cp932", "utf-8"]
+    assert destination.getvalue() == (
+        "1,山田太郎,東京都千代田区\r\n"
+        "2,鈴木一郎,大阪府大阪市\r\n"
+        '3,"佐藤,花子",京都府京都市\r\n'
+    )
+
+
+def test_repair_tsv():
+    text = "id\tメモ\r\n1\tテストデータです\r\n2\tひらがなとカタカナ\r\n"
+    destination = io.StringIO(newline="")
+    _, columns, _ = repair_csv_stream(io.BytesIO(text.encode("euc_jp")), destination, delimiter="\t")
+
+    assert columns[1].detected_path == "euc_jp->utf-8"
+    assert destination.getvalue() == text
+
+
+def test_csv_endpoint_reports_column_encodings():
+    payload = {"raw_bytes_base64": base64.b64encode(_mixed_csv(ROWS)).decode("ascii")}
+
+    resp = client.post("/encoding/v2/csv/repair", json=payload)
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["meta"]["status"] == "ok"
+    assert data["meta"]["row_count"] == 3
+    assert data["result"]["changed"] is True
+    assert [c["detected_path"] for c in data["meta"]["column_encodings"]] == [
+        "utf-8->utf-8",
+        "cp932->utf-8",
+        "utf-8->utf-8",
+    ]
+    assert data["result"]["fixed_text"].startswith("1,山田太郎,東京都千代田区\r\n")
+
+
+def test_line_endings_are_preserved_and_jis_fields_decoded():
+    text = "id\tメモ\n1\tメールの本文\n2\t件名のテスト\n"
+    raw = b"".join(
+        b"\t".join([no.encode("ascii"), memo.encode("iso2022_jp")]) + b"\n"
+        for no, memo in (line.split("\t") for line in text.splitlines())
+    )
+    destination = io.StringIO(newline="")
+    _, columns, _ = repair_csv_stream(io.BytesIO(raw), destination, delimiter="\t")
+
+    assert columns[1].encoding == "iso2022_jp"
+    assert destination.getvalue() == text
+
+
+def test_delimiters_that_collide_with_trail_bytes_are_rejected():
+    # "ポ" の cp932 の 2 バイト目は 0x7c（"|"）
+    raw = "1|ポテト\r\n".encode("cp932")
+    payload = {"raw_bytes_base64": base64.b64encode(raw).decode("ascii"), "delimiter": "|"}
+    assert client.post("/encoding/v2/csv/repair", json=payload).status_code == 422
+
+    payload["delimiter"] = ";"
+    payload["raw_bytes_base64"] = base64.b64encode("1;ポテト\r\n".encode("cp932")).decode("ascii")
+    data = client.post("/encoding/v2/csv/repair", json=payload).json()
+    assert data["result"]["fixed_text"] == "1;ポテト\r\n"
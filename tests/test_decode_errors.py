@@ -0,0 +1,35 @@
+# tests/test_decode_errors.py
+
+from __future__ import annotations
+
+from core.decode_errors import MAX_ERROR_SPANS, CountingDecoder, decode_counting
+
+
+def test_decode_counting_merges_adjacent_spans():
+    text, stats = decode_counting(b"ab\xff\xfecd\xffe", "utf-8", "escape")
+
+    assert text == "ab\\xff\\xfecd\\xffe"
+    assert stats.count == 3
+    assert stats.invalid_bytes == 3
+    assert stats.spans == [(2, 4), (6, 7)]
+
+
+def test_incremental_spans_match_one_shot_decode():
+    raw = ("あい".encode("euc_jp") + b"\xff") * 10
+    _, expected = decode_counting(raw, "euc_jp")
+
+    decoder = CountingDecoder("euc_jp")
+    for start in range(0, len(raw), 3):
+        decoder.decode(raw[start:start + 3])
+    decoder.decode(b"", final=True)
+
+    assert decoder.stats.spans == expected.spans
+    assert decoder.stats.count == 10
+
+
+def test_span_list_is_capped_but_count_is_not():
+    raw = b"a\xff" * (MAX_ERROR_SPANS + 10)
+    _, stats = decode_counting(raw, "utf-8")
+
+    assert stats.count == MAX_ERROR_SPANS + 10
+    assert len(stats.spans) == MAX_ERROR_SPANS
@@ -0,0 +1,75 @@
+# tests/test_decompression.py
+
+from __future__ import annotations
+
+import gzip
+import zlib
+
+import pytest
+
+from core.decompression import (
+    DecompressionError,
+    StreamingDecompressor,
+    iter_decompressed,
+    parse_content_encoding,
+)
+
+
+def _split(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_gzip_multiple_members():
+    compressed = gzip.compress(b"first member\n") + gzip.compress(b"second member\n")
+    out = b"".join(iter_decompressed(_split(compressed, 3), "gzip"))
+    assert out == b"first member\nsecond member\n"
+
+
+def test_deflate_with_and_without_zlib_header():
+    raw = "本文".encode("cp932") * 100
+    assert b"".join(iter_decompressed([zlib.compress(raw)], "deflate")) == raw
+
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    raw_deflate = compressor.compress(raw) + compressor.flush()
+    assert b"".join(iter_decompressed(_split(raw_deflate, 5), "deflate")) == raw
+
+
+def test_decompression_bomb_is_rejected():
+    bomb = gzip.compress(b"\0" * (8 * 1024 * 1024))
+    decompressor = StreamingDecompressor("gzip")
+    with pytest.raises(DecompressionError) as exc_info:
+        for _ in decompressor.decompress(bomb):
+            pass
+    assert exc_info.value.status == "decompression_limit_exceeded"
+    # 上限を超えた時点で打ち切り、全体は展開しない
+    assert decompressor.output_bytes < 8 * 1024 * 1024
+
+    with pytest.raises(DecompressionError):
+        list(iter_decompressed([gzip.compress(b"x" * 1000)], "gzip", max_output_bytes=100))
+
+
+def test_truncated_and_invalid_payloads():
+    compressed = gzip.compress(b"truncated payload" * 10)
+    with pytest.raises(DecompressionError) as exc_info:
+        list(iter_decompressed([compressed[:-5]], "gzip"))
+    assert exc_info.value.status == "invalid_compressed_payload"
+
+    with pytest.raises(DecompressionError) as exc_info:
+        list(iter_decompressed([b"not compressed at all"], "gzip"))
+    assert exc_info.value.status == "invalid_compressed_payload"
+
+
+def test_zstd_round_trip():
+    zstandard = pytest.importorskip("zstandard")
+    raw = "zstd の入力".encode("euc_jp") * 1000
+    compressed = zstandard.ZstdCompressor().compress(raw)
+    assert b"".join(iter_decompressed(_split(compressed, 100), "zstd")) == raw
+
+
+def test_parse_content_encoding():
+    assert parse_content_encoding(None) == "none"
+    assert parse_content_encoding("identity") == "none"
+    assert parse_content_encoding("GZIP") == "gzip"
+    assert parse_content_encoding("x-gzip") == "gzip"
+    assert parse_content_encoding("br") is None
+    assert parse_content_encoding("gzip, deflate") is None
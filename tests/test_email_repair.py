@@ -0,0 +1,104 @@
+# tests/test_email_repair.py
+
+from __future__ import annotations
+
+import base64
+import io
+
+from fastapi.testclient import TestClient
+
+from backend.fastapi_app.main import app
+from core.email_repair import decode_mime_header, iter_mbox_messages, iter_repaired_mbox, repair_email_message
+
+client = TestClient(app)
+
+
+def _encoded_word(text: str, charset: str = "ISO-2022-JP") -> bytes:
+    encoded = base64.b64encode(text.encode(charset)).decode("ascii")
+    return f"=?{charset}?B?{encoded}?=".encode("ascii")
+
+
+def _message(subject: bytes, body: bytes, charset: str) -> bytes:
+    return (
+        b"From: " + _encoded_word("山田太郎") + b" <yamada@example.jp>\r\n"
+        b"Subject: " + subject + b"\r\n"
+        b"Content-Type: text/plain; charset=" + charset.encode("ascii") + b"\r\n"
+        b"Content-Transfer-Encoding: 7bit\r\n"
+        b"\r\n" + body
+    )
+
+
+def test_decode_mime_header_encoded_word_and_raw_8bit():
+    assert decode_mime_header(_encoded_word("会議のご案内").decode("ascii")) == "会議のご案内"
+    # encoded-word にせず cp932 のまま入っているヘッダ
+    raw_8bit = "会議のご案内".encode("cp932").decode("ascii", errors="surrogateescape")
+    assert decode_mime_header(raw_8bit) == "会議のご案内"
+
+
+def test_decode_mime_header_mixed_encoded_word_and_raw_8bit():
+    raw_8bit = "会議のご案内".encode("cp932").decode("ascii", errors="surrogateescape")
+    mixed = "Re: " + _encoded_word("山田").decode("ascii") + " " + _encoded_word("太郎").decode("ascii") + " " + raw_8bit
+    assert decode_mime_header(mixed) == "Re: 山田太郎 会議のご案内"
+    assert decode_mime_header(raw_8bit + " =?UTF-8?Q?=E6=9D=B1=E4=BA=AC?=") == "会議のご案内 東京"
+
+
+def test_repair_iso2022jp_message_with_declared_charset():
+    body = "お世話になっております。\r\n明日の会議について連絡します。\r\n"
+    result = repair_email_message(_message(_encoded_word("会議"), body.encode("iso2022_jp"), "ISO-2022-JP"))
+
+    headers = {h.name: h.value for h in result.headers}
+    assert headers["From"] == "山田太郎 <yamada@example.jp>"
+    assert headers["Subject"] == "会議"
+
+    part = result.parts[0]
+    assert part.text == body
+    assert part.charset_trusted is True
+    assert part.detected_path == "iso2022_jp->utf-8"
+
+
+def test_untrustworthy_charset_falls_back_to_auto():
+    body = "実際には Shift_JIS で書かれた本文です。"
+    # charset は ISO-2022-JP と宣言されているが、本文は cp932 の 8bit
+    result = repair_email_message(_message(b"test", body.encode("cp932"), "ISO-2022-JP"))
+
+    part = result.parts[0]
+    assert part.text == body
+    assert part.charset_trusted is False
+    assert part.detected_path == "cp932->utf-8"
+
+
+def test_iter_mbox_messages_splits_and_unescapes():
+    first = _message(b"first", "一通目です。\r\n".encode("iso2022_jp"), "ISO-2022-JP")
+    second = _message(b"second", "二通目です。\n>From the archive\n".encode("utf-8"), "UTF-8")
+    mbox = b"From a@example.jp Mon Jan  1 00:00:00 2024\n" + first + b"\n"
+    mbox += b"From b@example.jp Mon Jan  1 00:00:01 2024\n" + second
+
+    messages = list(iter_mbox_messages(io.BytesIO(mbox)))
+    assert len(messages) == 2
+    assert b"\nFrom the archive\n" in messages[1]
+
+    results = list(iter_repaired_mbox(io.BytesIO(mbox)))
+    assert results[0].parts[0].text.startswith("一通目です。")
+    assert results[1].parts[0].text.startswith("二通目です。")
+
+
+def test_email_endpoint():
+    raw = _message(_encoded_word("件名"), "本文です。\r\n".encode("iso2022_jp"), "ISO-2022-JP")
+    payload = {"raw_bytes_base64": base64.b64encode(raw).decode("ascii")}
+
+    data = client.post("/encoding/v2/email/repair", json=payload).json()
+    assert data["meta"]["status"] == "ok"
+    assert data["meta"]["message_count"] == 1
+    assert data["result"]["messages"][0]["parts"][0]["text"] == "本文です。\r\n"
+
+
+def test_auto_mode_detects_iso2022jp():
+    text = "メールで使われる JIS コードのテストです。"
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(text.encode("iso2022_jp")).decode("ascii"),
+    }
+
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["result"]["fixed_text"] == text
+    assert data["meta"]["detected_path"] == "iso2022_jp->utf-8"
@@ -0,0 +1,68 @@
+# tests/test_encoding_repair_stream.py
+
+from __future__ import annotations
+
+from core.encoding_repair_stream import StreamingRepairer, iter_repaired_text
+from core.normalization import TextNormalizer
+
+
+def _split(raw: bytes, size: int):
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+def test_stream_cp932_split_mid_character():
+    text = "LOG START\n" + "システム監視レポート\r\n" * 200
+    raw = text.encode("cp932")
+
+    out = "".join(iter_repaired_text(_split(raw, 7), detection_window=256))
+    assert out == text
+
+
+def test_stream_ascii_prefix_is_emitted_before_detection():
+    repairer = StreamingRepairer(detection_window=1024)
+
+    assert repairer.feed(b"plain ascii\n") == "plain ascii\n"
+    assert repairer.decided is False
+
+    tail = "テスト".encode("euc_jp")
+    assert repairer.feed(tail) == ""
+    assert repairer.finish() == "テスト"
+    assert repairer.detected_path == "euc_jp->utf-8"
+    assert repairer.changed is True
+
+
+def test_stream_invalid_bytes_after_detection_are_dropped():
+    text = "これはテストです。" * 20
+    raw = text.encode("utf-8") + b"\x81" + "終わり".encode("utf-8")
+
+    repairer = StreamingRepairer(detection_window=64)
+    out = "".join(repairer.feed(c) for c in _split(raw, 5)) + repairer.finish()
+
+    assert out == text + "終わり"
+    assert repairer.encoding == "utf-8"
+    assert repairer.had_error is True
+    assert repairer.input_bytes_length == len(raw)
+
+
+def test_stream_error_spans_use_input_offsets():
+    text = "これはテストです。" * 20
+    prefix = b"header,"
+    raw = prefix + text.encode("utf-8") + b"\xff" + "終わり".encode("utf-8")
+
+    repairer = StreamingRepairer(detection_window=64, error_policy="replace")
+    out = "".join(repairer.feed(c) for c in _split(raw, 7)) + repairer.finish()
+
+    error_at = len(prefix) + len(text.encode("utf-8"))
+    assert out == "header," + text + "\ufffd終わり"
+    assert repairer.errors.count == 1
+    assert repairer.errors.spans == [(error_at, error_at + 1)]
+
+
+def test_stream_normalizer_handles_crlf_split_across_chunks():
+    text = "ﾃﾞｰﾀ一行目\r\n二行目\r\n" * 30
+    raw = text.encode("cp932")
+
+    repairer = StreamingRepairer(detection_window=64, normalizer=TextNormalizer(halfwidth_kana=True, newlines=True))
+    out = "".join(repairer.feed(c) for c in _split(raw, 3)) + repairer.finish()
+
+    assert out == "データ一行目\n二行目\n" * 30
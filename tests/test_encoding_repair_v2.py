@@ -74,3 +74,536 @@ def test_invalid_base64():
     assert data["meta"]["status"] == "invalid_base64"
     assert data["meta"]["input_bytes_length"] == 0
 
+
+
+def test_output_format_detect_only_omits_text():
+    raw = "文字コードのテスト".encode("cp932")
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(raw).decode("ascii"),
+        "output_format": "detect_only",
+    }
+
+    resp = client.post("/encoding/v2/repair", json=payload)
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["result"]["fixed_text"] == ""
+    assert data["result"]["changed"] is True
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+    assert data["meta"]["status"] == "ok"
+
+
+def test_detect_only_skips_text_materialization(monkeypatch):
+    from core import encoding_repair_v2
+
+    def fail(*args, **kwargs):
+        raise AssertionError("detect_only must not materialize the text")
+
+    monkeypatch.setattr(encoding_repair_v2, "_materialize", fail)
+    raw = "文字コードのテスト".encode("euc_jp")
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(raw).decode("ascii"),
+        "output_format": "detect_only",
+    }
+
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["detected_path"] == "euc_jp->utf-8"
+    assert data["meta"]["error_count"] == 0
+
+
+def test_output_format_base64():
+    text = "文字コードのテスト"
+    payload = {
+        "mode": "manual",
+        "raw_bytes_base64": base64.b64encode(text.encode("cp932")).decode("ascii"),
+        "assume_current_encoding": "cp932",
+        "output_format": "base64",
+    }
+
+    resp = client.post("/encoding/v2/repair", json=payload)
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["result"]["fixed_text"] == ""
+    assert base64.b64decode(data["result"]["fixed_text_base64"]).decode("utf-8") == text
+
+
+def test_output_format_gzip_returns_bytes_with_meta_header():
+    import gzip
+    import json
+
+    text = "文字コードのテスト"
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(text.encode("euc_jp")).decode("ascii"),
+        "output_format": "gzip",
+    }
+
+    resp = client.post("/encoding/v2/repair", json=payload)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/gzip"
+    assert gzip.decompress(resp.content).decode("utf-8") == text
+
+    meta = json.loads(resp.headers["x-encoding-repair-meta"])
+    assert meta["detected_path"] == "euc_jp->utf-8"
+    assert meta["status"] == "ok"
+
+
+def test_detect_endpoint_ranks_candidates():
+    raw = "文字コードのテストです。".encode("cp932")
+    payload = {"raw_bytes_base64": base64.b64encode(raw).decode("ascii")}
+
+    resp = client.post("/encoding/v2/detect", json=payload)
+    assert resp.status_code == 200
+
+    data = resp.json()
+    assert data["result"]["detected_encoding"] == "cp932"
+    assert data["result"]["changed"] is True
+    assert data["result"]["candidates"][0]["encoding"] == "cp932"
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+    assert data["meta"]["input_bytes_length"] == len(raw)
+
+
+def test_detect_endpoint_ascii_exits_early():
+    payload = {"raw_bytes_base64": base64.b64encode(b"plain ascii log line\n").decode("ascii")}
+
+    resp = client.post("/encoding/v2/detect", json=payload)
+    data = resp.json()
+    assert data["result"]["detected_encoding"] == "utf-8"
+    assert data["result"]["changed"] is False
+    assert data["meta"]["early_exit"] is True
+    assert [c["encoding"] for c in data["result"]["candidates"]] == ["utf-8"]
+
+
+def test_detect_matches_full_evaluation():
+    from core.encoding_repair_v2 import (
+        _evaluate_candidates,
+        _select_candidate,
+        detect_encoding,
+    )
+
+    samples = [
+        "テスト".encode("utf-8"),
+        "システム監視レポート\r\n".encode("cp932"),
+        "文字コード".encode("euc_jp"),
+        "Größe".encode("latin1"),
+        b"user_id=A\x81\x00C123\n",
+    ]
+    for raw in samples:
+        full, _ = _evaluate_candidates(raw, early_exit=False)
+        expected, _ = _select_candidate(full)
+        assert detect_encoding(raw).result.detected_encoding == expected.encoding
+
+
+def test_detect_exits_early_on_large_inputs():
+    from core.encoding_repair_v2 import SCORING_CHUNK_SIZE, _evaluate_candidates, _select_candidate, detect_encoding
+
+    text = "ログ出力のテストです。サーバ監視レポート、CPU使用率は正常範囲内です。\n" * 40000
+    for encoding in ("cp932", "euc_jp", "utf-8"):
+        raw = text.encode(encoding)
+        assert len(raw) > 8 * SCORING_CHUNK_SIZE
+        response = detect_encoding(raw)
+        assert response.meta.early_exit is True
+        assert response.result.detected_encoding == encoding
+
+        full, _ = _evaluate_candidates(raw, early_exit=False)
+        expected, _ = _select_candidate(full)
+        assert expected.encoding == encoding
+
+        # 確定した時点で打ち切るため、入力の一部しか走査しない
+        candidates, _ = _evaluate_candidates(raw)
+        selected = next(c for c in candidates if c.encoding == encoding)
+        assert selected.char_count < len(text)
+
+
+def test_stream_endpoint_repairs_chunked_body():
+    text = "ログ出力のテスト\n" * 50
+    raw = text.encode("cp932")
+
+    def body():
+        for i in range(0, len(raw), 5):
+            yield raw[i:i + 5]
+
+    resp = client.post("/encoding/v2/repair/stream", content=body())
+    assert resp.status_code == 200
+    assert resp.content.decode("utf-8") == text
+    assert resp.headers["x-encoding-repair-detected-path"] == "cp932->utf-8"
+
+
+def test_stream_endpoint_invalid_target_encoding():
+    resp = client.post(
+        "/encoding/v2/repair/stream?target_encoding=no-such-codec",
+        content=b"abc",
+    )
+    assert resp.status_code == 400
+    assert resp.json()["meta"]["status"] == "invalid_encoding_name"
+
+
+def test_chunked_candidate_scoring_matches_full_text_score():
+    from core.encoding_repair_v2 import SCORING_CHUNK_SIZE, _score_text, _try_decode
+
+    text = "システム監視レポート\r\nCPU使用率\x01\n" * (SCORING_CHUNK_SIZE // 20)
+    raw = text.encode("cp932")
+    assert len(raw) > SCORING_CHUNK_SIZE
+
+    candidate = _try_decode(raw, "cp932")
+    assert candidate.score == _score_text(text, False)
+    assert candidate.char_count == len(text)
+    assert not hasattr(candidate, "__dict__")
+
+
+def test_late_invalid_byte_continues_from_failing_chunk():
+    from core.decode_errors import decode_counting
+    from core.encoding_repair_v2 import SCORING_CHUNK_SIZE, _materialize, _try_decode
+
+    raw = ("文字コードのテスト\n" * (SCORING_CHUNK_SIZE // 8)).encode("euc_jp")
+    broken = raw[:-6] + b"\xff" + raw[-6:]
+    candidate = _try_decode(broken, "euc_jp")
+    assert candidate.had_error
+    assert candidate.error_offset == (len(broken) - 7) // SCORING_CHUNK_SIZE * SCORING_CHUNK_SIZE
+
+    for policy in ("ignore", "replace", "escape"):
+        assert _materialize(broken, candidate, policy) == decode_counting(broken, "euc_jp", policy)
+
+
+def test_manual_mode_accepts_encoding_alias():
+    text = "文字コードのテスト"
+    payload = {
+        "mode": "manual",
+        "raw_bytes_base64": base64.b64encode(text.encode("cp932")).decode("ascii"),
+        "assume_current_encoding": "Shift_JIS",
+    }
+
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["result"]["fixed_text"] == text
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+
+
+def test_unknown_encoding_name_is_rejected():
+    b64 = base64.b64encode(b"abc").decode("ascii")
+
+    manual = client.post(
+        "/encoding/v2/repair",
+        json={"mode": "manual", "raw_bytes_base64": b64, "assume_current_encoding": "no-such-codec"},
+    ).json()
+    assert manual["meta"]["status"] == "invalid_encoding_name"
+    assert manual["result"]["fixed_text"] == ""
+
+    target = client.post(
+        "/encoding/v2/repair",
+        json={"mode": "auto", "raw_bytes_base64": b64, "target_encoding": "no-such-codec"},
+    ).json()
+    assert target["meta"]["status"] == "invalid_encoding_name"
+
+    # バイト列変換のコーデックはエンコーディング名として扱わない
+    transform = client.post(
+        "/encoding/v2/repair",
+        json={"mode": "manual", "raw_bytes_base64": b64, "assume_current_encoding": "hex"},
+    )
+    assert transform.status_code == 200
+    assert transform.json()["meta"]["status"] == "invalid_encoding_name"
+
+
+def test_source_prior_skips_detection_for_known_feed():
+    from core.source_priors import DEFAULT_SOURCE_PRIOR_STORE
+
+    DEFAULT_SOURCE_PRIOR_STORE.clear()
+    text = "定期連携ファイルのテストです。"
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(text.encode("cp932")).decode("ascii"),
+        "source_id": "legacy-feed-01",
+    }
+
+    used = [client.post("/encoding/v2/repair", json=payload).json()["meta"]["prior_used"] for _ in range(6)]
+    assert used == [False] * 5 + [True]
+
+    # 事前分布と矛盾する入力（UTF-8）は通常の判定にフォールバックする
+    payload["raw_bytes_base64"] = base64.b64encode(text.encode("utf-8")).decode("ascii")
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["prior_used"] is False
+    assert data["meta"]["detected_path"] == "utf-8->utf-8"
+    assert data["result"]["fixed_text"] == text
+
+
+def test_manual_mode_reports_error_spans_and_policy():
+    raw = "テスト".encode("cp932") + b"\x81!" + "です".encode("cp932")
+    payload = {
+        "mode": "manual",
+        "raw_bytes_base64": base64.b64encode(raw).decode("ascii"),
+        "assume_current_encoding": "cp932",
+        "error_policy": "replace",
+        "manual_scoring": False,
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+
+    assert data["meta"]["status"] == "ok"
+    assert data["result"]["fixed_text"] == "テスト\ufffd!です"
+    assert data["meta"]["error_count"] == 1
+    assert data["meta"]["error_spans"] == [[6, 7]]
+    assert data["meta"]["error_density"] == 1 / len(raw)
+    assert data["meta"]["confidence"] == 1.0 - 1 / len(raw)
+
+    payload["error_policy"] = "escape"
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["result"]["fixed_text"] == "テスト\\x81!です"
+
+
+def test_normalization_flags_are_applied_during_repair():
+    text = "ﾃｽﾄﾃﾞｰﾀです。\r\n二行目\x00です。\r\n"
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(text.encode("cp932")).decode("ascii"),
+        "normalize_halfwidth_kana": True,
+        "normalize_newlines": True,
+        "strip_control_chars": True,
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+    assert data["result"]["fixed_text"] == "テストデータです。\n二行目です。\n"
+
+
+def test_charset_declaration_skips_detection():
+    html = '<html><head><meta charset="Shift_JIS"></head><body>クローラで取得したページ</body></html>'
+    payload = {"mode": "auto", "raw_bytes_base64": base64.b64encode(html.encode("cp932")).decode("ascii")}
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["result"]["fixed_text"] == html
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+    assert data["meta"]["hint_used"] is True
+    assert data["meta"]["charset_source"] == "meta"
+
+    # 宣言と矛盾する（実際は UTF-8）場合は通常の判定にフォールバックする
+    payload["raw_bytes_base64"] = base64.b64encode(html.encode("utf-8")).decode("ascii")
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["detected_path"] == "utf-8->utf-8"
+    assert data["meta"]["hint_used"] is False
+
+    # Content-Type ヘッダのヒント
+    body = "本文のみのテキストです。".encode("euc_jp")
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(body).decode("ascii"),
+        "charset_hint": "text/plain; charset=EUC-JP",
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["detected_path"] == "euc_jp->utf-8"
+    assert data["meta"]["charset_source"] == "content_type"
+
+
+def test_compressed_payload_is_decompressed_before_repair():
+    import gzip
+
+    text = "圧縮された入力のテストです。\n" * 100
+    raw = text.encode("cp932")
+    compressed = gzip.compress(raw)
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(compressed).decode("ascii"),
+        "compression": "gzip",
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["status"] == "ok"
+    assert data["result"]["fixed_text"] == text
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+    assert data["meta"]["input_bytes_length"] == len(raw)
+    assert data["meta"]["compressed_bytes_length"] == len(compressed)
+
+    # 途中で切れた圧縮データ
+    payload["raw_bytes_base64"] = base64.b64encode(compressed[:-10]).decode("ascii")
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["result"]["fixed_text"] == ""
+    assert data["meta"]["status"] == "invalid_compressed_payload"
+
+
+def test_compressed_payload_honours_hint_and_admission_limit(monkeypatch):
+    import gzip
+
+    from backend.fastapi_app import main
+    from core.admission import AdmissionController
+
+    # 宣言が判定に使われる（短い入力で総当たりに頼らない）
+    raw = "短い本文".encode("euc_jp")
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(gzip.compress(raw)).decode("ascii"),
+        "compression": "gzip",
+        "charset_hint": "text/plain; charset=EUC-JP",
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["result"]["fixed_text"] == "短い本文"
+    assert data["meta"]["charset_source"] == "content_type"
+
+    # 展開後のサイズにもペイロード上限を適用する
+    compressed = gzip.compress(b"a" * 4096)
+    monkeypatch.setattr(main, "ADMISSION", AdmissionController(max_payload_bytes=1024))
+    payload = {"raw_bytes_base64": base64.b64encode(compressed).decode("ascii"), "compression": "gzip"}
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["status"] == "decompression_limit_exceeded"
+    assert data["meta"]["input_bytes_length"] == len(compressed)
+
+
+def test_compressed_payload_is_scanned_chunk_by_chunk():
+    import gzip
+
+    from core.encoding_repair_v2 import SCORING_CHUNK_SIZE, RepairPayload, _auto_repair
+
+    # 複数チャンクにまたがり、末尾近くに不正バイトを含む入力
+    raw = ("チャンクごとに展開して判定します。\n" * (SCORING_CHUNK_SIZE // 20)).encode("cp932") + b"\x82 " + "末尾".encode("cp932")
+    payload = RepairPayload.from_compressed(gzip.compress(raw), "gzip")
+    assert payload.raw is None
+    assert payload.total == len(raw)
+    assert len(list(payload.iter_chunks())) > 1
+
+    text, changed, detected_path, _, status, errors = _auto_repair(payload, "utf-8")
+    expected = _auto_repair(raw, "utf-8")
+    assert (text, changed, detected_path, status) == expected[:3] + (expected[4],)
+    assert detected_path == "cp932->utf-8"
+    assert errors.count == 1
+    assert errors.spans == expected[5].spans
+    assert errors.spans[0][0] == raw.index(b"\x82 ")
+
+
+def test_compressed_payload_is_admitted_at_decompressed_cap(monkeypatch):
+    import gzip
+
+    from backend.fastapi_app import main
+    from core.admission import AdmissionController
+
+    # 圧縮後は small クラスの大きさでも、展開後サイズの上限（1MB 以上）で見積もる
+    monkeypatch.setattr(main, "ADMISSION", AdmissionController())
+    compressed = gzip.compress("小さな圧縮入力".encode("cp932"))
+    payload = {"raw_bytes_base64": base64.b64encode(compressed).decode("ascii"), "compression": "gzip"}
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["status"] == "ok"
+    classes = client.get("/metrics/admission").json()["classes"]
+    assert classes["large"]["admitted"] == 1
+    assert classes["small"]["admitted"] == 0
+
+
+def test_stream_endpoint_accepts_content_encoding():
+    import gzip
+
+    text = "ストリームの圧縮入力\n" * 50
+    compressed = gzip.compress(text.encode("euc_jp"))
+
+    def body():
+        for i in range(0, len(compressed), 7):
+            yield compressed[i:i + 7]
+
+    resp = client.post("/encoding/v2/repair/stream", content=body(), headers={"Content-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.content.decode("utf-8") == text
+    assert resp.headers["x-encoding-repair-detected-path"] == "euc_jp->utf-8"
+
+    resp = client.post("/encoding/v2/repair/stream", content=b"abc", headers={"Content-Encoding": "br"})
+    assert resp.status_code == 415
+    assert resp.json()["meta"]["status"] == "unsupported_content_encoding"
+
+
+def test_contradicted_or_bogus_charset_declarations_fall_back():
+    # 文書中のラベルが文字エンコーディングでない（rot13 / hex）場合も 500 にせず通常の判定
+    html = '<html><head><meta charset="rot13"></head><body>日本語のページ</body></html>'
+    payload = {"mode": "auto", "raw_bytes_base64": base64.b64encode(html.encode("utf-8")).decode("ascii")}
+    resp = client.post("/encoding/v2/repair", json=payload)
+    assert resp.status_code == 200
+    assert resp.json()["meta"]["detected_path"] == "utf-8->utf-8"
+    assert resp.json()["meta"]["hint_used"] is False
+
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode("本文".encode("cp932")).decode("ascii"),
+        "charset_hint": "hex",
+    }
+    resp = client.post("/encoding/v2/repair", json=payload)
+    assert resp.status_code == 200
+    assert resp.json()["meta"]["detected_path"] == "cp932->utf-8"
+
+    # EUC-JP のカナは cp932 としても strict にデコードできるが、宣言（Shift_JIS）とは矛盾する
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode("データ".encode("euc_jp")).decode("ascii"),
+        "charset_hint": "Shift_JIS",
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["result"]["fixed_text"] == "データ"
+    assert data["meta"]["detected_path"] == "euc_jp->utf-8"
+    assert data["meta"]["hint_used"] is False
+
+
+def test_utf16_and_unsupported_declarations_do_not_override_detection():
+    from core.source_priors import DEFAULT_SOURCE_PRIOR_STORE
+
+    DEFAULT_SOURCE_PRIOR_STORE.clear()
+    # cp932 の本文は偶数長なら utf-16 としても strict にデコードできてしまう
+    html = '<html><head><meta charset="utf-16"></head><body>日本語のページです</body></html>'
+    raw = html.encode("cp932")
+    raw += b" " * (len(raw) % 2)
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(raw).decode("ascii"),
+        "source_id": "utf16-meta-feed",
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+    assert data["meta"]["charset_source"] is None
+    assert data["result"]["fixed_text"].rstrip() == html
+    assert DEFAULT_SOURCE_PRIOR_STORE._priors["utf16-meta-feed"].encoding == "cp932"
+
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode(raw).decode("ascii"),
+        "charset_hint": "text/html; charset=utf-16",
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+    assert data["meta"]["hint_used"] is False
+
+    # 文書中の utf-16 宣言は（WHATWG と同様に）utf-8 とみなす
+    raw = html.encode("utf-8")
+    data = client.post("/encoding/v2/repair", json={"raw_bytes_base64": base64.b64encode(raw).decode("ascii")}).json()
+    assert data["meta"]["detected_path"] == "utf-8->utf-8"
+    assert data["meta"]["charset_source"] == "meta"
+    DEFAULT_SOURCE_PRIOR_STORE.clear()
+
+
+def test_source_prior_rejects_contradicting_and_unverifiable_encodings():
+    from core.source_priors import DEFAULT_SOURCE_PRIOR_STORE
+
+    DEFAULT_SOURCE_PRIOR_STORE.clear()
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode("定期連携のテスト".encode("cp932")).decode("ascii"),
+        "source_id": "legacy-feed-02",
+    }
+    for _ in range(5):
+        client.post("/encoding/v2/repair", json=payload)
+    assert DEFAULT_SOURCE_PRIOR_STORE.lookup("legacy-feed-02") == "cp932"
+
+    # EUC-JP のカナは cp932 としても strict にデコードできるが、事前分布は採用しない
+    for text in ("テスト", "データ"):
+        payload["raw_bytes_base64"] = base64.b64encode(text.encode("euc_jp")).decode("ascii")
+        data = client.post("/encoding/v2/repair", json=payload).json()
+        assert data["meta"]["prior_used"] is False
+        assert data["result"]["fixed_text"] == text
+        assert data["meta"]["detected_path"] == "euc_jp->utf-8"
+
+    # latin1 の事前分布は任意のバイト列を受け入れてしまうため使わない
+    for _ in range(5):
+        DEFAULT_SOURCE_PRIOR_STORE.record("latin1-feed", "latin1")
+    payload = {
+        "mode": "auto",
+        "raw_bytes_base64": base64.b64encode("日本語の本文".encode("cp932")).decode("ascii"),
+        "source_id": "latin1-feed",
+    }
+    data = client.post("/encoding/v2/repair", json=payload).json()
+    assert data["meta"]["prior_used"] is False
+    assert data["meta"]["detected_path"] == "cp932->utf-8"
+
+    # strict にデコードできても、制御文字ばかりのテキストは採用しない
+    from core.encoding_repair_v2 import _prior_repair
+
+    assert _prior_repair("\x01\x02\x03ア".encode("cp932"), "cp932", "utf-8") is None
+    assert _prior_repair("アイウ".encode("cp932"), "cp932", "utf-8") is not None
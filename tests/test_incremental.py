@@ -0,0 +1,71 @@
+# tests/test_incremental.py
+
+from __future__ import annotations
+
+import os
+
+from core.incremental import IncrementalRepairer, JsonStateStore
+
+
+def _collect(repairer: IncrementalRepairer, path) -> str:
+    return "".join(update.text for update in repairer.catch_up(str(path)))
+
+
+def test_catch_up_only_reads_appended_bytes(tmp_path):
+    log = tmp_path / "app.log"
+    state_path = str(tmp_path / "state.json")
+    line = "処理が完了しました。\n".encode("cp932")
+
+    log.write_bytes(b"start\n" + line + line[:5])
+    repairer = IncrementalRepairer(JsonStateStore(state_path))
+    assert _collect(repairer, log) == "start\n処理が完了しました。\n処理"
+
+    # 途中で切れたマルチバイト文字は、別プロセス（新しいストア）でも続きから復元できる
+    with open(log, "ab") as f:
+        f.write(line[5:] + line)
+    repairer = IncrementalRepairer(JsonStateStore(state_path))
+    updates = list(repairer.catch_up(str(log)))
+    assert "".join(u.text for u in updates) == "が完了しました。\n処理が完了しました。\n"
+    assert updates[0].encoding == "cp932"
+    assert updates[0].redetected is False
+    assert updates[0].bytes_read == len(line) * 2 - 5
+
+    assert _collect(repairer, log) == ""
+
+
+def test_redetects_when_validation_fails(tmp_path):
+    log = tmp_path / "app.log"
+    repairer = IncrementalRepairer(JsonStateStore(str(tmp_path / "state.json")))
+
+    log.write_bytes("古いシステムのログです。\n".encode("cp932"))
+    assert _collect(repairer, log) == "古いシステムのログです。\n"
+
+    with open(log, "ab") as f:
+        f.write("新しいシステムのログです。\n".encode("utf-8"))
+    updates = list(repairer.catch_up(str(log)))
+    assert updates[0].redetected is True
+    assert updates[0].encoding == "utf-8"
+    assert updates[0].text == "新しいシステムのログです。\n"
+
+
+def test_rotation_restarts_from_beginning(tmp_path):
+    log = tmp_path / "app.log"
+    repairer = IncrementalRepairer(JsonStateStore(str(tmp_path / "state.json")))
+
+    log.write_bytes(b"first file, quite long line\n")
+    assert _collect(repairer, log) == "first file, quite long line\n"
+
+    os.rename(log, tmp_path / "app.log.1")
+    log.write_bytes(b"second\n")
+    updates = list(repairer.catch_up(str(log)))
+    assert updates[0].rotated is True
+    assert updates[0].text == "second\n"
+
+
+def test_follow_stops_when_requested(tmp_path):
+    log = tmp_path / "app.log"
+    log.write_bytes("追記されるログ\n".encode("euc_jp"))
+    repairer = IncrementalRepairer(JsonStateStore(str(tmp_path / "state.json")))
+
+    updates = list(repairer.follow([str(log)], poll_interval=0, should_stop=lambda: True))
+    assert [u.text for u in updates] == ["追記されるログ\n"]
@@ -0,0 +1,129 @@
+# tests/test_jobs.py
+
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.fastapi_app import jobs as jobs_api
+from backend.fastapi_app.main import app
+from core.jobs import JobManager, JobStatus, LocalFileJobStore, run_repair_job
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    manager = JobManager(LocalFileJobStore(str(tmp_path)), executor=ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(jobs_api, "JOB_MANAGER", manager)
+    yield manager
+    manager.shutdown()
+
+
+def _wait_done(job_id: str) -> dict:
+    for _ in range(200):
+        data = client.get(f"/encoding/v2/jobs/{job_id}").json()
+        if data["result"]["state"] in ("done", "failed"):
+            return data
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_job_roundtrip_with_range(manager):
+    text = "大きなファイルの修復ジョブです。" * 1000
+    resp = client.post("/encoding/v2/jobs", content=text.encode("cp932"))
+    data = resp.json()
+    assert data["meta"]["status"] == "ok"
+    job_id = data["result"]["job_id"]
+
+    status = _wait_done(job_id)["result"]
+    assert status["state"] == "done"
+    assert status["detected_path"] == "cp932->utf-8"
+    assert status["input_bytes_length"] == len(text.encode("cp932"))
+
+    full = client.get(f"/encoding/v2/jobs/{job_id}/result")
+    assert full.status_code == 200
+    assert full.content.decode("utf-8") == text
+
+    part = client.get(f"/encoding/v2/jobs/{job_id}/result", headers={"Range": "bytes=3-8"})
+    assert part.status_code == 206
+    assert part.content == full.content[3:9]
+    assert part.headers["content-range"] == f"bytes 3-8/{len(full.content)}"
+
+    tail = client.get(f"/encoding/v2/jobs/{job_id}/result", headers={"Range": "bytes=-6"})
+    assert tail.content == full.content[-6:]
+
+    bad = client.get(f"/encoding/v2/jobs/{job_id}/result", headers={"Range": f"bytes={len(full.content)}-"})
+    assert bad.status_code == 416
+
+
+def test_unknown_job_and_invalid_params(manager):
+    unknown = client.get("/encoding/v2/jobs/" + "0" * 32)
+    assert unknown.status_code == 404
+    assert unknown.json()["meta"]["status"] == "job_not_found"
+    assert client.get("/encoding/v2/jobs/../etc").status_code == 404
+    assert client.get("/encoding/v2/jobs/" + "0" * 32 + "/result").status_code == 404
+
+    resp = client.post("/encoding/v2/jobs?target_encoding=no-such-codec", content=b"abc")
+    assert resp.json()["meta"]["status"] == "invalid_encoding_name"
+
+
+def test_expired_jobs_are_cleaned_up(tmp_path):
+    store = LocalFileJobStore(str(tmp_path), ttl_seconds=60)
+    manager = JobManager(store)
+    status = manager.create_job("utf-8")
+    with store.open_input_writer(status.job_id) as writer:
+        writer.write(b"hello")
+    run_repair_job(store, status.job_id)
+    assert store.read_status(status.job_id).state == "done"
+
+    old = time.time() - 120
+    os.utime(tmp_path / status.job_id / "status.json", (old, old))
+    assert store.cleanup_expired() == 1
+    assert store.read_status(status.job_id) is None
+
+
+def test_oversized_job_input_is_rejected(manager, tmp_path):
+    manager.max_input_bytes = 16
+
+    resp = client.post("/encoding/v2/jobs", content=b"x" * 17)
+    assert resp.status_code == 413
+    assert resp.json()["meta"]["status"] == "payload_too_large"
+
+    # Content-Length のないチャンク転送でも受信途中で打ち切り、ジョブを残さない
+    def body():
+        for _ in range(4):
+            yield b"x" * 8
+
+    resp = client.post("/encoding/v2/jobs", content=body())
+    assert resp.status_code == 413
+    assert not any(path.is_dir() for path in tmp_path.iterdir())
+
+
+class _BrokenExecutor(ThreadPoolExecutor):
+    """ワーカープロセスの異常終了（BrokenProcessPool）を再現する。"""
+
+    def submit(self, fn, *args, **kwargs):
+        future: Future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+
+def test_job_is_marked_failed_when_worker_dies(tmp_path):
+    store = LocalFileJobStore(str(tmp_path))
+    manager = JobManager(store, executor=_BrokenExecutor())
+    status = manager.create_job("utf-8")
+    with store.open_input_writer(status.job_id) as writer:
+        writer.write(b"hello")
+    manager.submit(status, 5)
+
+    failed: JobStatus = store.read_status(status.job_id)
+    assert failed.state == "failed"
+    assert failed.status == "job_failed: BrokenProcessPool"
+    # 壊れたプールは破棄され、次の投入で作り直される
+    assert manager._executor is None
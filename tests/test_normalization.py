@@ -0,0 +1,54 @@
+# tests/test_normalization.py
+
+from __future__ import annotations
+
+import pytest
+
+from core.normalization import TextNormalizer
+
+SAMPLE = "ｶﾞｷﾞｸﾞ ﾊﾟﾝ\r\nline\x00two\r\r\n①ＡＢ\r"
+
+
+def test_halfwidth_kana_newlines_and_controls():
+    normalizer = TextNormalizer(halfwidth_kana=True, newlines=True, strip_controls=True)
+    assert normalizer.normalize(SAMPLE) == "ガギグ パン\nlinetwo\n\n①ＡＢ\n"
+
+
+def test_nfkc():
+    normalizer = TextNormalizer(nfkc=True, newlines=True)
+    assert normalizer.normalize(SAMPLE) == "ガギグ パン\nline\x00two\n\n1AB\n"
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"halfwidth_kana": True, "newlines": True, "strip_controls": True},
+        {"nfkc": True, "newlines": True},
+        {"newlines": True},
+    ],
+)
+@pytest.mark.parametrize("size", [1, 2, 3, 5])
+def test_chunked_feed_matches_whole_text(options, size):
+    expected = TextNormalizer(**options).normalize(SAMPLE)
+
+    normalizer = TextNormalizer(**options)
+    out = "".join(normalizer.feed(SAMPLE[i:i + size]) for i in range(0, len(SAMPLE), size))
+    out += normalizer.finish()
+
+    assert out == expected
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"halfwidth_kana": True, "strip_controls": True},
+        {"nfkc": True, "strip_controls": True},
+    ],
+)
+def test_stripped_control_between_kana_and_voiced_mark_across_chunks(options):
+    expected = TextNormalizer(**options).normalize("ﾊ\x00ﾞ")
+    assert expected == "バ"
+
+    normalizer = TextNormalizer(**options)
+    out = normalizer.feed("ﾊ\x00") + normalizer.feed("ﾞ") + normalizer.finish()
+    assert out == expected
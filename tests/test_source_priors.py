@@ -0,0 +1,59 @@
+# tests/test_source_priors.py
+
+from __future__ import annotations
+
+from core.source_priors import SourcePriorStore
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_prior_requires_consistent_decisions():
+    store = SourcePriorStore(min_weight=3.0, clock=_FakeClock())
+
+    for _ in range(2):
+        store.record("feed-a", "cp932")
+    assert store.lookup("feed-a") is None
+
+    store.record("feed-a", "cp932")
+    assert store.lookup("feed-a") == "cp932"
+    assert store.lookup("unknown-feed") is None
+
+
+def test_prior_switches_after_mismatches():
+    store = SourcePriorStore(min_weight=2.0, clock=_FakeClock())
+    for _ in range(3):
+        store.record("feed-b", "cp932")
+
+    store.record("feed-b", "utf-8")
+    store.record("feed-b", "utf-8")
+    assert store.lookup("feed-b") is None
+
+    for _ in range(2):
+        store.record("feed-b", "utf-8")
+    assert store.lookup("feed-b") == "utf-8"
+
+
+def test_stale_prior_decays():
+    clock = _FakeClock()
+    store = SourcePriorStore(min_weight=3.0, half_life_seconds=100.0, clock=clock)
+    for _ in range(4):
+        store.record("feed-c", "euc_jp")
+    assert store.lookup("feed-c") == "euc_jp"
+
+    clock.now = 100.0  # 重み 4 → 2
+    assert store.lookup("feed-c") is None
+
+
+def test_store_is_bounded():
+    store = SourcePriorStore(min_weight=1.0, max_sources=2, clock=_FakeClock())
+    for source_id in ("a", "b", "c"):
+        store.record(source_id, "utf-8")
+
+    assert store.lookup("a") is None
+    assert store.lookup("c") == "utf-8"
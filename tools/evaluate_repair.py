@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+ラベル付きコーパス（tools/generate_mojibake_samples.py corpus で生成）に対して
+repair_encoding / repair_encoding_v2 を実行し、精度とスループットを同時に測定する。
+
+    python tools/evaluate_repair.py corpus/labels.jsonl
+    python tools/evaluate_repair.py corpus/labels.jsonl --json report.json
+
+レポート内容:
+  - path_accuracy: detected_path がラベルと一致した割合
+  - text_accuracy: 修復結果が元テキストと完全一致した割合
+  - confusion: 期待 detected_path → 実際の detected_path の件数
+  - mb_per_s: 修復処理のみの時間（Base64 エンコード・ファイル読み込みは除く）での MB/s
+"""
+
+import argparse
+import base64
+import json
+import pathlib
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Tuple
+
+BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from core.encoding_repair import EncodingRepairRequest, repair_encoding  # noqa: E402
+from core.encoding_repair_v2 import EncodingRepairRequestV2, repair_encoding_v2  # noqa: E402
+
+
+def _run_v2(raw: bytes) -> Tuple[str, str, float]:
+    request = EncodingRepairRequestV2(mode="auto", raw_bytes_base64=base64.b64encode(raw).decode("ascii"))
+    started = time.perf_counter()
+    response = repair_encoding_v2(request)
+    elapsed = time.perf_counter() - started
+    return response.result.fixed_text, response.meta.detected_path or "none", elapsed
+
+
+def _run_v0(raw: bytes) -> Tuple[str, str, float]:
+    request = EncodingRepairRequest(
+        text=raw.decode("utf-8", errors="replace"),
+        assume_current_encoding="latin1",
+        target_encoding="utf-8",
+    )
+    started = time.perf_counter()
+    response = repair_encoding(request)
+    elapsed = time.perf_counter() - started
+
+    if response["result"]["changed"]:
+        detected_path = f"{request.assume_current_encoding}->{request.target_encoding}"
+    else:
+        detected_path = "unchanged"
+    return response["result"]["fixed_text"], detected_path, elapsed
+
+
+def evaluate(labels_path: pathlib.Path) -> Dict:
+    corpus_dir = labels_path.parent
+
+    totals = Counter()
+    by_path: Dict[str, Counter] = defaultdict(Counter)
+    confusion: Dict[str, Counter] = defaultdict(Counter)
+
+    with labels_path.open(encoding="utf-8") as f:
+        for line in f:
+            label = json.loads(line)
+            raw = (corpus_dir / label["file"]).read_bytes()
+            expected_text = (corpus_dir / label["expected_file"]).read_text(encoding="utf-8")
+
+            runner = _run_v0 if label["engine"] == "v0" else _run_v2
+            fixed_text, detected_path, elapsed = runner(raw)
+
+            path_ok = detected_path == label["expected_detected_path"]
+            text_ok = fixed_text == expected_text
+            for counter in (totals, by_path[label["path"]]):
+                counter["samples"] += 1
+                counter["bytes"] += len(raw)
+                counter["seconds"] += elapsed
+                counter["path_ok"] += path_ok
+                counter["text_ok"] += text_ok
+            confusion[label["expected_detected_path"]][detected_path] += 1
+
+    def summarize(counter: Counter) -> Dict:
+        samples = counter["samples"] or 1
+        seconds = counter["seconds"] or 1e-12
+        return {
+            "samples": counter["samples"],
+            "bytes": counter["bytes"],
+            "path_accuracy": counter["path_ok"] / samples,
+            "text_accuracy": counter["text_ok"] / samples,
+            "mb_per_s": counter["bytes"] / seconds / 1_000_000,
+        }
+
+    return {
+        "overall": summarize(totals),
+        "by_path": {name: summarize(counter) for name, counter in sorted(by_path.items())},
+        "confusion": {expected: dict(actual) for expected, actual in sorted(confusion.items())},
+    }
+
+
+def print_report(report: Dict) -> None:
+    header = f"{'path':<16}{'samples':>9}{'path_acc':>10}{'text_acc':>10}{'MB/s':>10}"
+    print(header)
+    print("-" * len(header))
+    rows = list(report["by_path"].items()) + [("(overall)", report["overall"])]
+    for name, row in rows:
+        print(
+            f"{name:<16}{row['samples']:>9}{row['path_accuracy']:>10.3f}"
+            f"{row['text_accuracy']:>10.3f}{row['mb_per_s']:>10.2f}"
+        )
+
+    print("\n=== confusion (expected -> detected) ===")
+    for expected, actual in report["confusion"].items():
+        cells = ", ".join(f"{path}: {count}" for path, count in sorted(actual.items(), key=lambda x: -x[1]))
+        print(f"{expected:<22} {cells}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Evaluate encoding repair accuracy and throughput.")
+    parser.add_argument("labels", type=pathlib.Path, help="labels.jsonl のパス")
+    parser.add_argument("--json", type=pathlib.Path, default=None, help="レポートを JSON で書き出す")
+    args = parser.parse_args()
+
+    if not args.labels.exists():
+        print(f"[ERROR] File not found: {args.labels}", file=sys.stderr)
+        return 1
+
+    report = evaluate(args.labels)
+    print_report(report)
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
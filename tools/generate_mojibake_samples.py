@@ -16,9 +16,20 @@ APIron Mojibake Test Suite - Essential 5
       - 0x81 / 0x00 等の不正バイトを含むログ風バイト列
 
 これらは **テスト用サンプル** であり、実業務データや個人情報は含まない。
+
+`corpus` サブコマンドでは、精度・スループット評価用のラベル付きコーパスを
+シード固定で大量に生成する（評価は tools/evaluate_repair.py）。
+
+    python tools/generate_mojibake_samples.py corpus --out corpus --count 1000 \
+        --seed 42 --sizes 256,4096,65536 --invalid-rate 0.001 --mix-ratio 0.3 --workers 4
 """
 
+import argparse
+import json
 import pathlib
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List
 
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
@@ -178,7 +189,152 @@ def generate_05_invalid_bytes(path: pathlib.Path) -> None:
     path.write_bytes(data)
 
 
-def main() -> None:
+# ---------------------------------------------------------------------------
+# ラベル付きコーパス
+# ---------------------------------------------------------------------------
+
+# 破損経路: (元テキストのバイト化方法, 期待する修復エンジン, 期待する detected_path)
+#   - バイト列経路は repair_encoding_v2（Auto）で評価する
+#   - utf8_as_latin1 は「モジバケ文字列を UTF-8 で保存」したテキスト経路で、
+#     repair_encoding（v0: latin1 -> utf-8 の再解釈）で評価する
+CORRUPTION_PATHS: Dict[str, Dict[str, str]] = {
+    "utf-8": {"engine": "v2", "expected_detected_path": "utf-8->utf-8"},
+    "cp932": {"engine": "v2", "expected_detected_path": "cp932->utf-8"},
+    "euc_jp": {"engine": "v2", "expected_detected_path": "euc_jp->utf-8"},
+    "iso2022_jp": {"engine": "v2", "expected_detected_path": "iso2022_jp->utf-8"},
+    "utf8_as_latin1": {"engine": "v0", "expected_detected_path": "latin1->utf-8"},
+}
+
+JAPANESE_LINES = [
+    "システム監視レポートを送付いたします。",
+    "本日の処理件数は前日比で増加しました。",
+    "お問い合わせいただいた件について回答します。",
+    "顧客マスタの更新が完了しました。",
+    "請求書の発行処理でエラーが発生しました。",
+    "明日の定例会議は十時から開始します。",
+    "在庫数が閾値を下回っています。",
+    "ログイン履歴を確認してください。",
+    "ｶﾀｶﾅ半角の品名データが含まれています。",
+    "東京都千代田区丸の内一丁目",
+]
+
+ASCII_LINES = [
+    "INFO  2025-11-01T00:00:00Z job=batch-import status=started",
+    "WARN  cpu_usage=95% host=server01.example.local",
+    "DEBUG request_id=7f3a9c latency_ms=12.4 path=/api/v1/items",
+    "ERROR retry=3 code=E1042 message=timeout while connecting",
+    "id,name,amount,updated_at",
+]
+
+
+def _build_text(rng: random.Random, size: int, mix_ratio: float) -> str:
+    """UTF-8 換算でおよそ size バイトになるまで、日本語行と ASCII 行を混ぜて並べる。"""
+    lines: List[str] = []
+    total = 0
+    while total < size:
+        line = rng.choice(ASCII_LINES) if rng.random() < mix_ratio else rng.choice(JAPANESE_LINES)
+        lines.append(line)
+        total += len(line.encode("utf-8")) + 1
+    return "\n".join(lines) + "\n"
+
+
+def _inject_invalid_bytes(rng: random.Random, data: bytes, rate: float) -> bytes:
+    """rate の割合でバイト位置を選び、不正バイト（0x81 / 0xFF / NUL）を挿入する。"""
+    if rate <= 0:
+        return data
+    out = bytearray()
+    for b in data:
+        if rng.random() < rate:
+            out.append(rng.choice((0x81, 0xFF, 0x00)))
+        out.append(b)
+    return bytes(out)
+
+
+def generate_corpus_sample(spec: Dict) -> Dict:
+    """
+    1 サンプルを生成して書き出し、ラベル（labels.jsonl の 1 行）を返す。
+
+    乱数はサンプルごとに seed + index で初期化するため、
+    ワーカー数に関係なく同じコーパスが再現される。
+    """
+    rng = random.Random(spec["seed"] * 1_000_003 + spec["index"])
+    out_dir = pathlib.Path(spec["out"])
+    path_name = spec["path"]
+
+    original = _build_text(rng, spec["size"], spec["mix_ratio"])
+    if path_name == "utf8_as_latin1":
+        # テキスト経路（モジバケ文字列の保存）のため、バイト単位の破損は挿入しない
+        data = original.encode("utf-8").decode("latin1").encode("utf-8")
+    else:
+        data = original.encode(path_name, errors="replace")
+        data = _inject_invalid_bytes(rng, data, spec["invalid_rate"])
+        # 正解は「正しいエンコーディングで破損後のバイト列をデコードした結果」とする。
+        # 挿入した NUL はどのエンコーディングでも有効な文字として残り、0x81 は後続バイトと
+        # 組になって文字になる場合もあるため、破損前のテキストは正解にならない。
+        # 表現できない文字（ISO-2022-JP の半角カナなど）も置換済みのものが正解になる
+        original = data.decode(path_name, errors="ignore")
+
+    sample_id = f"{spec['index']:06d}"
+    (out_dir / f"{sample_id}.bin").write_bytes(data)
+    (out_dir / f"{sample_id}.expected.txt").write_text(original, encoding="utf-8")
+
+    return {
+        "id": sample_id,
+        "file": f"{sample_id}.bin",
+        "expected_file": f"{sample_id}.expected.txt",
+        "path": path_name,
+        "engine": CORRUPTION_PATHS[path_name]["engine"],
+        "expected_detected_path": CORRUPTION_PATHS[path_name]["expected_detected_path"],
+        "size": len(data),
+        "invalid_rate": spec["invalid_rate"],
+        "mix_ratio": spec["mix_ratio"],
+    }
+
+
+def build_corpus(
+    out: pathlib.Path,
+    count: int,
+    seed: int,
+    sizes: List[int],
+    paths: List[str],
+    invalid_rate: float,
+    mix_ratio: float,
+    workers: int,
+) -> pathlib.Path:
+    """ラベル付きコーパスを out 配下に生成し、labels.jsonl のパスを返す。"""
+    out.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    specs = [
+        {
+            "index": index,
+            "seed": seed,
+            "out": str(out),
+            "path": rng.choice(paths),
+            "size": rng.choice(sizes),
+            "invalid_rate": invalid_rate,
+            "mix_ratio": mix_ratio,
+        }
+        for index in range(count)
+    ]
+
+    if workers == 1:
+        labels = [generate_corpus_sample(spec) for spec in specs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            labels = list(executor.map(generate_corpus_sample, specs, chunksize=16))
+
+    labels_path = out / "labels.jsonl"
+    with labels_path.open("w", encoding="utf-8") as f:
+        for label in labels:
+            f.write(json.dumps(label, ensure_ascii=False) + "\n")
+    return labels_path
+
+
+def _csv_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def generate_essential_samples() -> None:
     ensure_samples_dir()
 
     generators = [
@@ -195,6 +351,48 @@ def main() -> None:
         print(f"[OK] generated: {path.relative_to(BASE_DIR)}")
 
 
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate mojibake samples / labelled corpus.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    corpus = subparsers.add_parser("corpus", help="ラベル付き評価コーパスを生成する")
+    corpus.add_argument("--out", type=pathlib.Path, default=BASE_DIR / "corpus", help="出力ディレクトリ")
+    corpus.add_argument("--count", type=int, default=1000, help="サンプル数")
+    corpus.add_argument("--seed", type=int, default=42, help="乱数シード")
+    corpus.add_argument("--sizes", type=_csv_list, default=["256", "4096", "65536"], help="サンプルサイズ（バイト、カンマ区切り）")
+    corpus.add_argument(
+        "--paths",
+        type=_csv_list,
+        default=list(CORRUPTION_PATHS),
+        help=f"破損経路（カンマ区切り: {','.join(CORRUPTION_PATHS)}）",
+    )
+    corpus.add_argument("--invalid-rate", type=float, default=0.0, help="不正バイトの挿入率（0〜1）")
+    corpus.add_argument("--mix-ratio", type=float, default=0.3, help="ASCII 行の混在比率（0〜1）")
+    corpus.add_argument("--workers", type=int, default=None, help="並列生成のプロセス数")
+
+    args = parser.parse_args()
+
+    if args.command != "corpus":
+        # 従来どおり Essential 5 を samples/ に生成
+        generate_essential_samples()
+        return
+
+    unknown = [p for p in args.paths if p not in CORRUPTION_PATHS]
+    if unknown:
+        parser.error(f"unknown corruption path(s): {', '.join(unknown)}")
+
+    labels_path = build_corpus(
+        out=args.out,
+        count=args.count,
+        seed=args.seed,
+        sizes=[int(size) for size in args.sizes],
+        paths=args.paths,
+        invalid_rate=args.invalid_rate,
+        mix_ratio=args.mix_ratio,
+        workers=args.workers,
+    )
+    print(f"[OK] generated {args.count} samples: {labels_path}")
+
+
 if __name__ == "__main__":
     main()
-
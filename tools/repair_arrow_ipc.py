@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Arrow IPC ファイルの binary 列をバッチ単位で修復し、結果列を追加した IPC ファイルを書き出す。
+
+    python tools/repair_arrow_ipc.py input.arrow output.arrow --column name
+    python tools/repair_arrow_ipc.py input.arrow output.arrow --column name --target-encoding cp932
+
+追加される列: <column>_fixed_text / <column>_detected_path / <column>_confidence / <column>_status
+（pyarrow が必要）
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from core.columnar import repair_arrow_ipc_file  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Repair a binary column of an Arrow IPC file.")
+    parser.add_argument("source", type=pathlib.Path, help="入力 IPC ファイル")
+    parser.add_argument("dest", type=pathlib.Path, help="出力 IPC ファイル")
+    parser.add_argument("--column", required=True, help="修復する binary 列の名前")
+    parser.add_argument("--target-encoding", default="utf-8", help="出力エンコーディング（既定 utf-8）")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows = repair_arrow_ipc_file(str(args.source), str(args.dest), args.column, args.target_encoding)
+    elapsed = time.perf_counter() - started
+    print(f"repaired {rows} rows in {elapsed:.2f}s -> {args.dest}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+追記専用のログファイルを、前回からの追記分だけ修復して標準出力に書き出す。
+
+    python tools/tail_encoding_repair.py /var/log/legacy/app.log
+    python tools/tail_encoding_repair.py /var/log/legacy/*.log --follow --interval 2
+
+ファイルごとの読み込み位置・判定済みエンコーディングは --state の JSON に保存され、
+次回の実行はその続きから処理する（全体の再送・再判定はしない）。
+"""
+
+import argparse
+import pathlib
+import sys
+
+BASE_DIR = pathlib.Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from core.codec_registry import normalize_encoding_name  # noqa: E402
+from core.incremental import IncrementalRepairer, JsonStateStore  # noqa: E402
+
+DEFAULT_STATE_PATH = pathlib.Path.home() / ".encoding_repair_tail.json"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Incrementally repair appended bytes of growing log files.")
+    parser.add_argument("files", nargs="+", type=pathlib.Path, help="対象のログファイル")
+    parser.add_argument("--state", type=pathlib.Path, default=DEFAULT_STATE_PATH, help="状態ファイルのパス")
+    parser.add_argument("--follow", action="store_true", help="追記を待ち続ける（tail -F 相当）")
+    parser.add_argument("--interval", type=float, default=1.0, help="--follow 時の確認間隔（秒）")
+    parser.add_argument("--target-encoding", default="utf-8", help="出力エンコーディング（既定 utf-8）")
+    parser.add_argument(
+        "--error-policy",
+        choices=["ignore", "replace", "escape"],
+        default="ignore",
+        help="不正バイト列の扱い（既定 ignore）",
+    )
+    args = parser.parse_args()
+
+    target_encoding = normalize_encoding_name(args.target_encoding)
+    if target_encoding is None:
+        parser.error(f"unknown encoding: {args.target_encoding}")
+
+    repairer = IncrementalRepairer(JsonStateStore(str(args.state)), error_policy=args.error_policy)
+    paths = [str(path) for path in args.files]
+    out = sys.stdout.buffer
+
+    if args.follow:
+        updates = repairer.follow(paths, poll_interval=args.interval)
+    else:
+        updates = (update for path in paths for update in repairer.catch_up(path))
+
+    try:
+        for update in updates:
+            if update.rotated or update.redetected:
+                print(f"# {update.path}: encoding={update.encoding} rotated={update.rotated}", file=sys.stderr)
+            out.write(update.text.encode(target_encoding, errors="replace"))
+            out.flush()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())